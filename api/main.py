@@ -1,30 +1,122 @@
 from __future__ import annotations
 
-from typing import Optional
-
-from fastapi import Depends, FastAPI, HTTPException
+import io
+import os
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from typing import Literal, Optional
+
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, PositiveInt
 
+from infra.catalogo import CatalogoEmMemoria
+from infra.executor import ExecutorDeBanco
 from infra.forja_persistencia import ForjaDePersistencia
-from services.servicos import OrquestradorDeFluxoComercial
+from infra.metricas import MiddlewareDeMetricas, RegistroDeMetricas
+from infra.migracoes import migrar
+from infra.repositorios import epoch_utc
 from services import relatorios as rel
+from services.alteracoes import HistoricoDescartado
+from services.cache_relatorios import CacheDeRelatorios
+from services.escrita_agrupada import EscritorAgrupado
+from services.exportacao import FORMATOS, exportar_vendas
+from services.giro import giro_multijanela, interpretar_janelas
+from services.importacao import IMPORTADORES, detectar_formato
+from services.ranking_tempo_real import JANELAS, RankingTempoReal
+from services.servicos import ErroVendaEmLote
+from services.servicos_async import OrquestradorAssincrono
+
+# Threads dedicadas: escritas curtas não disputam vaga com relatórios pesados
+THREADS_LEITURA = 4
+THREADS_ESCRITA = 2
+TIMEOUT_RELATORIOS = 10.0  # s; a consulta é interrompida ao estourar
+TIMEOUT_ESCRITA = 5.0  # s; só a espera na fila, a escrita iniciada vai até o fim
+# Group commit opcional para POST /vendas: várias vendas por transação
+ESCRITA_AGRUPADA = os.environ.get("NUCLEO_ESCRITA_AGRUPADA", "") == "1"
+# Instrumentação opcional (SQL + rotas) exposta em /metrics
+METRICAS = os.environ.get("NUCLEO_METRICAS", "") == "1"
+SQL_LENTO_MS = float(os.environ.get("NUCLEO_SQL_LENTO_MS", "100"))
+
+metricas = RegistroDeMetricas(lento_ms=SQL_LENTO_MS) if METRICAS else None
+forja = ForjaDePersistencia(metricas=metricas)
+pool = forja.criar_pool()
+cache_relatorios = CacheDeRelatorios()
+# Catálogo compartilhado pelas threads do processo; outros workers são
+# percebidos pelo contador de versão no banco
+catalogo = CatalogoEmMemoria()
+# Top-K por janela recente, alimentado pelas vendas deste processo e pelo banco
+ranking_tempo_real = RankingTempoReal()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Só no startup (não no import); com o esquema em dia são só leituras
+    migrar(forja)
+    conn = forja.conectar()
+    try:
+        ranking_tempo_real.reconstruir(conn)
+    finally:
+        conn.close()
+    leitura = ExecutorDeBanco(forja, max_threads=THREADS_LEITURA, nome="db-leitura")
+    escrita = ExecutorDeBanco(
+        forja,
+        max_threads=THREADS_ESCRITA,
+        timeout=TIMEOUT_ESCRITA,
+        limite_so_na_fila=True,
+        nome="db-escrita",
+    )
+    escritor = EscritorAgrupado(forja) if ESCRITA_AGRUPADA else None
+    if escritor is not None:
+        escritor.iniciar()
+    app.state.servico = OrquestradorAssincrono(
+        leitura,
+        escrita,
+        cache=cache_relatorios,
+        escritor=escritor,
+        catalogo=catalogo,
+        ranking=ranking_tempo_real,
+    )
+    try:
+        yield
+    finally:
+        if escritor is not None:
+            escritor.encerrar()
+        leitura.encerrar()
+        escrita.encerrar()
 
 
-app = FastAPI(title="Núcleo Comercial de Dados", version="1.0.0")
-forja = ForjaDePersistencia()
-forja.criar_esquema()
+app = FastAPI(title="Núcleo Comercial de Dados", version="1.0.0", lifespan=ciclo_de_vida)
+if metricas is not None:
+    app.add_middleware(MiddlewareDeMetricas, registro=metricas)
 
 
-def get_conn():
-    conn = forja.conectar(check_same_thread=False)
-    try:
-        yield conn
-    finally:
-        conn.close()
+@app.exception_handler(ValueError)
+def erro_de_validacao(request: Request, exc: ValueError):
+    # Regras de domínio e parâmetros inválidos (ex.: datas) viram 400
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(TimeoutError)
+def erro_de_tempo_limite(request: Request, exc: TimeoutError):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 
+def get_service(request: Request) -> OrquestradorAssincrono:
+    return request.app.state.servico
 
-def get_service(conn=Depends(get_conn)):
-    return OrquestradorDeFluxoComercial(conn)
+
+def _json_pronto(corpo: str, headers: Optional[dict] = None) -> Response:
+    # Texto já montado pelo SQLite no formato dos modelos de saída: sem
+    # validação nem serialização por linha (o response_model fica na documentação)
+    return Response(corpo, media_type="application/json", headers=headers)
+
+
+def _com_sequencia(pagina: tuple) -> Response:
+    # Último seq do feed lido antes da página: ponto de partida de
+    # GET /vendas/alteracoes depois de uma carga completa
+    corpo, seq = pagina
+    return _json_pronto(corpo, {"X-Alteracoes-Seq": str(seq)})
 
 
 class ProdutoIn(BaseModel):
@@ -54,8 +146,27 @@ class VendaOut(BaseModel):
     data_venda: str
 
 
-@app.get("/produtos", response_model=list[ProdutoOut])
-def listar_produtos(svc: OrquestradorDeFluxoComercial = Depends(get_service)):
+class PaginaProdutosOut(BaseModel):
+    itens: list[ProdutoOut]
+    next_cursor: Optional[str] = None
+
+
+@app.get("/produtos", response_model=PaginaProdutosOut)
+async def listar_produtos(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    return _com_sequencia(await svc.paginar_produtos_json(limit, cursor))
+
+
+@app.get("/produtos/busca", response_model=list[ProdutoOut])
+async def buscar_produtos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    produtos = await svc.buscar_produtos(q, limit)
     return [
         {
             "id": p.id,
@@ -64,15 +175,20 @@ def listar_produtos(svc: OrquestradorDeFluxoComercial = Depends(get_service)):
             "quantidade_disponivel": p.quantidade_disponivel,
             "preco": p.preco,
         }
-        for p in svc.listar_produtos()
+        for p in produtos
     ]
 
 
+@app.get("/produtos/catalogo")
+async def estatisticas_catalogo():
+    return catalogo.estatisticas()
+
+
 @app.post("/produtos", response_model=ProdutoOut, status_code=201)
-def criar_produto(
-    payload: ProdutoIn, svc: OrquestradorDeFluxoComercial = Depends(get_service)
+async def criar_produto(
+    payload: ProdutoIn, svc: OrquestradorAssincrono = Depends(get_service)
 ):
-    prod = svc.cadastrar_produto(
+    prod = await svc.cadastrar_produto(
         nome=payload.nome,
         descricao=payload.descricao,
         quantidade=payload.quantidade_disponivel,
@@ -87,64 +203,316 @@ def criar_produto(
     }
 
 
-@app.get("/vendas", response_model=list[VendaOut])
-def listar_vendas(svc: OrquestradorDeFluxoComercial = Depends(get_service)):
-    vendas = svc.listar_vendas()
-    return [
-        {
-            "id": v.id,
-            "produto_id": v.produto_id,
-            "quantidade": v.quantidade,
-            "data_venda": v.data_venda.isoformat(),
-        }
-        for v in vendas
-    ]
+class PaginaVendasOut(BaseModel):
+    itens: list[VendaOut]
+    next_cursor: Optional[str] = None
 
 
-@app.post("/vendas", response_model=VendaOut, status_code=201)
-def criar_venda(
-    payload: VendaIn, svc: OrquestradorDeFluxoComercial = Depends(get_service)
+@app.get("/vendas", response_model=PaginaVendasOut)
+async def listar_vendas(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    produto_id: Optional[int] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    svc: OrquestradorAssincrono = Depends(get_service),
 ):
+    return _com_sequencia(
+        await svc.paginar_vendas_json(limit, cursor, produto_id=produto_id, start=start, end=end)
+    )
+
+
+@app.get("/vendas/alteracoes")
+async def listar_alteracoes(
+    desde: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    espera: float = Query(0, ge=0, le=30),
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    # Guarde o ``desde`` da resposta e repasse na próxima chamada; ``espera`` > 0
+    # segura a requisição (long-poll) até surgir alteração ou o prazo acabar
     try:
-        v = svc.registrar_venda(payload.produto_id, payload.quantidade)
+        return _json_pronto(await svc.alteracoes(desde, limit, espera))
+    except HistoricoDescartado as e:
+        raise HTTPException(
+            status_code=410,
+            detail={
+                "mensagem": str(e),
+                "descartadas_ate": e.descartadas_ate,
+                "atual": e.atual,
+            },
+        )
+
+
+@app.get("/vendas/exportar")
+def exportar_vendas_arquivo(
+    formato: Literal["csv", "ndjson"] = "ndjson",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    gzip: bool = False,
+):
+    # Datas validadas antes de abrir o streaming (depois o status já foi enviado)
+    inicio = epoch_utc(start) if start else None
+    fim = epoch_utc(end) if end else None
+
+    def corpo():
+        # Conexão própria: vive enquanto o corpo é transmitido
+        with pool.conexao() as conn:
+            yield from exportar_vendas(
+                conn, formato=formato, inicio_ts=inicio, fim_ts=fim, comprimir=gzip
+            )
+
+    nome = f"vendas.{formato}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        corpo(),
+        media_type="application/gzip" if gzip else FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
+
+
+@app.post("/vendas", response_model=VendaOut, status_code=201)
+async def criar_venda(payload: VendaIn, svc: OrquestradorAssincrono = Depends(get_service)):
+    try:
+        v = await svc.registrar_venda(payload.produto_id, payload.quantidade)
         return {
             "id": v.id,
             "produto_id": v.produto_id,
             "quantidade": v.quantidade,
             "data_venda": v.data_venda.isoformat(),
         }
+    except TimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+class ItemLoteIn(BaseModel):
+    produto_id: int
+    quantidade: PositiveInt
+
+
+class VendaLoteIn(BaseModel):
+    itens: list[ItemLoteIn] = Field(..., min_length=1)
+
+
+class ItemLoteOut(BaseModel):
+    indice: int
+    produto_id: int
+    quantidade: int
+    ok: bool
+    venda: Optional[VendaOut] = None
+    erro: Optional[str] = None
+
+
+class VendaLoteOut(BaseModel):
+    itens: list[ItemLoteOut]
+
+
+@app.post("/vendas/lote", response_model=VendaLoteOut, status_code=201)
+async def criar_vendas_lote(
+    payload: VendaLoteIn, svc: OrquestradorAssincrono = Depends(get_service)
+):
+    try:
+        vendas = await svc.registrar_vendas_lote(
+            [(item.produto_id, item.quantidade) for item in payload.itens]
+        )
+    except ErroVendaEmLote as e:
+        raise HTTPException(status_code=400, detail={"mensagem": str(e), "itens": e.resultados})
+    except TimeoutError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "itens": [
+            {
+                "indice": i,
+                "produto_id": v.produto_id,
+                "quantidade": v.quantidade,
+                "ok": True,
+                "venda": {
+                    "id": v.id,
+                    "produto_id": v.produto_id,
+                    "quantidade": v.quantidade,
+                    "data_venda": v.data_venda.isoformat(),
+                },
+            }
+            for i, v in enumerate(vendas)
+        ]
+    }
+
+
 class ReceitaTotalOut(BaseModel):
     receita: float
 
 
 @app.get("/relatorios/receita", response_model=ReceitaTotalOut)
-def rel_receita_total(
-    start: Optional[str] = None, end: Optional[str] = None, conn=Depends(get_conn)
+async def rel_receita_total(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    svc: OrquestradorAssincrono = Depends(get_service),
 ):
-    return {"receita": rel.receita_total(conn, start=start, end=end)}
+    receita = await svc.relatorio(
+        rel.receita_total, timeout=TIMEOUT_RELATORIOS, start=start, end=end
+    )
+    return {"receita": receita}
 
 
 @app.get("/relatorios/receita_por_dia")
-def rel_receita_por_dia(
-    start: Optional[str] = None, end: Optional[str] = None, conn=Depends(get_conn)
+async def rel_receita_por_dia(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    svc: OrquestradorAssincrono = Depends(get_service),
 ):
-    return rel.receita_por_dia(conn, start=start, end=end)
+    return _json_pronto(
+        await svc.relatorio(
+            rel.receita_por_dia_json, timeout=TIMEOUT_RELATORIOS, start=start, end=end
+        )
+    )
+
+
+class RankingItemOut(BaseModel):
+    produto_id: int
+    nome: Optional[str] = None
+    total_vendido: int
+    receita: float
+
+
+class RankingTempoRealItemOut(RankingItemOut):
+    # Só no modo aproximado (Space-Saving): limite da superestimação da receita
+    erro: Optional[float] = None
+
 
+class RankingTempoRealOut(BaseModel):
+    janela: str
+    inicio: str
+    fim: str
+    exato: bool
+    itens: list[RankingTempoRealItemOut]
 
-@app.get("/relatorios/ranking")
-def rel_ranking_produtos(
+
+@app.get("/relatorios/ranking", response_model=list[RankingItemOut])
+async def rel_ranking_produtos(
     start: Optional[str] = None,
     end: Optional[str] = None,
     limit: int = 10,
-    conn=Depends(get_conn),
+    svc: OrquestradorAssincrono = Depends(get_service),
 ):
-    return rel.ranking_produtos(conn, start=start, end=end, limit=limit)
+    return _json_pronto(
+        await svc.relatorio(
+            rel.ranking_produtos_json,
+            timeout=TIMEOUT_RELATORIOS,
+            start=start,
+            end=end,
+            limit=limit,
+        )
+    )
+
+
+@app.get(
+    "/relatorios/ranking/tempo_real",
+    response_model=RankingTempoRealOut,
+    response_model_exclude_none=True,
+)
+async def rel_ranking_tempo_real(
+    janela: str = Query("hora", description=", ".join(JANELAS)),
+    limit: int = 10,
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    # Janela que termina agora, mantida em memória; sem start/end nem consulta agregada
+    return await svc.ranking_tempo_real(janela, limit)
 
 
 @app.get("/relatorios/giro")
-def rel_giro(dias: int = 30, conn=Depends(get_conn)):
-    return rel.giro_estoque(conn, dias=dias)
+async def rel_giro(
+    dias: str = Query("30", description="janelas em dias, separadas por vírgula (ex.: 7,30,90)"),
+    referencia: Optional[str] = Query(None, description="data de referência (padrão: hoje, UTC)"),
+    prazo_reposicao: float = Query(7.0, gt=0),
+    apenas_risco: bool = False,
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    try:
+        ref = date.fromisoformat(referencia) if referencia else datetime.now(timezone.utc).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida: {referencia!r}")
+    return await svc.relatorio(
+        giro_multijanela,
+        timeout=TIMEOUT_RELATORIOS,
+        janelas=interpretar_janelas(dias),
+        referencia=ref,
+        prazo_reposicao=prazo_reposicao,
+        apenas_risco=apenas_risco,
+    )
+
+
+@app.get("/vendas/escrita_agrupada")
+async def estatisticas_escrita_agrupada(svc: OrquestradorAssincrono = Depends(get_service)):
+    if svc.escritor is None:
+        raise HTTPException(status_code=404, detail="Escrita agrupada desativada")
+    return svc.escritor.estatisticas()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def exportar_metricas():
+    if metricas is None:
+        raise HTTPException(status_code=404, detail="Métricas desativadas (NUCLEO_METRICAS=1)")
+    return PlainTextResponse(
+        metricas.como_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/relatorios/cache")
+async def rel_cache_estatisticas():
+    return cache_relatorios.estatisticas()
+
+
+class ImportacaoOut(BaseModel):
+    tipo: str
+    lidas: int
+    inseridas: int
+    rejeitadas: int
+    segundos: float
+    linhas_por_segundo: float
+    arquivo_rejeitados: Optional[str] = None
+
+
+@app.post("/importacao/{tipo}", response_model=ImportacaoOut)
+async def importar_arquivo(
+    tipo: Literal["produtos", "vendas"],
+    arquivo: UploadFile = File(...),
+    formato: Optional[Literal["csv", "jsonl"]] = None,
+    lote: int = 5000,
+    svc: OrquestradorAssincrono = Depends(get_service),
+):
+    try:
+        formato = formato or detectar_formato(arquivo.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    destino = forja.caminho.parent / "rejeitados"
+    destino.mkdir(parents=True, exist_ok=True)
+    caminho_rej = destino / f"{tipo}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.jsonl"
+
+    def importar(conn):
+        texto = io.TextIOWrapper(arquivo.file, encoding="utf-8-sig", newline="")
+        try:
+            with open(caminho_rej, "w", encoding="utf-8") as rejeitados:
+                return IMPORTADORES[tipo](
+                    conn,
+                    texto,
+                    formato=formato,
+                    tamanho_lote=lote,
+                    # Sem adiar_indices aqui: com o servidor no ar, relatórios e
+                    # listagens varreriam vendas inteira durante o upload. Carga
+                    # sem índices só pelo CLI, com a API parada
+                    rejeitados=rejeitados,
+                )
+        finally:
+            texto.detach()
+
+    try:
+        relatorio = await svc.em_escrita(importar)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if relatorio.rejeitadas == 0:
+        caminho_rej.unlink(missing_ok=True)
+        return relatorio.como_dict()
+    return {**relatorio.como_dict(), "arquivo_rejeitados": str(caminho_rej)}
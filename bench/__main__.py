@@ -0,0 +1,156 @@
+"""CLI da suíte de benchmarks: ``python -m bench {gerar,executar,comparar}``."""
+from __future__ import annotations
+
+import argparse
+import platform
+import sqlite3
+import sys
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+
+from bench.cenarios import GRUPOS, VENDAS_ESCRITA_MINIMO, executar
+from bench.gerador import PERFIS, gerar
+from bench.medicao import carregar, comparar, salvar
+from infra.forja_persistencia import ForjaDePersistencia
+
+BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def _raiz(args: argparse.Namespace) -> Path:
+    return Path(args.dir or Path("bench") / ".dados" / args.perfil)
+
+
+def _vendas_escrita(valor: str) -> int:
+    n = int(valor)
+    if n < VENDAS_ESCRITA_MINIMO:
+        raise argparse.ArgumentTypeError(f"mínimo {VENDAS_ESCRITA_MINIMO}")
+    return n
+
+
+def cmd_gerar(args: argparse.Namespace) -> int:
+    perfil = PERFIS[args.perfil]
+    ajustes = {
+        k: getattr(args, k)
+        for k in ("produtos", "vendas", "semente")
+        if getattr(args, k) is not None
+    }
+    perfil = replace(perfil, **ajustes)
+    forja = ForjaDePersistencia(str(_raiz(args) / "data" / "mercado.sqlite3"))
+    print(f"Gerando {perfil.produtos} produtos e {perfil.vendas} vendas em {forja.caminho}")
+    info = gerar(forja, perfil, progresso=True)
+    print(f"Pronto em {info['segundos']:.1f}s ({info['bytes'] / 2**20:.0f} MiB)")
+    return 0
+
+
+def _imprimir_regressoes(atual: dict, base: dict, tolerancia: float, piso_ms: float) -> int:
+    if base.get("meta", {}).get("perfil") != atual.get("meta", {}).get("perfil"):
+        print("Aviso: perfil de dados diferente da linha de base; comparação pouco útil")
+    regressoes = comparar(atual, base, tolerancia=tolerancia, piso_ms=piso_ms)
+    if not regressoes:
+        print(f"Sem regressões além de {tolerancia:.0%} em relação à linha de base")
+        return 0
+    print(f"{len(regressoes)} regressões além de {tolerancia:.0%}:")
+    for r in regressoes:
+        print(f"  {r}")
+    return 1
+
+
+def cmd_executar(args: argparse.Namespace) -> int:
+    raiz = _raiz(args)
+    grupos = args.grupos.split(",") if args.grupos else list(GRUPOS)
+    resultados = executar(
+        raiz,
+        grupos=grupos,
+        repeticoes=args.repeticoes,
+        tempo_maximo=args.tempo_maximo,
+        vendas_escrita=args.vendas_escrita,
+    )
+    conn = sqlite3.connect(raiz / "data" / "mercado.sqlite3")
+    try:
+        contagens = {
+            t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in ("produtos", "vendas")
+        }
+    finally:
+        conn.close()
+    atual = {
+        "meta": {
+            "perfil": args.perfil,
+            "contagens": contagens,
+            "grupos": grupos,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "resultados": resultados,
+    }
+    salvar(atual, args.saida)
+    print(f"Resultados em {args.saida}")
+    for nome, m in sorted(resultados.items()):
+        print(
+            f"  {nome:<48} p50 {m['p50']:>10.3f}  p95 {m['p95']:>10.3f}  "
+            f"p99 {m['p99']:>10.3f} ms"
+        )
+    if args.gravar_baseline:
+        salvar(atual, args.baseline)
+        print(f"Linha de base atualizada: {args.baseline}")
+        return 0
+    if Path(args.baseline).exists():
+        return _imprimir_regressoes(
+            atual, carregar(args.baseline), args.tolerancia, args.piso_ms
+        )
+    print(f"Sem linha de base em {args.baseline}; use --gravar-baseline")
+    return 0
+
+
+def cmd_comparar(args: argparse.Namespace) -> int:
+    return _imprimir_regressoes(
+        carregar(args.atual), carregar(args.baseline), args.tolerancia, args.piso_ms
+    )
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    ger = sub.add_parser("gerar", help="Cria um banco sintético com o perfil escolhido")
+    ger.add_argument("--perfil", choices=sorted(PERFIS), default="pequeno")
+    ger.add_argument("--dir", help="diretório do banco (padrão: bench/.dados/<perfil>)")
+    ger.add_argument("--produtos", type=int, help="sobrepõe a quantidade do perfil")
+    ger.add_argument("--vendas", type=int, help="sobrepõe a quantidade do perfil")
+    ger.add_argument("--semente", type=int)
+    ger.set_defaults(executar=cmd_gerar)
+
+    exe = sub.add_parser("executar", help="Mede os cenários e compara com a linha de base")
+    exe.add_argument("--perfil", choices=sorted(PERFIS), default="pequeno")
+    exe.add_argument("--dir", help="diretório do banco (padrão: bench/.dados/<perfil>)")
+    exe.add_argument("--grupos", help=f"subconjunto de {','.join(GRUPOS)}")
+    exe.add_argument("--repeticoes", type=int, default=20)
+    exe.add_argument("--tempo-maximo", type=float, default=30.0, help="s por cenário")
+    exe.add_argument("--vendas-escrita", type=_vendas_escrita, default=500)
+    exe.add_argument("--saida", default="bench/resultados.json")
+    exe.add_argument("--baseline", default=str(BASELINE))
+    exe.add_argument("--tolerancia", type=float, default=0.25, help="fração (0.25 = 25%%)")
+    exe.add_argument("--piso-ms", type=float, default=0.5, help="diferença mínima relevante")
+    exe.add_argument("--gravar-baseline", action="store_true")
+    exe.set_defaults(executar=cmd_executar)
+
+    cmp = sub.add_parser("comparar", help="Compara dois arquivos de resultados")
+    cmp.add_argument("atual")
+    cmp.add_argument("--baseline", default=str(BASELINE))
+    cmp.add_argument("--tolerancia", type=float, default=0.25)
+    cmp.add_argument("--piso-ms", type=float, default=0.5)
+    cmp.set_defaults(executar=cmd_comparar)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = criar_parser().parse_args(argv)
+    return args.executar(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,278 @@
+"""Cenários medidos pela suíte: escrita, relatórios, listagens e API."""
+from __future__ import annotations
+
+import os
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from bench.gerador import intervalo_de_datas
+from bench.medicao import medir
+from infra.catalogo import CatalogoEmMemoria
+from infra.colunar import SnapshotColunar, atualizar_snapshot
+from infra.forja_persistencia import ForjaDePersistencia
+from infra.repositorios import RepositorioProdutoSQL, RepositorioVendaSQL
+from services import relatorios as rel
+from services import relatorios_colunares as rc
+from services.giro import giro_multijanela
+from services.servicos import OrquestradorDeFluxoComercial
+
+Resultados = Dict[str, Dict[str, float]]
+
+# Janelas (em dias, terminando no último dia com vendas) dos relatórios
+JANELAS = (1, 7, 30, 90, 365)
+# Acima disso ``RepositorioVendaSQL.listar`` (tudo em memória) não é medido
+LIMITE_LISTAR_VENDAS = 2_000_000
+
+
+def _janelas(fim: date, inicio: date) -> Dict[str, Dict[str, Optional[str]]]:
+    janelas: Dict[str, Dict[str, Optional[str]]] = {}
+    for dias in JANELAS:
+        comeco = fim - timedelta(days=dias - 1)
+        if comeco < inicio:
+            continue
+        janelas[f"{dias}d"] = {"start": comeco.isoformat(), "end": f"{fim}T23:59:59"}
+    # Pontas com horário: exercita a leitura de ``vendas`` além do resumo
+    janelas["30d_parcial"] = {
+        "start": f"{fim - timedelta(days=30)}T12:00:00",
+        "end": f"{fim}T11:59:59",
+    }
+    janelas["tudo"] = {"start": None, "end": None}
+    return janelas
+
+
+def relatorios(conn, *, repeticoes: int, tempo_maximo: float) -> Resultados:
+    inicio, fim = intervalo_de_datas(conn)
+    resultados: Resultados = {}
+    for rotulo, janela in _janelas(fim, inicio).items():
+        chamadas: Dict[str, Callable[[], Any]] = {
+            "receita_total": lambda j=janela: rel.receita_total(conn, **j),
+            "receita_por_dia": lambda j=janela: rel.receita_por_dia(conn, **j),
+            "ranking_produtos": lambda j=janela: rel.ranking_produtos(conn, **j, limit=10),
+        }
+        for nome, func in chamadas.items():
+            resultados[f"relatorios.{nome}[{rotulo}]"] = medir(
+                func, repeticoes=repeticoes, tempo_maximo=tempo_maximo
+            )
+    for dias in (*JANELAS, (fim - inicio).days + 1):
+        resultados[f"relatorios.giro_estoque[{dias}d]"] = medir(
+            lambda d=dias: rel.giro_estoque(conn, dias=d, referencia=fim),
+            repeticoes=repeticoes,
+            tempo_maximo=tempo_maximo,
+        )
+    resultados["relatorios.giro_multijanela[7,30,90]"] = medir(
+        lambda: giro_multijanela(conn, janelas=(7, 30, 90), referencia=fim),
+        repeticoes=repeticoes,
+        tempo_maximo=tempo_maximo,
+    )
+    resultados["relatorios.reconstruir_vendas_diarias"] = medir(
+        lambda: rel.reconstruir_vendas_diarias(conn),
+        repeticoes=3,
+        aquecimento=0,
+        tempo_maximo=tempo_maximo,
+    )
+    return resultados
+
+
+def colunar(conn, raiz: Path, *, repeticoes: int, tempo_maximo: float) -> Resultados:
+    # Histórico inteiro e último ano: o snapshot contra o SQL (ver "relatorios")
+    diretorio = raiz / "data" / "snapshot"
+    resultados: Resultados = {
+        "colunar.atualizar_snapshot[completo]": medir(
+            lambda: atualizar_snapshot(conn, diretorio, completo=True),
+            repeticoes=1,
+            aquecimento=0,
+        ),
+        "colunar.atualizar_snapshot[incremental]": medir(
+            lambda: atualizar_snapshot(conn, diretorio),
+            repeticoes=repeticoes,
+            tempo_maximo=tempo_maximo,
+        ),
+    }
+    snap = SnapshotColunar.abrir(diretorio)
+    inicio, fim = intervalo_de_datas(conn)
+    janelas = {k: j for k, j in _janelas(fim, inicio).items() if k in ("365d", "tudo")}
+    for rotulo, janela in janelas.items():
+        chamadas: Dict[str, Callable[[], Any]] = {
+            "receita_total": lambda j=janela: rc.receita_total(snap, **j),
+            "receita_por_dia": lambda j=janela: rc.receita_por_dia(snap, **j),
+            "ranking_produtos": lambda j=janela: rc.ranking_produtos(snap, **j, limit=10),
+        }
+        for nome, func in chamadas.items():
+            resultados[f"colunar.{nome}[{rotulo}]"] = medir(
+                func, repeticoes=repeticoes, tempo_maximo=tempo_maximo
+            )
+    return resultados
+
+
+def listagens(conn, *, repeticoes: int, tempo_maximo: float) -> Resultados:
+    prod, vendas = RepositorioProdutoSQL(conn), RepositorioVendaSQL(conn)
+    total_vendas = conn.execute("SELECT MAX(id) FROM vendas").fetchone()[0] or 0
+    # Nomes sintéticos são "<Categoria> <hex>": os 5 primeiros dígitos de um deles
+    nome = conn.execute("SELECT nome FROM produtos ORDER BY id LIMIT 1").fetchone()
+    amostra = nome[0].split()[-1][:5] if nome else "zz"
+    opcoes = {"repeticoes": repeticoes, "tempo_maximo": tempo_maximo}
+    resultados: Resultados = {
+        "repositorio.produtos.listar": medir(prod.listar, **opcoes),
+        "repositorio.produtos.listar_pagina[100]": medir(
+            lambda: prod.listar_pagina(100, apos=("M", 0)), **opcoes
+        ),
+        "repositorio.vendas.listar_pagina[100]": medir(
+            lambda: vendas.listar_pagina(100), **opcoes
+        ),
+        # Termo amplo (uma categoria, 1/7 do catálogo) e prefixo quase único
+        "repositorio.produtos.buscar[categoria]": medir(
+            lambda: prod.buscar("limp", 20), **opcoes
+        ),
+        "repositorio.produtos.buscar[prefixo]": medir(
+            lambda: prod.buscar(amostra, 20), **opcoes
+        ),
+        "repositorio.vendas.listar_por_produto": medir(
+            lambda: vendas.listar_por_produto(1), **opcoes
+        ),
+    }
+    if total_vendas <= LIMITE_LISTAR_VENDAS:
+        resultados["repositorio.vendas.listar"] = medir(
+            vendas.listar, repeticoes=min(repeticoes, 5), aquecimento=1,
+            tempo_maximo=tempo_maximo,
+        )  # fmt: skip
+    catalogo = CatalogoEmMemoria()
+    svc = OrquestradorDeFluxoComercial(conn, catalogo)
+    resultados["catalogo.paginar_produtos[100]"] = medir(
+        lambda: svc.paginar_produtos(100), **opcoes
+    )
+    return resultados
+
+
+def _ids_produtos(conn, n: int, semente: int) -> List[int]:
+    maior = conn.execute("SELECT MAX(id) FROM produtos").fetchone()[0]
+    rng = random.Random(semente)
+    return [rng.randint(1, maior) for _ in range(n)]
+
+
+# Com menos, o cenário de lote (vendas/10 carrinhos, 2 de aquecimento) fica sem amostras
+VENDAS_ESCRITA_MINIMO = 30
+
+
+def escrita(conn, *, vendas: int, semente: int) -> Resultados:
+    """Vendas reais (com commit): o banco medido cresce ``vendas`` + 5×``vendas/10``."""
+    svc = OrquestradorDeFluxoComercial(conn)
+    ids = iter(_ids_produtos(conn, vendas, semente))
+    resultados = {
+        "servicos.registrar_venda": medir(
+            lambda: svc.registrar_venda(next(ids), 1), repeticoes=vendas - 5, aquecimento=5
+        )
+    }
+    carrinhos = iter(
+        [list(zip(_ids_produtos(conn, 5, semente + i), [1] * 5)) for i in range(vendas // 10)]
+    )
+    resultados["servicos.registrar_vendas_lote[5]"] = medir(
+        lambda: svc.registrar_vendas_lote(next(carrinhos)),
+        repeticoes=vendas // 10 - 2,
+        aquecimento=2,
+    )
+    return resultados
+
+
+def api(
+    raiz: Path, ids: List[int], *, repeticoes: int, tempo_maximo: float
+) -> Resultados:
+    """Rotas HTTP por um cliente em processo (sem rede), com a pilha completa."""
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:  # FastAPI é opcional para a suíte
+        print("  (API ignorada: fastapi/httpx não instalados)")
+        return {}
+    # ``api.main`` abre ``data/mercado.sqlite3`` relativo ao diretório corrente
+    anterior = os.getcwd()
+    os.chdir(raiz)
+    try:
+        from api.main import app
+
+        resultados: Resultados = {}
+        opcoes = {"repeticoes": repeticoes, "tempo_maximo": tempo_maximo}
+        rotas = {
+            "GET /produtos": "/produtos?limit=100",
+            "GET /vendas": "/vendas?limit=100",
+            "GET /relatorios/receita": "/relatorios/receita",
+            "GET /relatorios/receita_por_dia": "/relatorios/receita_por_dia",
+            "GET /relatorios/ranking": "/relatorios/ranking?limit=10",
+            "GET /relatorios/giro": "/relatorios/giro?dias=30",
+        }
+        with TestClient(app) as cliente:
+
+            def chamar(url: str) -> Callable[[], Any]:
+                def _chamar() -> Any:
+                    r = cliente.get(url)
+                    if r.status_code != 200:
+                        raise RuntimeError(f"{url}: {r.status_code} {r.text[:200]}")
+                    return r
+
+                return _chamar
+
+            for nome, url in rotas.items():
+                resultados[f"api.{nome}"] = medir(chamar(url), **opcoes)
+            produtos = iter(ids)
+            resultados["api.POST /vendas"] = medir(
+                lambda: cliente.post(
+                    "/vendas", json={"produto_id": next(produtos), "quantidade": 1}
+                ),
+                **opcoes,
+            )
+        return resultados
+    finally:
+        os.chdir(anterior)
+
+
+def executar(
+    raiz: Path,
+    *,
+    grupos: Iterable[str],
+    repeticoes: int = 20,
+    tempo_maximo: float = 30.0,
+    vendas_escrita: int = 500,
+    semente: int = 42,
+) -> Resultados:
+    grupos = list(grupos)
+    if "escrita" in grupos and vendas_escrita < VENDAS_ESCRITA_MINIMO:
+        # Antes de medir os outros grupos, não depois
+        raise ValueError(f"vendas_escrita deve ser ao menos {VENDAS_ESCRITA_MINIMO}")
+    forja = ForjaDePersistencia(str(raiz / "data" / "mercado.sqlite3"))
+    if not forja.caminho.exists():
+        raise ValueError(f"Banco não encontrado: {forja.caminho} (rode 'gerar' antes)")
+    # Bancos gerados por versões anteriores recebem as tabelas novas
+    forja.criar_esquema()
+    resultados: Resultados = {}
+    conn = forja.conectar()
+    try:
+        for grupo in grupos:
+            print(f"- {grupo}")
+            if grupo == "relatorios":
+                resultados.update(
+                    relatorios(conn, repeticoes=repeticoes, tempo_maximo=tempo_maximo)
+                )
+            elif grupo == "listagens":
+                resultados.update(
+                    listagens(conn, repeticoes=repeticoes, tempo_maximo=tempo_maximo)
+                )
+            elif grupo == "colunar":
+                resultados.update(
+                    colunar(conn, raiz, repeticoes=repeticoes, tempo_maximo=tempo_maximo)
+                )
+            elif grupo == "escrita":
+                resultados.update(escrita(conn, vendas=vendas_escrita, semente=semente))
+            elif grupo == "api":
+                ids = _ids_produtos(conn, repeticoes + 2, semente + 1)
+                resultados.update(
+                    api(raiz, ids, repeticoes=repeticoes, tempo_maximo=tempo_maximo)
+                )
+            else:
+                raise ValueError(f"Grupo desconhecido: {grupo}")
+    finally:
+        conn.close()
+    return resultados
+
+
+# Leituras primeiro: as escritas acrescentam vendas ao banco medido
+GRUPOS = ("relatorios", "listagens", "api", "colunar", "escrita")
@@ -0,0 +1,226 @@
+"""Gerador determinístico de catálogo e vendas sintéticos para os benchmarks."""
+from __future__ import annotations
+
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Tuple
+
+from infra.forja_persistencia import (
+    ForjaDePersistencia,
+    preencher_vendas_diarias,
+    reconstruir_busca_produtos,
+    recriar_indices,
+    remover_indices,
+)
+
+_DIA = 86400
+# Peso de cada dia da semana (segunda = 0): fins de semana vendem mais
+_PESO_SEMANA = (0.9, 0.85, 0.9, 1.0, 1.2, 1.45, 1.1)
+# Distribuição das horas do dia: quase nada de madrugada, picos no almoço e à noite
+_PESO_HORA = (
+    0.1, 0.05, 0.05, 0.05, 0.05, 0.1, 0.3, 0.6, 0.9, 1.1, 1.3, 1.6,
+    1.9, 1.7, 1.3, 1.2, 1.3, 1.5, 1.9, 2.1, 1.8, 1.2, 0.6, 0.3,
+)  # fmt: skip
+_QUANTIDADES = (1, 2, 3, 4, 5, 10)
+_PESO_QUANTIDADE = (60, 20, 9, 5, 4, 2)
+
+
+@dataclass(frozen=True)
+class PerfilDeDados:
+    """Tamanho e forma do conjunto sintético.
+
+    ``assimetria`` é o expoente da lei de Zipf na popularidade dos produtos (1.0
+    concentra boa parte das vendas em poucos itens); ``crescimento`` é quanto o
+    volume diário do último dia supera o do primeiro.
+    """
+
+    produtos: int = 10_000
+    vendas: int = 1_000_000
+    dias: int = 730
+    fim: str = "2025-06-30"
+    semente: int = 42
+    assimetria: float = 1.07
+    crescimento: float = 0.6
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+PERFIS: Dict[str, PerfilDeDados] = {
+    "mini": PerfilDeDados(produtos=2_000, vendas=100_000, dias=365),
+    "pequeno": PerfilDeDados(),
+    "medio": PerfilDeDados(produtos=100_000, vendas=10_000_000, dias=1095),
+    "grande": PerfilDeDados(produtos=1_000_000, vendas=50_000_000, dias=1825),
+}
+
+
+@contextmanager
+def _sem_gatilhos(conn: sqlite3.Connection, tabela: str) -> Iterator[None]:
+    # A carga sintética recalcula resumo e contadores no fim, de uma vez
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=?",
+        (tabela,),
+    ).fetchall()
+    with conn:
+        for nome, _ in rows:
+            conn.execute(f'DROP TRIGGER IF EXISTS "{nome}"')
+    try:
+        yield
+    finally:
+        with conn:
+            for _, sql in rows:
+                conn.execute(sql)
+
+
+def _acumulado(pesos: List[float]) -> List[float]:
+    return list(accumulate(pesos))
+
+
+def _produtos(perfil: PerfilDeDados, rng: random.Random) -> Iterator[Tuple]:
+    categorias = ("Alimento", "Bebida", "Limpeza", "Higiene", "Papelaria", "Eletro", "Casa")
+    for i in range(perfil.produtos):
+        categoria = categorias[i % len(categorias)]
+        # Preços log-normais (mediana ~R$ 20, cauda até algumas centenas)
+        preco = round(min(rng.lognormvariate(3.0, 0.8), 5000.0), 2)
+        # Estoque folgado para que os benchmarks de escrita não esgotem produtos
+        yield (
+            f"{categoria} {rng.getrandbits(40):010x}",
+            f"Produto sintético {i}",
+            rng.randint(10_000, 1_000_000),
+            preco,
+        )
+
+
+def _vendas_por_dia(perfil: PerfilDeDados) -> List[Tuple[int, str, int]]:
+    """``(inicio_ts, dia_iso, quantidade_de_vendas)`` de cada dia do período."""
+    fim = date.fromisoformat(perfil.fim)
+    inicio = fim - timedelta(days=perfil.dias - 1)
+    base = (inicio - date(1970, 1, 1)).days * _DIA
+    dias, pesos = [], []
+    for d in range(perfil.dias):
+        dia = inicio + timedelta(days=d)
+        tendencia = 1.0 + perfil.crescimento * d / max(perfil.dias - 1, 1)
+        dias.append((base + d * _DIA, dia.isoformat()))
+        pesos.append(tendencia * _PESO_SEMANA[dia.weekday()])
+    # Maiores restos: as contagens somam exatamente ``perfil.vendas``
+    total = sum(pesos)
+    cotas = [perfil.vendas * p / total for p in pesos]
+    contagens = [int(c) for c in cotas]
+    sobra = perfil.vendas - sum(contagens)
+    for i in sorted(range(len(cotas)), key=lambda i: contagens[i] - cotas[i])[:sobra]:
+        contagens[i] += 1
+    return [(ts, texto, n) for (ts, texto), n in zip(dias, contagens)]
+
+
+def _vendas(
+    perfil: PerfilDeDados,
+    rng: random.Random,
+    precos: List[float],
+    ids: List[int],
+    lote: int,
+) -> Iterator[List[Tuple]]:
+    pop = _acumulado([1.0 / (r + 1) ** perfil.assimetria for r in range(len(ids))])
+    # A popularidade não segue a ordem de cadastro
+    ordem = list(range(len(ids)))
+    rng.shuffle(ordem)
+    horas = _acumulado(list(_PESO_HORA))
+    qtds = _acumulado(list(_PESO_QUANTIDADE))
+    linhas: List[Tuple] = []
+    # Dia a dia e em ordem de horário: os ids crescem com a data, como em produção
+    for inicio_dia, texto_dia, n in _vendas_por_dia(perfil):
+        do_dia = []
+        for idx, h, q in zip(
+            rng.choices(ordem, cum_weights=pop, k=n),
+            rng.choices(range(24), cum_weights=horas, k=n),
+            rng.choices(_QUANTIDADES, cum_weights=qtds, k=n),
+        ):
+            ts = inicio_dia + h * 3600 + rng.randrange(3600)
+            do_dia.append((ids[idx], q, ts, precos[idx]))
+        do_dia.sort(key=lambda r: r[2])
+        for produto_id, q, ts, preco in do_dia:
+            s = ts - inicio_dia
+            texto = f"{texto_dia}T{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}"
+            linhas.append((produto_id, q, texto, preco, ts))
+        if len(linhas) >= lote:
+            yield linhas
+            linhas = []
+    if linhas:
+        yield linhas
+
+
+def gerar(
+    forja: ForjaDePersistencia,
+    perfil: PerfilDeDados,
+    *,
+    tamanho_lote: int = 50_000,
+    progresso: bool = False,
+) -> Dict[str, Any]:
+    """Cria um banco novo com o perfil pedido; devolve tempos e contagens.
+
+    Índices e gatilhos são suspensos durante a carga e o resumo ``vendas_diarias``
+    é reconstruído no fim, então o banco resultante é idêntico ao de uma carga
+    feita pela aplicação (exceto pela versão de catálogo das linhas).
+    """
+    if forja.caminho.exists():
+        raise ValueError(f"Banco já existe: {forja.caminho}")
+    forja.caminho.parent.mkdir(parents=True, exist_ok=True)
+    forja.criar_esquema()
+    rng = random.Random(perfil.semente)
+    inicio = time.perf_counter()
+    conn = forja.conectar()
+    try:
+        with _sem_gatilhos(conn, "produtos"), _sem_gatilhos(conn, "vendas"):
+            ddl_prod = remover_indices(conn, "produtos")
+            ddl_vendas = remover_indices(conn, "vendas")
+            with conn:
+                conn.executemany(
+                    "INSERT INTO produtos (nome, descricao, quantidade_disponivel, preco) "
+                    "VALUES (?, ?, ?, ?)",
+                    _produtos(perfil, rng),
+                )
+            ids, precos = [], []
+            for pid, preco in conn.execute("SELECT id, preco FROM produtos ORDER BY id"):
+                ids.append(pid)
+                precos.append(preco)
+            inseridas = 0
+            for linhas in _vendas(perfil, rng, precos, ids, tamanho_lote):
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO vendas (produto_id, quantidade, data_venda, "
+                        "preco_unitario, data_venda_ts) VALUES (?, ?, ?, ?, ?)",
+                        linhas,
+                    )
+                inseridas += len(linhas)
+                if progresso:
+                    print(f"\r  vendas: {inseridas}/{perfil.vendas}", end="", flush=True)
+            if progresso:
+                print()
+            recriar_indices(conn, ddl_prod + ddl_vendas)
+            with conn:
+                preencher_vendas_diarias(conn)
+                reconstruir_busca_produtos(conn)
+                conn.execute(
+                    "UPDATE controle_versao SET versao = versao + 1 "
+                    "WHERE chave IN ('dados', 'catalogo_recarga')"
+                )
+        conn.execute("ANALYZE;")
+    finally:
+        conn.close()
+    return {
+        "perfil": perfil.como_dict(),
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "bytes": forja.caminho.stat().st_size,
+    }
+
+
+def intervalo_de_datas(conn: sqlite3.Connection) -> Tuple[date, date]:
+    """Primeiro e último dia com vendas (para montar as janelas dos relatórios)."""
+    row = conn.execute("SELECT MIN(dia), MAX(dia) FROM vendas_diarias").fetchone()
+    if row[0] is None:
+        raise ValueError("Banco sem vendas; gere os dados antes")
+    return date.fromisoformat(row[0]), date.fromisoformat(row[1])
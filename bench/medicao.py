@@ -0,0 +1,123 @@
+"""Medição de latência, resumo em percentis e comparação com a linha de base."""
+from __future__ import annotations
+
+import gc
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil pelo posto mais próximo (``p`` em 0..100) de amostras ordenadas."""
+    if not ordenadas:
+        raise ValueError("Sem amostras")
+    posto = max(1, math.ceil(p / 100 * len(ordenadas)))
+    return ordenadas[posto - 1]
+
+
+def resumir(amostras_s: List[float]) -> Dict[str, float]:
+    """Estatísticas em milissegundos de uma lista de durações em segundos."""
+    ms = sorted(a * 1000 for a in amostras_s)
+    total = sum(ms)
+    return {
+        "n": len(ms),
+        "p50": round(percentil(ms, 50), 4),
+        "p95": round(percentil(ms, 95), 4),
+        "p99": round(percentil(ms, 99), 4),
+        "media": round(total / len(ms), 4),
+        "min": round(ms[0], 4),
+        "max": round(ms[-1], 4),
+        "ops_por_segundo": round(len(ms) / (total / 1000), 2) if total else 0.0,
+    }
+
+
+def medir(
+    func: Callable[[], Any],
+    *,
+    repeticoes: int = 20,
+    aquecimento: int = 2,
+    tempo_maximo: Optional[float] = None,
+) -> Dict[str, float]:
+    """Executa ``func`` repetidas vezes e resume as latências.
+
+    O coletor de lixo fica desligado durante as medições para não misturar suas
+    pausas ao tempo da função; ``tempo_maximo`` (s) encerra cedo as funções lentas,
+    mantendo ao menos uma amostra.
+    """
+    for _ in range(aquecimento):
+        func()
+    amostras: List[float] = []
+    ligado = gc.isenabled()
+    gc.disable()
+    inicio = time.perf_counter()
+    try:
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            func()
+            amostras.append(time.perf_counter() - t0)
+            if tempo_maximo is not None and time.perf_counter() - inicio > tempo_maximo:
+                break
+    finally:
+        if ligado:
+            gc.enable()
+    return resumir(amostras)
+
+
+@dataclass(frozen=True)
+class Regressao:
+    nome: str
+    metrica: str
+    base: float
+    atual: float
+
+    @property
+    def variacao(self) -> float:
+        return (self.atual - self.base) / self.base if self.base else math.inf
+
+    def __str__(self) -> str:
+        return (
+            f"{self.nome} [{self.metrica}]: {self.base:.3f} ms -> {self.atual:.3f} ms "
+            f"({self.variacao:+.0%})"
+        )
+
+
+def comparar(
+    atual: Dict[str, Any],
+    base: Dict[str, Any],
+    *,
+    tolerancia: float = 0.25,
+    piso_ms: float = 0.5,
+    metricas: tuple = ("p50", "p95"),
+) -> List[Regressao]:
+    """Lista os benchmarks que pioraram além de ``tolerancia`` (fração) na base.
+
+    Diferenças absolutas abaixo de ``piso_ms`` são ruído de relógio e não contam.
+    Benchmarks ausentes em um dos lados são ignorados (novos ou removidos).
+    """
+    regressoes = []
+    res_base = base.get("resultados", {})
+    for nome, medida in atual.get("resultados", {}).items():
+        referencia = res_base.get(nome)
+        if not referencia:
+            continue
+        for metrica in metricas:
+            if metrica not in medida or metrica not in referencia:
+                continue
+            antes, agora = float(referencia[metrica]), float(medida[metrica])
+            if agora - antes > piso_ms and agora > antes * (1 + tolerancia):
+                regressoes.append(Regressao(nome, metrica, antes, agora))
+    return regressoes
+
+
+def salvar(resultado: Dict[str, Any], caminho: str | Path) -> None:
+    Path(caminho).write_text(
+        json.dumps(resultado, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def carregar(caminho: str | Path) -> Dict[str, Any]:
+    return json.loads(Path(caminho).read_text(encoding="utf-8"))
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Dict, Iterable, Sequence
 
 
-@dataclass
+@dataclass(slots=True)
 class Produto:
     """Entidade de domínio para o catálogo de produtos."""
 
@@ -22,8 +24,21 @@ class Produto:
         if self.preco < 0:
             raise ValueError("Preço não pode ser negativo")
 
+    @classmethod
+    def hidratar(
+        cls, id: int, nome: str, descricao: str, quantidade_disponivel: int, preco: float
+    ) -> Produto:
+        """Constrói sem validar; para linhas lidas do banco, já íntegras pelo esquema."""
+        produto = object.__new__(cls)
+        produto.id = id
+        produto.nome = nome
+        produto.descricao = descricao
+        produto.quantidade_disponivel = quantidade_disponivel
+        produto.preco = preco
+        return produto
 
-@dataclass
+
+@dataclass(slots=True)
 class Venda:
     """Entidade de domínio para o registro de vendas."""
 
@@ -37,3 +52,60 @@ class Venda:
             raise ValueError("Venda deve referenciar um produto válido")
         if self.quantidade <= 0:
             raise ValueError("Quantidade vendida deve ser positiva")
+
+    @classmethod
+    def hidratar(cls, id: int, produto_id: int, quantidade: int, data_venda: datetime) -> Venda:
+        """Constrói sem validar; para linhas lidas do banco, já íntegras pelo esquema."""
+        venda = object.__new__(cls)
+        venda.id = id
+        venda.produto_id = produto_id
+        venda.quantidade = quantidade
+        venda.data_venda = data_venda
+        return venda
+
+
+@dataclass(slots=True)
+class VendasBatch:
+    """Vendas em colunas (arrays tipados) para leituras analíticas e em massa.
+
+    Cada venda ocupa 40 bytes (cinco valores de 8 bytes), sem objeto por linha.
+    ``datas_ts`` é epoch UTC em segundos e ``precos`` o preço unitário efetivo.
+    """
+
+    ids: array = field(default_factory=lambda: array("q"))
+    produto_ids: array = field(default_factory=lambda: array("q"))
+    quantidades: array = field(default_factory=lambda: array("q"))
+    datas_ts: array = field(default_factory=lambda: array("q"))
+    precos: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def anexar(self, linhas: Sequence[tuple]) -> None:
+        """Acrescenta linhas ``(id, produto_id, quantidade, data_venda_ts, preco)``."""
+        if not linhas:
+            return
+        ids, produtos, qtds, datas, precos = zip(*linhas)
+        self.ids.extend(ids)
+        self.produto_ids.extend(produtos)
+        self.quantidades.extend(qtds)
+        self.datas_ts.extend(datas)
+        self.precos.extend(precos)
+
+    def receitas(self) -> Iterable[float]:
+        return map(float.__mul__, map(float, self.quantidades), self.precos)
+
+    def como_numpy(self) -> Dict[str, Any]:
+        """Visões NumPy sem cópia sobre os buffers das colunas (requer numpy).
+
+        Enquanto as visões existirem, o lote não pode receber novas linhas.
+        """
+        import numpy as np
+
+        return {
+            "ids": np.frombuffer(self.ids, dtype=np.int64),
+            "produto_ids": np.frombuffer(self.produto_ids, dtype=np.int64),
+            "quantidades": np.frombuffer(self.quantidades, dtype=np.int64),
+            "datas_ts": np.frombuffer(self.datas_ts, dtype=np.int64),
+            "precos": np.frombuffer(self.precos, dtype=np.float64),
+        }
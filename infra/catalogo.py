@@ -0,0 +1,190 @@
+"""Catálogo de produtos em memória, mantido por write-through e versões do banco."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from bisect import bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from domain.modelos import Produto
+from infra import json_sqlite
+from infra.forja_persistencia import versao_catalogo
+
+# Item de GET /produtos (ProdutoOut) montado pelo SQLite
+PRODUTO_JSON = json_sqlite.objeto(
+    id="id",
+    nome="nome",
+    descricao="descricao",
+    quantidade_disponivel="quantidade_disponivel",
+    preco=json_sqlite.real("preco"),
+)
+
+# Linha como gravada/lida do banco: (id, nome, descricao, quantidade, preco, versao, json)
+LinhaCatalogo = Tuple[int, str, str, int, float, int, str]
+
+COLUNAS_CATALOGO = (
+    f"id, nome, descricao, quantidade_disponivel, preco, versao_catalogo, {PRODUTO_JSON}"
+)
+
+
+class CatalogoEmMemoria:
+    """Produtos indexados por id e por ``(nome, id)``, compartilhados entre threads.
+
+    É populado na primeira leitura. Escritas feitas por ``RepositorioProdutoSQL``
+    com este catálogo entram em memória logo após o commit (write-through); as
+    demais (vendas, importações, outros workers) são percebidas pelo contador
+    ``catalogo`` de ``controle_versao`` e recarregadas por diferença, só as linhas
+    com ``versao_catalogo`` maior que a conhecida. Exclusões forçam recarga completa.
+
+    Os ``Produto`` devolvidos são compartilhados: trate-os como somente leitura.
+    Cada produto guarda também o seu JSON, montado pelo SQLite na mesma leitura,
+    para que ``pagina_json`` só concatene texto.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._por_id: Dict[int, Tuple[Produto, int, str]] = {}
+        self._chaves: List[Tuple[str, int]] = []
+        self._versao = -1
+        self._recarga = -1
+        self.recargas_completas = 0
+        self.recargas_parciais = 0
+        self.linhas_recarregadas = 0
+        self.escritas_diretas = 0
+
+    # Sincronização com o banco
+    def sincronizar(self, conn: sqlite3.Connection) -> None:
+        """Alinha a memória com o banco; custa uma consulta se nada mudou."""
+        versao, recarga = versao_catalogo(conn)
+        if versao == self._versao and recarga == self._recarga:
+            return
+        with self._lock:
+            if recarga != self._recarga or self._versao < 0:
+                self._carregar_tudo(conn)
+            elif versao > self._versao:
+                self._carregar_desde(conn, self._versao)
+            # Linhas com versão <= ``versao`` já estavam confirmadas quando o
+            # contador foi lido, então nenhuma ficou para trás
+            self._versao = max(self._versao, versao)
+            self._recarga = recarga
+
+    def _carregar_tudo(self, conn: sqlite3.Connection) -> None:
+        cur = conn.cursor()
+        cur.row_factory = None
+        linhas = cur.execute(f"SELECT {COLUNAS_CATALOGO} FROM produtos").fetchall()
+        self._por_id = {}
+        for linha in linhas:
+            self._por_id[int(linha[0])] = (
+                Produto.hidratar(*linha[:5]),
+                int(linha[5]),
+                linha[6],
+            )
+        self._chaves = sorted((p.nome, i) for i, (p, _, _) in self._por_id.items())
+        self._versao = -1
+        self.recargas_completas += 1
+        self.linhas_recarregadas += len(linhas)
+
+    def _carregar_desde(self, conn: sqlite3.Connection, versao: int) -> None:
+        cur = conn.cursor()
+        cur.row_factory = None
+        linhas = cur.execute(
+            f"SELECT {COLUNAS_CATALOGO} FROM produtos WHERE versao_catalogo > ?", (versao,)
+        ).fetchall()
+        for linha in linhas:
+            self._aplicar(linha)
+        self.recargas_parciais += 1
+        self.linhas_recarregadas += len(linhas)
+
+    def _aplicar(self, linha: Iterable[Any]) -> None:
+        produto_id, nome, descricao, quantidade, preco, versao, texto = linha
+        atual = self._por_id.get(int(produto_id))
+        if atual is not None:
+            if atual[1] >= versao:
+                return
+            if atual[0].nome != nome:
+                self._chaves.pop(bisect_right(self._chaves, (atual[0].nome, produto_id)) - 1)
+                insort(self._chaves, (nome, int(produto_id)))
+        else:
+            insort(self._chaves, (nome, int(produto_id)))
+        produto = Produto.hidratar(produto_id, nome, descricao, quantidade, preco)
+        self._por_id[int(produto_id)] = (produto, int(versao), texto)
+
+    def confirmar(
+        self, linhas: List[LinhaCatalogo], antes: Optional[int], depois: Optional[int]
+    ) -> None:
+        """Aplica as linhas gravadas por uma transação já confirmada.
+
+        ``antes``/``depois`` são a versão do catálogo no início e no fim da
+        transação. Se as linhas cobrem todo o intervalo e a memória estava em
+        ``antes``, a versão avança sem nova consulta; do contrário a próxima
+        ``sincronizar`` busca o que faltou.
+        """
+        with self._lock:
+            if self._versao < 0:
+                return
+            for linha in linhas:
+                self._aplicar(linha)
+            self.escritas_diretas += len(linhas)
+            if (
+                antes is not None
+                and depois is not None
+                and self._versao == antes
+                and depois - antes == len({linha[5] for linha in linhas})
+            ):
+                self._versao = depois
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._versao = -1
+            self._recarga = -1
+
+    # Leitura
+    def obter(self, conn: sqlite3.Connection, produto_id: int) -> Optional[Produto]:
+        self.sincronizar(conn)
+        entrada = self._por_id.get(int(produto_id))
+        return entrada[0] if entrada else None
+
+    def listar(self, conn: sqlite3.Connection) -> List[Produto]:
+        self.sincronizar(conn)
+        with self._lock:
+            return [self._por_id[i][0] for _, i in self._chaves]
+
+    def pagina(
+        self,
+        conn: sqlite3.Connection,
+        limite: int,
+        *,
+        apos: Optional[Tuple[str, int]] = None,
+    ) -> List[Produto]:
+        """Mesma ordem e semântica de ``RepositorioProdutoSQL.listar_pagina``."""
+        self.sincronizar(conn)
+        with self._lock:
+            inicio = bisect_right(self._chaves, (apos[0], int(apos[1]))) if apos else 0
+            chaves = self._chaves[inicio : inicio + int(limite)]
+            return [self._por_id[i][0] for _, i in chaves]
+
+    def pagina_json(
+        self,
+        conn: sqlite3.Connection,
+        limite: int,
+        *,
+        apos: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[str, Optional[Tuple[str, int]]]:
+        """Mesma semântica de ``RepositorioProdutoSQL.listar_pagina_json``."""
+        self.sincronizar(conn)
+        with self._lock:
+            inicio = bisect_right(self._chaves, (apos[0], int(apos[1]))) if apos else 0
+            chaves = self._chaves[inicio : inicio + int(limite) + 1]
+            itens = "[" + ",".join(self._por_id[i][2] for _, i in chaves[:limite]) + "]"
+        return itens, (chaves[limite - 1] if len(chaves) > limite else None)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "produtos": len(self._por_id),
+                "versao": self._versao,
+                "recargas_completas": self.recargas_completas,
+                "recargas_parciais": self.recargas_parciais,
+                "linhas_recarregadas": self.linhas_recarregadas,
+                "escritas_diretas": self.escritas_diretas,
+            }
@@ -0,0 +1,231 @@
+"""Snapshot colunar de vendas em disco, lido por mapeamento de memória.
+
+Cada coluna de ``VendasBatch`` vira um arquivo binário de largura fixa
+(``<coluna>.bin``); ``manifesto.json`` guarda os tipos, o número de linhas válidas
+e o maior ``id`` exportado, e ``produtos.json`` os nomes dos produtos. A
+atualização incremental só acrescenta vendas com ``id`` maior que o do manifesto;
+as colunas crescem primeiro e o manifesto é trocado por último (``os.replace``),
+então um leitor nunca enxerga linhas pela metade.
+
+O preço é ``vendas.preco_unitario``, o gravado com cada venda (o repositório
+grava o do produto quando a venda não traz um), como no resumo ``vendas_diarias``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from domain.modelos import VendasBatch
+from infra.particoes import fontes_de_vendas
+
+FORMATO = 1
+_ORDEM = "<" if sys.byteorder == "little" else ">"
+# Coluna de VendasBatch -> tipo NumPy gravado (o mesmo do array em memória)
+COLUNAS = {
+    "ids": _ORDEM + "i8",
+    "produto_ids": _ORDEM + "i8",
+    "quantidades": _ORDEM + "i8",
+    "datas_ts": _ORDEM + "i8",
+    "precos": _ORDEM + "f8",
+}
+MANIFESTO = "manifesto.json"
+PRODUTOS = "produtos.json"
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _gravar_json(caminho: Path, dados: Any) -> None:
+    # Escreve ao lado e troca: quem lê vê o arquivo antigo ou o novo, inteiro
+    tmp = caminho.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, caminho)
+
+
+def _lotes(
+    conn: sqlite3.Connection, apos_id: int, tamanho_lote: int
+) -> Iterator[VendasBatch]:
+    q = (
+        "SELECT v.id, v.produto_id, v.quantidade, v.data_venda_ts, v.preco_unitario "
+        "FROM {vendas} v WHERE v.id > ? ORDER BY v.id"
+    )
+    with fontes_de_vendas(conn) as fontes:
+        for fonte in fontes:
+            cur = conn.cursor()
+            cur.row_factory = None
+            cur.execute(q.format(vendas=fonte.tabela), (int(apos_id),))
+            try:
+                while True:
+                    linhas = cur.fetchmany(tamanho_lote)
+                    if not linhas:
+                        break
+                    lote = VendasBatch()
+                    lote.anexar(linhas)
+                    yield lote
+            finally:
+                cur.close()
+
+
+def _acrescentar(
+    conn: sqlite3.Connection, diretorio: Path, manifesto: Dict[str, Any], tamanho_lote: int
+) -> int:
+    arquivos = {
+        nome: open(diretorio / f"{nome}.bin", "r+b" if manifesto["linhas"] else "wb")
+        for nome in COLUNAS
+    }
+    try:
+        for nome, f in arquivos.items():
+            # Descarta o que uma atualização interrompida tenha deixado além do manifesto
+            f.truncate(manifesto["linhas"] * np.dtype(COLUNAS[nome]).itemsize)
+            f.seek(0, os.SEEK_END)
+        novas = 0
+        for lote in _lotes(conn, manifesto["ultimo_id"], tamanho_lote):
+            for nome, f in arquivos.items():
+                getattr(lote, nome).tofile(f)
+            datas = np.frombuffer(lote.datas_ts, dtype=np.int64)
+            if manifesto["ordenado_por_ts"] and (
+                datas[0] < manifesto["ts_max"] or bool(np.any(datas[1:] < datas[:-1]))
+            ):
+                manifesto["ordenado_por_ts"] = False
+            manifesto["ts_min"] = min(manifesto["ts_min"], int(datas.min()))
+            manifesto["ts_max"] = max(manifesto["ts_max"], int(datas.max()))
+            manifesto["ultimo_id"] = max(manifesto["ultimo_id"], max(lote.ids))
+            novas += len(lote)
+        for f in arquivos.values():
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        for f in arquivos.values():
+            f.close()
+    manifesto["linhas"] += novas
+    return novas
+
+
+def _manifesto_vazio() -> Dict[str, Any]:
+    return {
+        "formato": FORMATO,
+        "colunas": dict(COLUNAS),
+        "linhas": 0,
+        "ultimo_id": 0,
+        "ordenado_por_ts": True,
+        "ts_min": 2**62,
+        "ts_max": -(2**62),
+        "gerado_em": _agora(),
+    }
+
+
+def atualizar_snapshot(
+    conn: sqlite3.Connection,
+    diretorio: str | Path,
+    *,
+    completo: bool = False,
+    tamanho_lote: int = 50000,
+) -> Dict[str, Any]:
+    """Cria ou atualiza o snapshot em ``diretorio`` e devolve o manifesto.
+
+    Sem snapshot (ou com ``completo``) exporta tudo num diretório temporário e o
+    troca pelo atual ao final; caso contrário acrescenta só as vendas novas.
+    O manifesto devolvido traz ``novas`` com as linhas acrescentadas agora.
+    """
+    diretorio = Path(diretorio)
+    existente = diretorio / MANIFESTO
+    if not completo and existente.exists():
+        manifesto = json.loads(existente.read_text(encoding="utf-8"))
+        if manifesto.get("formato") != FORMATO or manifesto.get("colunas") != COLUNAS:
+            raise ValueError(f"Snapshot em {diretorio} tem outro formato; use completo=True")
+        destino = diretorio
+    else:
+        manifesto = _manifesto_vazio()
+        destino = diretorio.with_name(diretorio.name + ".novo")
+        shutil.rmtree(destino, ignore_errors=True)
+        destino.mkdir(parents=True)
+
+    novas = _acrescentar(conn, destino, manifesto, tamanho_lote)
+    nomes = {
+        str(r[0]): r[1] for r in conn.execute("SELECT id, nome FROM produtos").fetchall()
+    }
+    _gravar_json(destino / PRODUTOS, nomes)
+    manifesto["atualizado_em"] = _agora()
+    _gravar_json(destino / MANIFESTO, manifesto)
+
+    if destino != diretorio:
+        antigo = diretorio.with_name(diretorio.name + ".antigo")
+        shutil.rmtree(antigo, ignore_errors=True)
+        if diretorio.exists():
+            diretorio.rename(antigo)
+        destino.rename(diretorio)
+        shutil.rmtree(antigo, ignore_errors=True)
+    return {**manifesto, "novas": novas}
+
+
+@dataclass
+class SnapshotColunar:
+    """Snapshot aberto: colunas como ``np.memmap`` somente leitura (sem cópia).
+
+    O número de linhas vem do manifesto lido na abertura; bytes acrescentados
+    depois por uma atualização em andamento ficam de fora até reabrir.
+    """
+
+    diretorio: Path
+    manifesto: Dict[str, Any]
+    colunas: Dict[str, np.ndarray]
+    nomes: Dict[int, str]
+
+    @classmethod
+    def abrir(cls, diretorio: str | Path) -> SnapshotColunar:
+        diretorio = Path(diretorio)
+        caminho = diretorio / MANIFESTO
+        if not caminho.exists():
+            raise ValueError(f"Snapshot não encontrado em {diretorio}")
+        manifesto = json.loads(caminho.read_text(encoding="utf-8"))
+        if manifesto.get("formato") != FORMATO:
+            raise ValueError(f"Formato de snapshot não suportado: {manifesto.get('formato')}")
+        linhas = int(manifesto["linhas"])
+        colunas = {}
+        for nome, tipo in manifesto["colunas"].items():
+            if linhas:
+                colunas[nome] = np.memmap(
+                    diretorio / f"{nome}.bin", dtype=tipo, mode="r", shape=(linhas,)
+                )
+            else:
+                colunas[nome] = np.empty(0, dtype=tipo)
+        nomes = json.loads((diretorio / PRODUTOS).read_text(encoding="utf-8"))
+        return cls(diretorio, manifesto, colunas, {int(k): v for k, v in nomes.items()})
+
+    def __len__(self) -> int:
+        return int(self.manifesto["linhas"])
+
+    def intervalo(
+        self, inicio_ts: Optional[int] = None, fim_ts: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """Colunas restritas a ``[inicio_ts, fim_ts]``.
+
+        Com o snapshot em ordem de data (o caso comum) é uma fatia por busca
+        binária, sem cópia; senão, uma máscara booleana.
+        """
+        if inicio_ts is None and fim_ts is None:
+            return self.colunas
+        datas = self.colunas["datas_ts"]
+        if self.manifesto["ordenado_por_ts"]:
+            a = 0 if inicio_ts is None else int(np.searchsorted(datas, inicio_ts, "left"))
+            b = len(datas) if fim_ts is None else int(np.searchsorted(datas, fim_ts, "right"))
+            return {nome: col[a:b] for nome, col in self.colunas.items()}
+        mascara = np.ones(len(datas), dtype=bool)
+        if inicio_ts is not None:
+            mascara &= datas >= inicio_ts
+        if fim_ts is not None:
+            mascara &= datas <= fim_ts
+        return {nome: col[mascara] for nome, col in self.colunas.items()}
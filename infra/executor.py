@@ -0,0 +1,136 @@
+"""Executor dedicado ao SQLite para a camada assíncrona."""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, TypeVar
+
+from infra.forja_persistencia import ForjaDePersistencia
+
+T = TypeVar("T")
+_PADRAO: Any = object()
+
+
+class ExecutorDeBanco:
+    """Pool de threads próprio com uma conexão fixa por thread.
+
+    Tira o trabalho de banco do threadpool compartilhado do Starlette. Cada
+    chamada pode ter um tempo limite; ao estourar (ou se a requisição for
+    cancelada) a consulta em andamento é abortada com ``Connection.interrupt``.
+
+    Com ``limite_so_na_fila`` o tempo limite e o cancelamento valem só enquanto a
+    chamada espera por uma thread; depois de iniciada ela roda até o fim. É o
+    modo das escritas: abortar uma delas pode chegar depois do ``COMMIT``, e o
+    cliente receberia erro de algo gravado (e, repetindo, gravaria de novo).
+    """
+
+    def __init__(
+        self,
+        forja: ForjaDePersistencia,
+        *,
+        max_threads: int = 4,
+        timeout: Optional[float] = None,
+        limite_so_na_fila: bool = False,
+        nome: str = "db",
+    ) -> None:
+        self._forja = forja
+        self._timeout = timeout
+        self._limite_so_na_fila = limite_so_na_fila
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix=nome)
+        self._local = threading.local()
+        self._conexoes: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Usada só pela própria thread; check_same_thread=False apenas para
+            # permitir fechar todas no encerramento
+            conn = self._forja.conectar(check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._conexoes.append(conn)
+        return conn
+
+    async def executar(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = _PADRAO,
+        **kwargs: Any,
+    ) -> T:
+        """Roda ``func(conn, *args, **kwargs)`` numa thread do executor.
+
+        Sem ``timeout`` vale o padrão do executor; ``timeout=None`` não limita.
+        """
+        estado: dict = {"conn": None, "cancelado": False, "iniciada": False}
+        trava = threading.Lock()
+        loop = asyncio.get_running_loop()
+        iniciada = asyncio.Event()
+
+        def tarefa() -> T:
+            conn = self._conexao()
+            with trava:
+                if estado["cancelado"]:
+                    raise asyncio.CancelledError()
+                estado["conn"] = conn
+                estado["iniciada"] = True
+            loop.call_soon_threadsafe(iniciada.set)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                with trava:
+                    estado["conn"] = None
+                if conn.in_transaction:
+                    conn.rollback()
+
+        def interromper() -> None:
+            with trava:
+                estado["cancelado"] = True
+                if estado["conn"] is not None:
+                    estado["conn"].interrupt()
+
+        def desistir_se_na_fila() -> bool:
+            with trava:
+                if not estado["iniciada"]:
+                    estado["cancelado"] = True
+                return estado["cancelado"]
+
+        futuro = loop.run_in_executor(self._executor, tarefa)
+        limite = self._timeout if timeout is _PADRAO else timeout
+        if self._limite_so_na_fila:
+            try:
+                if limite is not None:
+                    espera = loop.create_task(iniciada.wait())
+                    try:
+                        await asyncio.wait(
+                            {espera, futuro}, timeout=limite, return_when=asyncio.FIRST_COMPLETED
+                        )
+                    finally:
+                        espera.cancel()
+                    if not futuro.done() and desistir_se_na_fila():
+                        futuro.cancel()
+                        raise TimeoutError("Tempo limite na fila de escrita excedido")
+                # Iniciada, a chamada vai até o fim, mesmo se a requisição for cancelada
+                return await asyncio.shield(futuro)
+            except asyncio.CancelledError:
+                if desistir_se_na_fila():
+                    futuro.cancel()
+                raise
+        try:
+            return await asyncio.wait_for(futuro, limite)
+        except asyncio.TimeoutError:
+            interromper()
+            raise TimeoutError("Tempo limite da consulta excedido") from None
+        except asyncio.CancelledError:
+            interromper()
+            raise
+
+    def encerrar(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for conn in self._conexoes:
+                conn.close()
+            self._conexoes.clear()
@@ -1,7 +1,167 @@
 from __future__ import annotations
 
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from infra.metricas import ConexaoInstrumentada, RegistroDeMetricas
+
+
+@dataclass(frozen=True)
+class PragmasDeConexao:
+    """Pragmas aplicados a cada conexão aberta pela forja.
+
+    Os valores padrão favorecem leituras concorrentes (WAL) e reduzem fsyncs
+    sem abrir mão da durabilidade entre checkpoints.
+    """
+
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    cache_size: int = -16000  # negativo = KiB (~16 MiB por conexão)
+    mmap_size: int = 256 * 1024 * 1024
+    busy_timeout: int = 5000  # ms
+    temp_store: str = "MEMORY"
+
+    def comandos(self) -> List[str]:
+        return [
+            f"PRAGMA journal_mode = {self.journal_mode};",
+            f"PRAGMA synchronous = {self.synchronous};",
+            f"PRAGMA cache_size = {int(self.cache_size)};",
+            f"PRAGMA mmap_size = {int(self.mmap_size)};",
+            f"PRAGMA busy_timeout = {int(self.busy_timeout)};",
+            f"PRAGMA temp_store = {self.temp_store};",
+        ]
+
+
+@contextmanager
+def transacao_imediata(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Transação com ``BEGIN IMMEDIATE``: o lock de escrita é obtido no início.
+
+    Evita a corrida leitura-depois-escrita entre processos que compartilham o
+    arquivo. Se já houver transação aberta na conexão, apenas participa dela.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def preencher_vendas_diarias(conn: sqlite3.Connection) -> None:
+    """Recalcula ``vendas_diarias`` a partir de ``vendas`` (sem abrir transação).
+
+    Os dias de meses arquivados (``particoes_vendas``) são preservados: essas
+    vendas não estão mais em ``vendas`` e o mês fechado não muda.
+    """
+    conn.execute(
+        "DELETE FROM vendas_diarias "
+        "WHERE substr(dia, 1, 7) NOT IN (SELECT mes FROM particoes_vendas);"
+    )
+    conn.execute(
+        """
+        INSERT INTO vendas_diarias (dia, produto_id, qtd, receita)
+        SELECT COALESCE(DATE(v.data_venda_ts, 'unixepoch'), DATE(v.data_venda)) AS dia,
+               v.produto_id,
+               SUM(v.quantidade),
+               SUM(v.quantidade * v.preco_unitario)
+        FROM vendas v
+        GROUP BY dia, v.produto_id
+        HAVING dia IS NOT NULL;
+        """
+    )
+
+
+def busca_de_produtos_disponivel(conn: sqlite3.Connection) -> bool:
+    """Se o banco tem o índice FTS5 ``produtos_busca`` (ausente em builds sem FTS5)."""
+    return bool(
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='produtos_busca'"
+        ).fetchone()
+    )
+
+
+def reconstruir_busca_produtos(conn: sqlite3.Connection) -> None:
+    """Refaz ``produtos_busca`` a partir de ``produtos`` (sem abrir transação)."""
+    if busca_de_produtos_disponivel(conn):
+        conn.execute("INSERT INTO produtos_busca (produtos_busca) VALUES ('rebuild');")
+
+
+def versao_dados(conn: sqlite3.Connection) -> int:
+    """Versão corrente dos dados; muda a cada escrita em ``vendas`` ou ``produtos``."""
+    row = conn.execute("SELECT versao FROM controle_versao WHERE chave = 'dados'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def incrementar_versao_dados(conn: sqlite3.Connection) -> None:
+    """Invalida os caches de relatórios após escritas que os triggers não veem.
+
+    Os triggers cobrem ``vendas`` e ``produtos``; reescritas diretas do resumo
+    (reconstrução, migrações) chamam isto na mesma transação.
+    """
+    conn.execute("UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'dados'")
+
+
+def versao_catalogo(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """Versões ``(catalogo, recarga)``: a primeira muda a cada produto inserido ou
+    alterado; a segunda só em exclusões, que exigem recarregar o catálogo inteiro."""
+    rows = dict(
+        conn.execute(
+            "SELECT chave, versao FROM controle_versao "
+            "WHERE chave IN ('catalogo', 'catalogo_recarga')"
+        ).fetchall()
+    )
+    return int(rows.get("catalogo", 0)), int(rows.get("catalogo_recarga", 0))
+
+
+_CREATE_INDEX = re.compile(r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(?!IF\s)", re.IGNORECASE)
+
+
+def remover_indices(conn: sqlite3.Connection, tabela: str) -> List[str]:
+    """Remove os índices ``idx_*`` da tabela e devolve o DDL para recriá-los.
+
+    Útil em cargas em massa: inserir sem índices e reconstruí-los depois é bem
+    mais barato que manter cada índice atualizado linha a linha. O DDL fica
+    também em ``indices_pendentes``, na mesma transação dos ``DROP``: se o
+    processo morrer antes de ``recriar_indices``, ``criar_esquema`` os recria.
+    """
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type='index' AND tbl_name=? AND name LIKE 'idx\\_%' ESCAPE '\\'",
+        (tabela,),
+    ).fetchall()
+    # IF NOT EXISTS: quem recriar primeiro (a carga ou uma partida) vence sem erro
+    ddls = [(nome, _CREATE_INDEX.sub(r"CREATE \1INDEX IF NOT EXISTS ", sql)) for nome, sql in rows]
+    with conn:
+        for nome, ddl in ddls:
+            conn.execute(
+                "INSERT OR REPLACE INTO indices_pendentes (nome, ddl) VALUES (?, ?)", (nome, ddl)
+            )
+            conn.execute(f'DROP INDEX IF EXISTS "{nome}"')
+    return [ddl for _, ddl in ddls]
+
+
+def recriar_indices(conn: sqlite3.Connection, ddls: List[str]) -> None:
+    with conn:
+        for ddl in ddls:
+            conn.execute(ddl)
+            conn.execute("DELETE FROM indices_pendentes WHERE ddl = ?", (ddl,))
+
+
+def indices_pendentes(conn: sqlite3.Connection) -> List[str]:
+    """DDL dos índices removidos por ``remover_indices`` e ainda não recriados."""
+    return [r[0] for r in conn.execute("SELECT ddl FROM indices_pendentes ORDER BY nome")]
 
 
 class ForjaDePersistencia:
@@ -10,59 +170,190 @@ class ForjaDePersistencia:
     Usa SQLite em arquivo local e ativa chaves estrangeiras.
     """
 
-    def __init__(self, caminho_db: str | None = None) -> None:
-        base = Path("data")
-        base.mkdir(parents=True, exist_ok=True)
-        self._caminho = Path(caminho_db) if caminho_db else base / "mercado.sqlite3"
+    def __init__(
+        self,
+        caminho_db: str | None = None,
+        *,
+        pragmas: PragmasDeConexao | None = None,
+        metricas: Optional[RegistroDeMetricas] = None,
+    ) -> None:
+        # O diretório só é criado ao migrar, não ao construir a forja
+        self._caminho = Path(caminho_db) if caminho_db else Path("data") / "mercado.sqlite3"
+        self._pragmas = pragmas or PragmasDeConexao()
+        self._metricas = metricas
 
     @property
     def caminho(self) -> Path:
         return self._caminho
 
+    @property
+    def pragmas(self) -> PragmasDeConexao:
+        return self._pragmas
+
+    @property
+    def metricas(self) -> Optional[RegistroDeMetricas]:
+        return self._metricas
+
     def conectar(self, *, check_same_thread: bool = True) -> sqlite3.Connection:
-        conn = sqlite3.connect(self._caminho, check_same_thread=check_same_thread)
+        if self._metricas is None:
+            conn = sqlite3.connect(self._caminho, check_same_thread=check_same_thread)
+        else:
+            # Só com métricas ligadas a conexão paga o cronômetro por instrução
+            conn = sqlite3.connect(
+                self._caminho,
+                check_same_thread=check_same_thread,
+                factory=ConexaoInstrumentada,
+            )
+            conn.registro = self._metricas
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON;")
+        for stmt in self._pragmas.comandos():
+            conn.execute(stmt)
         return conn
 
-    def criar_esquema(self) -> None:
-        conn = self.conectar()
+    def criar_pool(self, **opcoes) -> "PoolDeConexoes":
+        return PoolDeConexoes(self, **opcoes)
+
+    def criar_esquema(self) -> int:
+        """Aplica as migrações pendentes (``infra.migracoes``); devolve quantas rodaram.
+
+        Com o esquema em dia custa uma conexão, o ``PRAGMA user_version`` e a
+        consulta a ``indices_pendentes``. Recria os índices que uma carga com
+        ``adiar_indices`` interrompida deixou de fora.
+        """
+        # Import tardio: as migrações usam funções deste módulo
+        from infra.migracoes import migrar
+
+        return migrar(self)
+
+
+class PoolDeConexoes:
+    """Pool limitado de conexões reaproveitáveis entre requisições.
+
+    Conexões ociosas além de ``ocioso_maximo`` segundos são fechadas; as que
+    ficaram paradas mais de ``verificar_apos`` segundos passam por um
+    ``SELECT 1`` antes de serem emprestadas. Transações esquecidas abertas são
+    desfeitas na devolução.
+    """
+
+    def __init__(
+        self,
+        forja: ForjaDePersistencia,
+        *,
+        tamanho_maximo: int = 8,
+        ocioso_maximo: float = 300.0,
+        verificar_apos: float = 5.0,
+        tempo_espera: float = 30.0,
+    ) -> None:
+        if tamanho_maximo <= 0:
+            raise ValueError("Tamanho máximo do pool deve ser positivo")
+        self._forja = forja
+        self._tamanho_maximo = tamanho_maximo
+        self._ocioso_maximo = ocioso_maximo
+        self._verificar_apos = verificar_apos
+        self._tempo_espera = tempo_espera
+        self._livres: Deque[Tuple[sqlite3.Connection, float]] = deque()
+        self._abertas = 0
+        self._fechado = False
+        self._cond = threading.Condition()
+
+    @property
+    def forja(self) -> ForjaDePersistencia:
+        return self._forja
+
+    @property
+    def tamanho_maximo(self) -> int:
+        return self._tamanho_maximo
+
+    def estatisticas(self) -> dict:
+        with self._cond:
+            return {
+                "abertas": self._abertas,
+                "livres": len(self._livres),
+                "emprestadas": self._abertas - len(self._livres),
+            }
+
+    def obter(self) -> sqlite3.Connection:
+        limite = time.monotonic() + self._tempo_espera
+        with self._cond:
+            while True:
+                if self._fechado:
+                    raise RuntimeError("Pool de conexões encerrado")
+                self._despejar_ociosas()
+                if self._livres:
+                    # LIFO: a conexão usada mais recentemente tem o cache mais quente
+                    conn, ultimo_uso = self._livres.pop()
+                    break
+                if self._abertas < self._tamanho_maximo:
+                    self._abertas += 1
+                    conn, ultimo_uso = None, 0.0
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self._cond.wait(restante):
+                    raise TimeoutError("Pool de conexões esgotado")
+
+        if conn is not None and time.monotonic() - ultimo_uso > self._verificar_apos:
+            if not self._saudavel(conn):
+                conn.close()
+                conn = None
+        if conn is None:
+            try:
+                conn = self._forja.conectar(check_same_thread=False)
+            except Exception:
+                self._descartar()
+                raise
+        return conn
+
+    def devolver(self, conn: sqlite3.Connection) -> None:
         try:
-            ddl_produtos = """
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                descricao TEXT DEFAULT '',
-                quantidade_disponivel INTEGER NOT NULL CHECK (quantidade_disponivel >= 0),
-                preco REAL NOT NULL CHECK (preco >= 0)
-            );
-            """
-
-            ddl_vendas = """
-            CREATE TABLE IF NOT EXISTS vendas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                produto_id INTEGER NOT NULL,
-                quantidade INTEGER NOT NULL CHECK (quantidade > 0),
-                data_venda TEXT NOT NULL,
-                FOREIGN KEY (produto_id) REFERENCES produtos(id)
-            );
-            """
-
-            idx = [
-                "CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome);",
-                "CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas(data_venda);",
-                "CREATE INDEX IF NOT EXISTS idx_vendas_produto ON vendas(produto_id);",
-            ]
-
-            with conn:
-                conn.executescript(ddl_produtos)
-                conn.executescript(ddl_vendas)
-                for stmt in idx:
-                    conn.execute(stmt)
-                # Migração leve: garantir coluna de preço na venda para relatórios fiéis
-                cols = conn.execute("PRAGMA table_info('vendas');").fetchall()
-                nomes = {c[1] for c in cols}
-                if "preco_unitario" not in nomes:
-                    conn.execute("ALTER TABLE vendas ADD COLUMN preco_unitario REAL;")
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            self._descartar()
+            return
+        with self._cond:
+            if self._fechado:
+                conn.close()
+                self._abertas -= 1
+            else:
+                self._livres.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def conexao(self) -> Iterator[sqlite3.Connection]:
+        conn = self.obter()
+        try:
+            yield conn
         finally:
+            self.devolver(conn)
+
+    def fechar(self) -> None:
+        with self._cond:
+            self._fechado = True
+            while self._livres:
+                conn, _ = self._livres.popleft()
+                conn.close()
+                self._abertas -= 1
+            self._cond.notify_all()
+
+    def _despejar_ociosas(self) -> None:
+        # Chamado com o lock adquirido; as mais antigas ficam à esquerda
+        agora = time.monotonic()
+        while self._livres and agora - self._livres[0][1] > self._ocioso_maximo:
+            conn, _ = self._livres.popleft()
             conn.close()
+            self._abertas -= 1
+
+    def _descartar(self) -> None:
+        with self._cond:
+            self._abertas -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _saudavel(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
@@ -0,0 +1,35 @@
+"""Fragmentos SQL que montam respostas JSON dentro do SQLite.
+
+Listagens e relatórios da API pedem ao banco o texto final
+(``json_object``/``json_group_array``) em vez de converter cada linha em objetos
+Python. O ``json_group_array`` segue a ordem das linhas da subconsulta, então
+a ordenação fica no ``ORDER BY`` interno.
+"""
+from __future__ import annotations
+
+
+def real(expr: str) -> str:
+    """Número JSON para ``expr`` que, lido de volta, é o mesmo ``float`` do Python.
+
+    O SQLite escreve REAL em JSON com 15 dígitos significativos (``0.1 + 0.2``
+    sai ``0.3``); quando 15 dígitos não reproduzem o valor, usa 17. A exceção são
+    magnitudes perto de 1e-300, onde a conversão de texto do próprio SQLite erra
+    o último dígito. ``expr`` não pode ser NULL (use ``COALESCE``).
+    """
+    x = f"CAST({expr} AS REAL)"
+    return (
+        f"json(CASE WHEN CAST(printf('%!.15g', {x}) AS REAL) = {x} "
+        f"THEN printf('%!.15g', {x}) ELSE printf('%!.17g', {x}) END)"
+    )
+
+
+def objeto(**campos: str) -> str:
+    """``json_object('chave', expr, ...)`` na ordem dos argumentos."""
+    return "json_object(" + ", ".join(f"'{k}', {v}" for k, v in campos.items()) + ")"
+
+
+def juntar_arrays(partes: list[str]) -> str:
+    """Concatena arrays JSON (texto) num só, sem decodificá-los."""
+    if len(partes) == 1:
+        return partes[0]
+    return "[" + ",".join(p[1:-1] for p in partes if p != "[]") + "]"
@@ -0,0 +1,276 @@
+"""Instrumentação opcional: tempo por instrução SQL, por rota HTTP e texto Prometheus.
+
+Nada aqui roda se a instrumentação estiver desligada: a forja só usa
+``ConexaoInstrumentada`` quando recebe um ``RegistroDeMetricas`` e a API só
+instala ``MiddlewareDeMetricas`` nesse caso.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limites (s) dos histogramas; o último balde (+Inf) é implícito
+BALDES = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Teto de formas de SQL distintas; o excedente vai para um rótulo único
+MAX_FORMAS_SQL = 500
+_OUTRAS = "<outras>"
+
+_ESPACOS = re.compile(r"\s+")
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTA_IN = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def normalizar_sql(sql: str) -> str:
+    """Forma canônica da instrução: espaços colapsados, literais e listas ``IN`` como ``?``."""
+    forma = _ESPACOS.sub(" ", sql).strip().rstrip(";").strip()
+    forma = _LITERAIS.sub("?", forma)
+    return _LISTA_IN.sub("IN (?...)", forma)[:300]
+
+
+def forma_parametros(parametros: Any) -> str:
+    """Tipos dos parâmetros, sem os valores (que podem ser dados pessoais)."""
+    if isinstance(parametros, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parametros.items()) + "}"
+    if isinstance(parametros, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parametros) + ")"
+    return type(parametros).__name__
+
+
+class _Histograma:
+    __slots__ = ("baldes", "soma", "total")
+
+    def __init__(self) -> None:
+        self.baldes = [0] * (len(BALDES) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float) -> None:
+        self.baldes[bisect_left(BALDES, segundos)] += 1
+        self.soma += segundos
+        self.total += 1
+
+
+def _rotulos(**valores: Any) -> str:
+    partes = []
+    for nome, valor in valores.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nome}="{texto}"')
+    return ",".join(partes)
+
+
+def _linhas_histograma(nome: str, rotulos: str, h: _Histograma) -> List[str]:
+    linhas = []
+    acumulado = 0
+    sep = "," if rotulos else ""
+    for limite, n in zip((*BALDES, "+Inf"), h.baldes):
+        acumulado += n
+        linhas.append(f'{nome}_bucket{{{rotulos}{sep}le="{limite}"}} {acumulado}')
+    linhas.append(f"{nome}_sum{{{rotulos}}} {h.soma:.6f}")
+    linhas.append(f"{nome}_count{{{rotulos}}} {h.total}")
+    return linhas
+
+
+class RegistroDeMetricas:
+    """Histogramas de latência de SQL e de rotas, contadores de erro e log de lentas.
+
+    ``lento_ms`` é o limite a partir do qual a instrução vai para o log
+    ``infra.metricas`` (nível WARNING) com a forma dos parâmetros.
+    """
+
+    def __init__(self, *, lento_ms: float = 100.0) -> None:
+        self.lento_s = lento_ms / 1000
+        self._lock = threading.Lock()
+        self._sql: Dict[str, _Histograma] = {}
+        self._erros_sql: Dict[str, int] = {}
+        self._lentas = 0
+        self._rotas: Dict[Tuple[str, str], _Histograma] = {}
+        self._status: Dict[Tuple[str, str, int], int] = {}
+        self._erros_rota: Dict[Tuple[str, str], int] = {}
+
+    # SQL
+    def observar_sql(
+        self, sql: str, segundos: float, parametros: Any = (), *, erro: bool = False
+    ) -> None:
+        forma = normalizar_sql(sql)
+        with self._lock:
+            h = self._sql.get(forma)
+            if h is None:
+                if len(self._sql) >= MAX_FORMAS_SQL:
+                    forma = _OUTRAS
+                h = self._sql.setdefault(forma, _Histograma())
+            h.observar(segundos)
+            if erro:
+                self._erros_sql[forma] = self._erros_sql.get(forma, 0) + 1
+            if segundos >= self.lento_s:
+                self._lentas += 1
+        if segundos >= self.lento_s:
+            logger.warning(
+                "SQL lenta (%.1f ms): %s parâmetros=%s",
+                segundos * 1000,
+                forma,
+                forma_parametros(parametros),
+            )
+
+    # HTTP
+    def observar_rota(self, metodo: str, rota: str, status: int, segundos: float) -> None:
+        chave = (metodo, rota)
+        with self._lock:
+            h = self._rotas.get(chave)
+            if h is None:
+                h = self._rotas[chave] = _Histograma()
+            h.observar(segundos)
+            chave_status = (metodo, rota, status)
+            self._status[chave_status] = self._status.get(chave_status, 0) + 1
+            if status >= 500:
+                self._erros_rota[chave] = self._erros_rota.get(chave, 0) + 1
+
+    def como_prometheus(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            linhas = [
+                "# HELP nucleo_sql_duracao_segundos Tempo de execute() por forma de SQL",
+                "# TYPE nucleo_sql_duracao_segundos histogram",
+            ]
+            for forma, h in sorted(self._sql.items()):
+                linhas += _linhas_histograma("nucleo_sql_duracao_segundos", _rotulos(sql=forma), h)
+            linhas += [
+                "# HELP nucleo_sql_erros_total Instruções SQL que falharam",
+                "# TYPE nucleo_sql_erros_total counter",
+            ]
+            for forma, n in sorted(self._erros_sql.items()):
+                linhas.append(f"nucleo_sql_erros_total{{{_rotulos(sql=forma)}}} {n}")
+            linhas += [
+                "# HELP nucleo_sql_lentas_total Instruções acima do limite de lentidão",
+                "# TYPE nucleo_sql_lentas_total counter",
+                f"nucleo_sql_lentas_total {self._lentas}",
+                "# HELP nucleo_http_duracao_segundos Latência das requisições por rota",
+                "# TYPE nucleo_http_duracao_segundos histogram",
+            ]
+            for (metodo, rota), h in sorted(self._rotas.items()):
+                linhas += _linhas_histograma(
+                    "nucleo_http_duracao_segundos", _rotulos(metodo=metodo, rota=rota), h
+                )
+            linhas += [
+                "# HELP nucleo_http_requisicoes_total Requisições por rota e status",
+                "# TYPE nucleo_http_requisicoes_total counter",
+            ]
+            for (metodo, rota, status), n in sorted(self._status.items()):
+                rot = _rotulos(metodo=metodo, rota=rota, status=status)
+                linhas.append(f"nucleo_http_requisicoes_total{{{rot}}} {n}")
+            linhas += [
+                "# HELP nucleo_http_erros_total Requisições com erro do servidor (5xx)",
+                "# TYPE nucleo_http_erros_total counter",
+            ]
+            for (metodo, rota), n in sorted(self._erros_rota.items()):
+                rot = _rotulos(metodo=metodo, rota=rota)
+                linhas.append(f"nucleo_http_erros_total{{{rot}}} {n}")
+        return "\n".join(linhas) + "\n"
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que cronometra ``execute``/``executemany`` (preparo e primeiro passo).
+
+    Agregações e ordenações são calculadas no primeiro passo, então o tempo delas
+    aparece inteiro; a leitura posterior das linhas não é contada.
+    """
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        registro = self.connection.registro
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            registro.observar_sql(sql, time.perf_counter() - inicio, parameters, erro=True)
+            raise
+        registro.observar_sql(sql, time.perf_counter() - inicio, parameters)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any], /) -> sqlite3.Cursor:
+        registro = self.connection.registro
+        if isinstance(seq_of_parameters, (list, tuple)):
+            n = len(seq_of_parameters)
+            forma = f"{n}×{forma_parametros(seq_of_parameters[0])}" if n else "0×()"
+        else:
+            forma = f"{type(seq_of_parameters).__name__}"
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except BaseException:
+            registro.observar_sql(sql, time.perf_counter() - inicio, forma, erro=True)
+            raise
+        registro.observar_sql(sql, time.perf_counter() - inicio, forma)
+        return self
+
+    def executescript(self, sql_script: str, /) -> sqlite3.Cursor:
+        registro = self.connection.registro
+        inicio = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        except BaseException:
+            registro.observar_sql("<script>", time.perf_counter() - inicio, erro=True)
+            raise
+        registro.observar_sql("<script>", time.perf_counter() - inicio)
+        return self
+
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos atalhos ``execute*`` e cursores passam pelo ``CursorInstrumentado``."""
+
+    registro: RegistroDeMetricas
+
+    def cursor(self, factory: Optional[type] = None) -> sqlite3.Cursor:  # type: ignore[override]
+        return super().cursor(factory or CursorInstrumentado)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Iterable[Any], /) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, sql_script: str, /) -> sqlite3.Cursor:
+        return self.cursor().executescript(sql_script)
+
+
+class MiddlewareDeMetricas:
+    """Middleware ASGI: latência por rota (o modelo, não o caminho) e contagem por status.
+
+    Requisições sem rota casada entram como ``<sem rota>`` para não explodir a
+    cardinalidade; exceções não tratadas contam como 500.
+    """
+
+    def __init__(self, app: Any, registro: RegistroDeMetricas) -> None:
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem: Dict[str, Any]) -> None:
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        except BaseException:
+            status = 500
+            raise
+        finally:
+            rota = getattr(scope.get("route"), "path", None) or "<sem rota>"
+            self.registro.observar_rota(
+                scope["method"], rota, status, time.perf_counter() - inicio
+            )
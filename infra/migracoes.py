@@ -0,0 +1,492 @@
+"""Migrações de esquema versionadas por ``PRAGMA user_version``.
+
+Cada ``Migracao`` leva o banco da versão anterior para a sua, numa transação que
+também grava o novo ``user_version``. Os passos são idempotentes: bancos criados
+antes deste controle (versão 0, mas com parte do esquema) passam por todos eles
+sem erro. Com o esquema em dia, ``migrar`` só lê o ``user_version`` e volta, sem
+DDL nem lock de escrita; quando há pendências, um lock de arquivo faz com que
+apenas um processo as aplique enquanto os demais aguardam.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+from infra.forja_persistencia import (
+    ForjaDePersistencia,
+    incrementar_versao_dados,
+    indices_pendentes,
+    preencher_vendas_diarias,
+    reconstruir_busca_produtos,
+    recriar_indices,
+)
+from infra.particoes import DDL_PARTICOES, preencher_precos_arquivados
+
+try:  # POSIX; em outras plataformas basta o BEGIN IMMEDIATE de cada passo
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migracao:
+    versao: int
+    descricao: str
+    aplicar: Callable[[sqlite3.Connection], None]
+
+
+def _script(conn: sqlite3.Connection, sql: str) -> None:
+    # executescript faria COMMIT antes; aqui cada instrução roda na transação aberta
+    instrucao = ""
+    for linha in sql.splitlines(keepends=True):
+        instrucao += linha
+        if sqlite3.complete_statement(instrucao):
+            conn.execute(instrucao)
+            instrucao = ""
+    if instrucao.strip():
+        raise ValueError(f"Instrução incompleta na migração: {instrucao.strip()[:80]}")
+
+
+def _colunas(conn: sqlite3.Connection, tabela: str) -> set[str]:
+    return {c[1] for c in conn.execute(f"PRAGMA table_info('{tabela}')").fetchall()}
+
+
+def _tabela_existe(conn: sqlite3.Connection, nome: str) -> bool:
+    return bool(
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (nome,)
+        ).fetchone()
+    )
+
+
+def _v1_tabelas(conn: sqlite3.Connection) -> None:
+    _script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            descricao TEXT DEFAULT '',
+            quantidade_disponivel INTEGER NOT NULL CHECK (quantidade_disponivel >= 0),
+            preco REAL NOT NULL CHECK (preco >= 0)
+        );
+        CREATE TABLE IF NOT EXISTS vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+            data_venda TEXT NOT NULL,
+            FOREIGN KEY (produto_id) REFERENCES produtos(id)
+        );
+        """,
+    )
+
+
+def _v2_preco_unitario(conn: sqlite3.Connection) -> None:
+    # Preço no momento da venda, para relatórios fiéis
+    if "preco_unitario" not in _colunas(conn, "vendas"):
+        conn.execute("ALTER TABLE vendas ADD COLUMN preco_unitario REAL")
+
+
+def _v3_data_venda_ts(conn: sqlite3.Connection) -> None:
+    # Data da venda em epoch UTC (segundos): comparável direto no índice, sem
+    # datetime()/DATE() por linha nos filtros e ordenações
+    if "data_venda_ts" not in _colunas(conn, "vendas"):
+        conn.execute("ALTER TABLE vendas ADD COLUMN data_venda_ts INTEGER")
+    conn.execute(
+        "UPDATE vendas SET data_venda_ts = CAST(strftime('%s', data_venda) AS INTEGER) "
+        "WHERE data_venda_ts IS NULL"
+    )
+    # Índice sobre o texto nunca era usado (consultas envolviam datetime())
+    conn.execute("DROP INDEX IF EXISTS idx_vendas_data")
+
+
+def _v4_indices(conn: sqlite3.Connection) -> None:
+    _script(
+        conn,
+        """
+        CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos(nome);
+        -- Cobre as pontas parciais dos relatórios, carregar_lote e a exportação
+        -- (nada de ir à tabela); com id logo após a data, também serve à ordem
+        -- data_venda_ts, id da paginação sem ordenar
+        DROP INDEX IF EXISTS idx_vendas_data_ts;
+        CREATE INDEX IF NOT EXISTS idx_vendas_ts_cobertura
+        ON vendas(data_venda_ts, id, produto_id, quantidade, preco_unitario);
+        -- (produto_id, data) atende filtro por produto já na ordem da paginação
+        DROP INDEX IF EXISTS idx_vendas_produto;
+        CREATE INDEX IF NOT EXISTS idx_vendas_produto_ts ON vendas(produto_id, data_venda_ts);
+        """,
+    )
+
+
+def _v5_particoes(conn: sqlite3.Connection) -> None:
+    _script(conn, DDL_PARTICOES)
+
+
+def _v6_vendas_diarias(conn: sqlite3.Connection) -> None:
+    # Resumo diário por produto mantido por trigger na mesma transação da venda.
+    # Vendas sem preco_unitario congelam o preço do produto no momento da carga.
+    existia = _tabela_existe(conn, "vendas_diarias")
+    _script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            dia TEXT NOT NULL,
+            produto_id INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            receita REAL NOT NULL,
+            PRIMARY KEY (dia, produto_id)
+        ) WITHOUT ROWID;
+
+        CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias AFTER INSERT ON vendas
+        BEGIN
+            INSERT INTO vendas_diarias (dia, produto_id, qtd, receita)
+            VALUES (
+                COALESCE(DATE(NEW.data_venda_ts, 'unixepoch'), DATE(NEW.data_venda)),
+                NEW.produto_id,
+                NEW.quantidade,
+                NEW.quantidade * COALESCE(
+                    NEW.preco_unitario,
+                    (SELECT preco FROM produtos WHERE id = NEW.produto_id)
+                )
+            )
+            ON CONFLICT (dia, produto_id) DO UPDATE
+            SET qtd = qtd + excluded.qtd, receita = receita + excluded.receita;
+        END;
+        """,
+    )
+    if not existia:
+        preencher_vendas_diarias(conn)
+
+
+def _v7_controle_versao(conn: sqlite3.Connection) -> None:
+    # Contador de versão dos dados: qualquer escrita que afete relatórios o
+    # incrementa, então caches de qualquer processo detectam a mudança
+    _script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS controle_versao (
+            chave TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        INSERT OR IGNORE INTO controle_versao (chave, versao) VALUES ('dados', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_versao_vendas AFTER INSERT ON vendas
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'dados';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_versao_produtos_ins AFTER INSERT ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'dados';
+        END;
+        DROP TRIGGER IF EXISTS trg_versao_produtos_upd;
+        CREATE TRIGGER trg_versao_produtos_upd
+        AFTER UPDATE OF nome, descricao, quantidade_disponivel, preco ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'dados';
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_versao_produtos_del AFTER DELETE ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'dados';
+        END;
+        """,
+    )
+
+
+def _v8_versao_catalogo(conn: sqlite3.Connection) -> None:
+    # Versão do catálogo: cada produto alterado recebe a versão corrente, o que
+    # permite a caches em memória recarregar só as linhas novas
+    if "versao_catalogo" not in _colunas(conn, "produtos"):
+        conn.execute(
+            "ALTER TABLE produtos ADD COLUMN versao_catalogo INTEGER NOT NULL DEFAULT 0"
+        )
+    _script(
+        conn,
+        """
+        INSERT OR IGNORE INTO controle_versao (chave, versao) VALUES ('catalogo', 0);
+        INSERT OR IGNORE INTO controle_versao (chave, versao) VALUES ('catalogo_recarga', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_ins AFTER INSERT ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'catalogo';
+            UPDATE produtos
+            SET versao_catalogo = (SELECT versao FROM controle_versao WHERE chave = 'catalogo')
+            WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_upd
+        AFTER UPDATE OF nome, descricao, quantidade_disponivel, preco ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'catalogo';
+            UPDATE produtos
+            SET versao_catalogo = (SELECT versao FROM controle_versao WHERE chave = 'catalogo')
+            WHERE id = NEW.id;
+        END;
+        -- Exclusões não deixam linha para a recarga incremental: forçam a completa
+        CREATE TRIGGER IF NOT EXISTS trg_catalogo_del AFTER DELETE ON produtos
+        BEGIN
+            UPDATE controle_versao SET versao = versao + 1 WHERE chave = 'catalogo_recarga';
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_produtos_versao ON produtos(versao_catalogo);
+        """,
+    )
+
+
+def _v9_busca_produtos(conn: sqlite3.Connection) -> None:
+    # Índice de texto externo (content='produtos'): guarda só os termos, não uma
+    # cópia das colunas. unicode61 com remove_diacritics 2 dobra acentos
+    # ("açúcar" casa com "acucar"); prefix='2 3 4' indexa os prefixos curtos, que
+    # sem isso obrigam o FTS5 a juntar as listas de todos os termos que os têm
+    if not conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        logger.warning("SQLite sem FTS5: busca de produtos usará LIKE no nome")
+        return
+    _script(
+        conn,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS produtos_busca USING fts5(
+            nome, descricao,
+            content='produtos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        );
+        -- Peso 10 para o nome: um termo no nome vale mais que na descrição
+        INSERT INTO produtos_busca (produtos_busca, rank) VALUES ('rank', 'bm25(10.0, 1.0)');
+
+        CREATE TRIGGER IF NOT EXISTS trg_busca_ins AFTER INSERT ON produtos
+        BEGIN
+            INSERT INTO produtos_busca (rowid, nome, descricao)
+            VALUES (NEW.id, NEW.nome, NEW.descricao);
+        END;
+        -- Só quando o texto muda: vendas e ajustes de estoque não tocam o índice
+        CREATE TRIGGER IF NOT EXISTS trg_busca_upd AFTER UPDATE OF nome, descricao ON produtos
+        WHEN OLD.nome IS NOT NEW.nome OR OLD.descricao IS NOT NEW.descricao
+        BEGIN
+            INSERT INTO produtos_busca (produtos_busca, rowid, nome, descricao)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.descricao);
+            INSERT INTO produtos_busca (rowid, nome, descricao)
+            VALUES (NEW.id, NEW.nome, NEW.descricao);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_busca_del AFTER DELETE ON produtos
+        BEGIN
+            INSERT INTO produtos_busca (produtos_busca, rowid, nome, descricao)
+            VALUES ('delete', OLD.id, OLD.nome, OLD.descricao);
+        END;
+        """,
+    )
+    reconstruir_busca_produtos(conn)
+
+
+def _v10_alteracoes(conn: sqlite3.Connection) -> None:
+    # Log só de inclusão das alterações de vendas e produtos, gravado por trigger
+    # na mesma transação da escrita. ``seq`` (AUTOINCREMENT) nunca é reaproveitado
+    # e, com um escritor por vez, fica visível em ordem: é o cursor do feed.
+    # Colunas tipadas em vez de JSON: o caminho da venda não monta texto
+    _script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL CHECK (tipo IN ('venda', 'produto')),
+            entidade_id INTEGER NOT NULL,
+            produto_id INTEGER,          -- venda: produto vendido
+            quantidade INTEGER NOT NULL, -- venda: quantidade; produto: estoque
+            preco REAL,                  -- venda: preço unitário; produto: preço
+            nome TEXT,                   -- produto
+            data_venda TEXT,             -- venda
+            criado_ts INTEGER NOT NULL
+        );
+        -- Maior seq já descartado pela retenção; cursores abaixo dele perderam dados
+        INSERT OR IGNORE INTO controle_versao (chave, versao)
+        VALUES ('alteracoes_descartadas', 0);
+
+        CREATE TRIGGER IF NOT EXISTS trg_alteracoes_venda AFTER INSERT ON vendas
+        BEGIN
+            INSERT INTO alteracoes
+                (tipo, entidade_id, produto_id, quantidade, preco, data_venda, criado_ts)
+            VALUES ('venda', NEW.id, NEW.produto_id, NEW.quantidade, NEW.preco_unitario,
+                    NEW.data_venda, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_alteracoes_produto_ins AFTER INSERT ON produtos
+        BEGIN
+            INSERT INTO alteracoes (tipo, entidade_id, quantidade, preco, nome, criado_ts)
+            VALUES ('produto', NEW.id, NEW.quantidade_disponivel, NEW.preco, NEW.nome,
+                    CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        -- Estoque, preço e nome; a descrição fica de fora (não muda a cada venda)
+        CREATE TRIGGER IF NOT EXISTS trg_alteracoes_produto_upd
+        AFTER UPDATE OF nome, quantidade_disponivel, preco ON produtos
+        WHEN OLD.quantidade_disponivel IS NOT NEW.quantidade_disponivel
+          OR OLD.preco IS NOT NEW.preco
+          OR OLD.nome IS NOT NEW.nome
+        BEGIN
+            INSERT INTO alteracoes (tipo, entidade_id, quantidade, preco, nome, criado_ts)
+            VALUES ('produto', NEW.id, NEW.quantidade_disponivel, NEW.preco, NEW.nome,
+                    CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        """,
+    )
+
+
+def _v11_preco_efetivo(conn: sqlite3.Connection) -> None:
+    # Uma só política de preço: toda venda guarda o preço efetivo (o repositório
+    # grava o do produto quando a venda não traz um). Antes o resumo diário
+    # congelava o preço da carga e as pontas parciais, o snapshot e o ranking
+    # usavam o preço atual, então o total dependia das bordas do período. Vendas
+    # antigas sem preço recebem o preço atual, o que as leituras cruas já usavam,
+    # e os dias afetados do resumo são refeitos com ele
+    sem_preco = conn.execute(
+        "UPDATE vendas SET preco_unitario = "
+        "(SELECT p.preco FROM produtos p WHERE p.id = vendas.produto_id) "
+        "WHERE preco_unitario IS NULL"
+    ).rowcount
+    if sem_preco:
+        preencher_vendas_diarias(conn)
+    arquivados = preencher_precos_arquivados(conn)
+    for mes, linhas in arquivados:
+        conn.execute("DELETE FROM vendas_diarias WHERE substr(dia, 1, 7) = ?", (mes,))
+        conn.executemany(
+            "INSERT INTO vendas_diarias (dia, produto_id, qtd, receita) VALUES (?, ?, ?, ?)",
+            linhas,
+        )
+    if sem_preco or arquivados:
+        incrementar_versao_dados(conn)
+    _script(
+        conn,
+        """
+        DROP TRIGGER IF EXISTS trg_vendas_diarias;
+        CREATE TRIGGER trg_vendas_diarias AFTER INSERT ON vendas
+        BEGIN
+            INSERT INTO vendas_diarias (dia, produto_id, qtd, receita)
+            VALUES (
+                COALESCE(DATE(NEW.data_venda_ts, 'unixepoch'), DATE(NEW.data_venda)),
+                NEW.produto_id,
+                NEW.quantidade,
+                NEW.quantidade * NEW.preco_unitario
+            )
+            ON CONFLICT (dia, produto_id) DO UPDATE
+            SET qtd = qtd + excluded.qtd, receita = receita + excluded.receita;
+        END;
+        """,
+    )
+
+
+def _v12_indices_pendentes(conn: sqlite3.Connection) -> None:
+    # DDL dos índices removidos por uma carga com ``adiar_indices``, gravado na
+    # mesma transação dos DROP. Uma carga interrompida (kill, OOM, parada do
+    # contêiner) não deixa o banco sem índices: ``migrar`` os recria na partida
+    _script(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS indices_pendentes (
+            nome TEXT PRIMARY KEY,
+            ddl TEXT NOT NULL
+        ) WITHOUT ROWID;
+        """,
+    )
+
+
+MIGRACOES: List[Migracao] = [
+    Migracao(1, "tabelas produtos e vendas", _v1_tabelas),
+    Migracao(2, "vendas.preco_unitario", _v2_preco_unitario),
+    Migracao(3, "vendas.data_venda_ts (epoch UTC)", _v3_data_venda_ts),
+    Migracao(4, "índices de produtos e vendas", _v4_indices),
+    Migracao(5, "catálogo de partições de vendas", _v5_particoes),
+    Migracao(6, "resumo vendas_diarias", _v6_vendas_diarias),
+    Migracao(7, "controle de versão dos dados", _v7_controle_versao),
+    Migracao(8, "versão do catálogo de produtos", _v8_versao_catalogo),
+    Migracao(9, "busca textual de produtos (FTS5)", _v9_busca_produtos),
+    Migracao(10, "feed de alterações de vendas e produtos", _v10_alteracoes),
+    Migracao(11, "preço efetivo gravado em todas as vendas", _v11_preco_efetivo),
+    Migracao(12, "índices adiados pendentes", _v12_indices_pendentes),
+]
+VERSAO_ATUAL = MIGRACOES[-1].versao
+
+
+def _ha_indices_pendentes(conn: sqlite3.Connection) -> bool:
+    # A tabela só existe a partir da versão 12 (ou não existe numa lista parcial)
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'indices_pendentes'"
+    ).fetchone()
+    return existe is not None and conn.execute(
+        "SELECT 1 FROM indices_pendentes LIMIT 1"
+    ).fetchone() is not None
+
+
+def versao_esquema(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+@contextmanager
+def _trava(caminho: Path) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    with open(caminho.with_name(caminho.name + ".migracao.lock"), "a") as arquivo:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+def aplicar_pendentes(
+    conn: sqlite3.Connection, migracoes: List[Migracao] = MIGRACOES
+) -> int:
+    """Aplica, em ordem, as migrações acima do ``user_version``; devolve quantas rodaram.
+
+    Cada passo confere a versão de novo já com o lock de escrita (``BEGIN
+    IMMEDIATE``), então dois processos nunca aplicam o mesmo passo.
+    """
+    aplicadas = 0
+    for m in migracoes:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if versao_esquema(conn) >= m.versao:
+                conn.rollback()
+                continue
+            m.aplicar(conn)
+            conn.execute(f"PRAGMA user_version = {int(m.versao)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        logger.info("Migração %d aplicada: %s", m.versao, m.descricao)
+        aplicadas += 1
+    return aplicadas
+
+
+def migrar(forja: ForjaDePersistencia, migracoes: List[Migracao] = MIGRACOES) -> int:
+    """Deixa o banco da ``forja`` na última versão; devolve quantas migrações rodaram.
+
+    Caminho rápido: com ``user_version`` em dia e nenhum índice pendente, só
+    leituras e nenhum DDL. Índices que uma carga com ``adiar_indices`` removeu e
+    não chegou a recriar são recriados aqui. Banco mais novo que o código é
+    recusado (reverter o deploy não desfaz o esquema).
+    """
+    ultima = migracoes[-1].versao
+    if not forja.caminho.exists():
+        forja.caminho.parent.mkdir(parents=True, exist_ok=True)
+    conn = forja.conectar()
+    try:
+        versao = versao_esquema(conn)
+        if versao > ultima:
+            raise ValueError(
+                f"Banco {forja.caminho} está na versão {versao} do esquema; "
+                f"este código conhece até a {ultima}"
+            )
+        if versao == ultima and not _ha_indices_pendentes(conn):
+            return 0
+        with _trava(forja.caminho):
+            aplicadas = aplicar_pendentes(conn, migracoes)
+            pendentes = indices_pendentes(conn) if _ha_indices_pendentes(conn) else []
+            if pendentes:
+                logger.warning("Recriando %d índice(s) de uma carga interrompida", len(pendentes))
+                recriar_indices(conn, pendentes)
+            return aplicadas
+    finally:
+        conn.close()
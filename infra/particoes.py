@@ -0,0 +1,348 @@
+"""Partições mensais de ``vendas``: meses fechados arquivados em arquivos anexados.
+
+Os meses recentes (quentes) ficam na tabela ``vendas`` do banco principal. Um mês
+fechado pode ser movido para ``arquivo/vendas_AAAA.sqlite3`` (um arquivo por ano,
+uma tabela ``vendas_AAAA_MM`` por mês) e passa a constar em ``particoes_vendas``.
+As leituras consultam esse catálogo e só anexam/uniam as partições que cruzam o
+intervalo pedido; o resumo ``vendas_diarias`` continua completo no banco principal.
+
+Os meses arquivados são sempre anteriores a qualquer venda quente (o arquivamento
+segue do mês mais antigo em diante e um gatilho recusa vendas nesses meses), então
+percorrer as partições em ordem cronológica e depois ``vendas`` preserva a ordem.
+"""
+from __future__ import annotations
+
+import calendar
+import re
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# Limite padrão de bancos anexados por conexão no SQLite (SQLITE_MAX_ATTACHED)
+MAX_ANEXADOS = 10
+DIRETORIO_ARQUIVO = "arquivo"
+
+_MES = re.compile(r"^(\d{4})-(\d{2})$")
+_COLUNAS = "id, produto_id, quantidade, data_venda, preco_unitario, data_venda_ts"
+
+DDL_PARTICOES = """
+CREATE TABLE IF NOT EXISTS particoes_vendas (
+    mes TEXT PRIMARY KEY,
+    arquivo TEXT NOT NULL,
+    inicio_ts INTEGER NOT NULL,
+    fim_ts INTEGER NOT NULL,
+    linhas INTEGER NOT NULL,
+    arquivado_em TEXT NOT NULL
+) WITHOUT ROWID;
+
+-- Mantém os meses arquivados sempre anteriores às vendas quentes
+CREATE TRIGGER IF NOT EXISTS trg_vendas_mes_arquivado BEFORE INSERT ON vendas
+WHEN NEW.data_venda_ts <= (SELECT MAX(fim_ts) FROM particoes_vendas)
+BEGIN
+    SELECT RAISE(ABORT, 'Venda em mês já arquivado');
+END;
+"""
+
+
+@dataclass(frozen=True)
+class Fonte:
+    """Uma partição a consultar: ``tabela`` já qualificada (``vendas`` = quente)."""
+
+    tabela: str
+    inicio_ts: Optional[int] = None
+    fim_ts: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ResultadoArquivamento:
+    mes: str
+    arquivo: str
+    linhas: int
+
+
+def limites_do_mes(mes: str) -> tuple[int, int]:
+    """``"2024-01"`` -> epoch UTC do primeiro e do último segundo do mês."""
+    m = _MES.match(mes or "")
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"Mês inválido: {mes!r} (use AAAA-MM)")
+    ano, num = int(m.group(1)), int(m.group(2))
+    inicio = calendar.timegm((ano, num, 1, 0, 0, 0))
+    fim = inicio + calendar.monthrange(ano, num)[1] * 86400 - 1
+    return inicio, fim
+
+
+def _alias(arquivo: str) -> str:
+    return "arq_" + Path(arquivo).stem.rsplit("_", 1)[-1]
+
+
+def _tabela(mes: str) -> str:
+    return "vendas_" + mes.replace("-", "_")
+
+
+def _diretorio(conn: sqlite3.Connection) -> Path:
+    for _, nome, arquivo in conn.execute("PRAGMA database_list").fetchall():
+        if nome == "main":
+            if not arquivo:
+                raise ValueError("Banco em memória não tem diretório de arquivo")
+            return Path(arquivo).parent / DIRETORIO_ARQUIVO
+    raise ValueError("Banco principal não encontrado")
+
+
+def _anexados(conn: sqlite3.Connection) -> List[str]:
+    return [r[1] for r in conn.execute("PRAGMA database_list").fetchall() if r[1] != "temp"]
+
+
+def anexar(conn: sqlite3.Connection, arquivos: List[str]) -> None:
+    """Anexa os arquivos (se ainda não estiverem) como ``arq_AAAA``.
+
+    Fora de transação apenas: o SQLite não anexa nem desanexa dentro de uma.
+    Anexos de outras consultas são desfeitos se o limite da conexão apertar.
+    """
+    faltam = {_alias(a): a for a in arquivos}
+    presentes = _anexados(conn)
+    for alias in presentes:
+        faltam.pop(alias, None)
+    if not faltam:
+        return
+    if conn.in_transaction:
+        raise ValueError("Partições arquivadas só podem ser anexadas fora de transação")
+    livres = MAX_ANEXADOS - len(presentes)
+    if livres < len(faltam):
+        for alias in presentes:
+            if alias.startswith("arq_") and alias not in {_alias(a) for a in arquivos}:
+                conn.execute(f"DETACH DATABASE {alias}")
+                livres += 1
+    if livres < len(faltam):
+        raise ValueError(
+            f"Intervalo cruza mais de {MAX_ANEXADOS - 1} anos arquivados; reduza o período"
+        )
+    diretorio = _diretorio(conn)
+    for alias, arquivo in faltam.items():
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (str(diretorio / arquivo),))
+
+
+def _arquivadas(
+    conn: sqlite3.Connection, inicio_ts: Optional[int], fim_ts: Optional[int]
+) -> List[tuple]:
+    return conn.execute(
+        "SELECT mes, arquivo, inicio_ts, fim_ts FROM particoes_vendas "
+        "WHERE fim_ts >= ? AND inicio_ts <= ? ORDER BY mes",
+        (
+            -(2**63) if inicio_ts is None else int(inicio_ts),
+            2**63 - 1 if fim_ts is None else int(fim_ts),
+        ),
+    ).fetchall()
+
+
+def _montar(meses: List[tuple], inicio_ts: Optional[int], fim_ts: Optional[int]) -> List[Fonte]:
+    if not meses:
+        return [Fonte("vendas", inicio_ts, fim_ts)]
+    fontes = [
+        Fonte(
+            f"{_alias(arquivo)}.{_tabela(mes)}",
+            ini if inicio_ts is None else max(ini, inicio_ts),
+            fim if fim_ts is None else min(fim, fim_ts),
+        )
+        for mes, arquivo, ini, fim in meses
+    ]
+    # Vendas quentes são todas posteriores ao último mês arquivado
+    ultimo = meses[-1][3]
+    if fim_ts is None or fim_ts > ultimo:
+        fontes.append(Fonte("vendas", ultimo + 1, fim_ts))
+    return fontes
+
+
+@contextmanager
+def fontes_por_intervalo(
+    conn: sqlite3.Connection, intervalos: List[Tuple[Optional[int], Optional[int]]]
+) -> Iterator[List[List[Fonte]]]:
+    """Para cada ``(inicio_ts, fim_ts)``, as partições que o cruzam em ordem cronológica.
+
+    Sem meses arquivados nos intervalos, devolve só ``vendas`` e não abre transação.
+    Caso contrário anexa os arquivos e mantém uma transação de leitura enquanto o
+    bloco roda: catálogo e dados vêm do mesmo instante, mesmo que um arquivamento
+    conclua no meio (ele registra o mês e remove as linhas numa só transação).
+    """
+    meses = [_arquivadas(conn, i, f) for i, f in intervalos]
+    if not any(meses):
+        yield [[Fonte("vendas", i, f)] for i, f in intervalos]
+        return
+    propria = not conn.in_transaction
+    while True:
+        arquivos = {m[1] for lista in meses for m in lista}
+        anexar(conn, sorted(arquivos))
+        if not propria:
+            break
+        conn.execute("BEGIN")
+        meses = [_arquivadas(conn, i, f) for i, f in intervalos]
+        if {m[1] for lista in meses for m in lista} <= arquivos:
+            break
+        # Um arquivamento de outro ano concluiu entre a consulta e o BEGIN
+        conn.rollback()
+    try:
+        yield [_montar(m, i, f) for m, (i, f) in zip(meses, intervalos)]
+    finally:
+        if propria and conn.in_transaction:
+            conn.rollback()
+
+
+@contextmanager
+def fontes_de_vendas(
+    conn: sqlite3.Connection,
+    inicio_ts: Optional[int] = None,
+    fim_ts: Optional[int] = None,
+) -> Iterator[List[Fonte]]:
+    """Atalho de ``fontes_por_intervalo`` para um único intervalo."""
+    with fontes_por_intervalo(conn, [(inicio_ts, fim_ts)]) as (fontes,):
+        yield fontes
+
+
+def fim_arquivado(conn: sqlite3.Connection) -> Optional[int]:
+    """Último segundo (epoch UTC) já arquivado; vendas até ele são recusadas."""
+    row = conn.execute("SELECT MAX(fim_ts) FROM particoes_vendas").fetchone()
+    return None if row is None or row[0] is None else int(row[0])
+
+
+def listar_particoes(conn: sqlite3.Connection) -> List[dict]:
+    rows = conn.execute(
+        "SELECT mes, arquivo, linhas, arquivado_em FROM particoes_vendas ORDER BY mes"
+    ).fetchall()
+    return [
+        {"mes": r[0], "arquivo": r[1], "linhas": int(r[2]), "arquivado_em": r[3]} for r in rows
+    ]
+
+
+def preencher_precos_arquivados(
+    conn: sqlite3.Connection,
+) -> List[Tuple[str, List[tuple]]]:
+    """Grava o preço atual do produto nas vendas arquivadas sem ``preco_unitario``.
+
+    Usa uma conexão própria por arquivo, então roda também dentro de transação
+    (onde ``anexar`` não pode). Para cada mês alterado devolve o resumo diário
+    refeito a partir do arquivo: ``(mes, [(dia, produto_id, qtd, receita), ...])``.
+    Repetir a chamada não muda nada (só linhas sem preço são tocadas).
+    """
+    meses = conn.execute("SELECT mes, arquivo FROM particoes_vendas ORDER BY mes").fetchall()
+    if not meses:
+        return []
+    precos = conn.execute("SELECT id, preco FROM produtos").fetchall()
+    diretorio = _diretorio(conn)
+    alterados: List[Tuple[str, List[tuple]]] = []
+    for mes, arquivo in meses:
+        tabela = _tabela(mes)
+        # mode=rw: um arquivo ausente é erro, não um banco vazio criado aqui
+        arq = sqlite3.connect(f"file:{diretorio / arquivo}?mode=rw", uri=True)
+        try:
+            with arq:
+                arq.execute("CREATE TEMP TABLE precos (id INTEGER PRIMARY KEY, preco REAL)")
+                arq.executemany("INSERT INTO temp.precos (id, preco) VALUES (?, ?)", precos)
+                n = arq.execute(
+                    f"UPDATE {tabela} SET preco_unitario = "
+                    "(SELECT preco FROM temp.precos WHERE id = produto_id) "
+                    "WHERE preco_unitario IS NULL"
+                ).rowcount
+                if n:
+                    alterados.append(
+                        (
+                            mes,
+                            arq.execute(
+                                f"SELECT DATE(data_venda_ts, 'unixepoch') AS dia, produto_id, "
+                                f"SUM(quantidade), SUM(quantidade * preco_unitario) "
+                                f"FROM {tabela} GROUP BY dia, produto_id"
+                            ).fetchall(),
+                        )
+                    )
+        finally:
+            arq.close()
+    return alterados
+
+
+def arquivar_mes(
+    conn: sqlite3.Connection, mes: str, *, agora: Optional[datetime] = None
+) -> ResultadoArquivamento:
+    """Move as vendas de ``mes`` (AAAA-MM) para o arquivo do ano.
+
+    O mês precisa estar fechado (anterior ao mês corrente, em UTC) e ser o mais
+    antigo ainda quente. Primeiro as linhas são copiadas para o arquivo (uma
+    transação só nele); depois, numa transação só no banco principal, a cópia é
+    conferida, o mês é registrado e as linhas saem de ``vendas``. Uma falha entre
+    as duas etapas deixa apenas uma tabela órfã no arquivo, refeita na próxima vez.
+    """
+    inicio, fim = limites_do_mes(mes)
+    agora = agora or datetime.now(timezone.utc)
+    if fim >= calendar.timegm((agora.year, agora.month, 1, 0, 0, 0)):
+        raise ValueError(f"Mês {mes} ainda não está fechado")
+    if conn.in_transaction:
+        raise ValueError("Arquivamento precisa rodar fora de transação")
+    if conn.execute("SELECT 1 FROM particoes_vendas WHERE mes = ?", (mes,)).fetchone():
+        raise ValueError(f"Mês {mes} já arquivado")
+    if conn.execute(
+        "SELECT 1 FROM vendas WHERE data_venda_ts < ? LIMIT 1", (inicio,)
+    ).fetchone():
+        raise ValueError(f"Há vendas anteriores a {mes} ainda não arquivadas")
+
+    arquivo = f"vendas_{mes[:4]}.sqlite3"
+    alias, tabela = _alias(arquivo), _tabela(mes)
+    _diretorio(conn).mkdir(parents=True, exist_ok=True)
+    anexar(conn, [arquivo])
+
+    # Etapa 1: cópia (só o arquivo é escrito)
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {alias}.{tabela}")
+        conn.execute(
+            f"""
+            CREATE TABLE {alias}.{tabela} (
+                id INTEGER PRIMARY KEY,
+                produto_id INTEGER NOT NULL,
+                quantidade INTEGER NOT NULL,
+                data_venda TEXT NOT NULL,
+                preco_unitario REAL,
+                data_venda_ts INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            f"INSERT INTO {alias}.{tabela} ({_COLUNAS}) SELECT {_COLUNAS} FROM main.vendas "
+            "WHERE data_venda_ts BETWEEN ? AND ? ORDER BY data_venda_ts, id",
+            (inicio, fim),
+        )
+        # Mesmos acessos do banco principal: por data (cobrindo) e por produto
+        conn.execute(
+            f"CREATE INDEX {alias}.idx_{tabela}_ts ON {tabela}"
+            "(data_venda_ts, id, produto_id, quantidade, preco_unitario)"
+        )
+        conn.execute(
+            f"CREATE INDEX {alias}.idx_{tabela}_produto ON {tabela}(produto_id, data_venda_ts)"
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    # Etapa 2: conferência, registro e remoção (só o banco principal é escrito)
+    conferir = "SELECT COUNT(*), COALESCE(SUM(id), 0), COALESCE(SUM(quantidade), 0) FROM {}"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        quentes = conn.execute(
+            conferir.format("main.vendas WHERE data_venda_ts BETWEEN ? AND ?"), (inicio, fim)
+        ).fetchone()
+        copiadas = conn.execute(conferir.format(f"{alias}.{tabela}")).fetchone()
+        if tuple(quentes) != tuple(copiadas):
+            raise ValueError(f"Vendas de {mes} mudaram durante a cópia; tente novamente")
+        conn.execute(
+            "INSERT INTO particoes_vendas "
+            "(mes, arquivo, inicio_ts, fim_ts, linhas, arquivado_em) VALUES (?, ?, ?, ?, ?, ?)",
+            (mes, arquivo, inicio, fim, int(copiadas[0]), agora.isoformat(timespec="seconds")),
+        )
+        conn.execute(
+            "DELETE FROM main.vendas WHERE data_venda_ts BETWEEN ? AND ?", (inicio, fim)
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return ResultadoArquivamento(mes, arquivo, int(copiadas[0]))
@@ -1,17 +1,115 @@
 from __future__ import annotations
 
+import calendar
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from domain.modelos import Produto, Venda
+from domain.modelos import Produto, Venda, VendasBatch
+from infra import json_sqlite
+from infra.catalogo import COLUNAS_CATALOGO, PRODUTO_JSON, CatalogoEmMemoria, LinhaCatalogo
+from infra.forja_persistencia import busca_de_produtos_disponivel
+from infra.particoes import fontes_de_vendas
+
+# UPDATE ... RETURNING chegou no SQLite 3.35
+SUPORTA_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+# Margem segura abaixo do limite de parâmetros de builds antigos (999)
+_MAX_PARAMS = 900
+# Busca de produtos: termos considerados, tamanho mínimo de termo e quantos
+# candidatos (os mais recentes) completam a página quando os nomes não bastam;
+# o bm25 custa por linha casada e a descrição casa muito mais que o nome
+_MAX_TERMOS = 8
+_MIN_TERMO = 2
+_CANDIDATOS_BUSCA = 200
+_TERMO = re.compile(r"[^\W_]+")
+# Item de GET /vendas (VendaOut) montado pelo SQLite
+_VENDA_JSON = json_sqlite.objeto(
+    id="id", produto_id="produto_id", quantidade="quantidade", data_venda="data_venda"
+)
+
+
+def epoch_utc(valor: datetime | date | str) -> int:
+    """Converte data/hora (ou texto ISO 8601) para epoch UTC em segundos.
+
+    Datas sem fuso são tratadas como UTC, como as gravadas por ``Venda``. Frações
+    de segundo são truncadas, igual a ``datetime()`` do SQLite.
+    """
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor.strip())
+        except ValueError:
+            raise ValueError(f"Data inválida: {valor!r}") from None
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    return calendar.timegm(valor.utctimetuple())
+
+
+def _tuplas(conn: sqlite3.Connection, q: str, params: Sequence = ()) -> sqlite3.Cursor:
+    # Linhas como tuplas simples: hidratação posicional sem sqlite3.Row
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur.execute(q, params)
+
+
+def _em_blocos(valores: Sequence[int], tamanho: int = _MAX_PARAMS) -> Iterable[Sequence[int]]:
+    for i in range(0, len(valores), tamanho):
+        yield valores[i : i + tamanho]
+
+
+def _filtros_pagina(
+    apos: Optional[Tuple[int, int]],
+    produto_id: Optional[int],
+    inicio_ts: Optional[int],
+    fim_ts: Optional[int],
+) -> Tuple[str, List[int], Optional[int]]:
+    """``WHERE`` e parâmetros da paginação de vendas, mais o teto de data das partições."""
+    conds: List[str] = []
+    params: List[int] = []
+    if produto_id is not None:
+        conds.append("produto_id = ?")
+        params.append(int(produto_id))
+    if inicio_ts is not None:
+        conds.append("data_venda_ts >= ?")
+        params.append(int(inicio_ts))
+    if fim_ts is not None:
+        conds.append("data_venda_ts <= ?")
+        params.append(int(fim_ts))
+    if apos is not None:
+        conds.append("(data_venda_ts, id) < (?, ?)")
+        params += [int(apos[0]), int(apos[1])]
+    where = ("WHERE " + " AND ".join(conds)) if conds else ""
+    teto = fim_ts
+    if apos is not None:
+        teto = int(apos[0]) if teto is None else min(int(teto), int(apos[0]))
+    return where, params, teto
 
 
 class RepositorioProdutoSQL:
-    """Repositório relacional de Produtos (SQLite)."""
+    """Repositório relacional de Produtos (SQLite).
 
-    def __init__(self, conn: sqlite3.Connection) -> None:
+    Com um ``catalogo``, ``inserir``/``atualizar``/``ajustar_estoque`` guardam a
+    linha gravada em ``pendentes``; quem confirma a transação a repassa com
+    ``catalogo.confirmar`` (ver ``OrquestradorDeFluxoComercial``).
+    """
+
+    def __init__(
+        self, conn: sqlite3.Connection, catalogo: Optional[CatalogoEmMemoria] = None
+    ) -> None:
         self.conn = conn
+        self.catalogo = catalogo
+        self.pendentes: List[LinhaCatalogo] = []
+
+    def _registrar_escrita(self, produto_id: int) -> None:
+        if self.catalogo is None:
+            return
+        row = _tuplas(
+            self.conn,
+            f"SELECT {COLUNAS_CATALOGO} FROM produtos WHERE id=?",
+            (int(produto_id),),
+        ).fetchone()
+        if row:
+            self.pendentes.append(row)
 
     def inserir(self, produto: Produto) -> Produto:
         q = (
@@ -28,6 +126,7 @@ class RepositorioProdutoSQL:
             ),
         )
         produto.id = int(cur.lastrowid)
+        self._registrar_escrita(produto.id)
         return produto
 
     def atualizar(self, produto: Produto) -> None:
@@ -47,108 +146,463 @@ class RepositorioProdutoSQL:
                 int(produto.id),
             ),
         )
+        self._registrar_escrita(produto.id)
 
     def obter_por_id(self, produto_id: int) -> Optional[Produto]:
         q = "SELECT id, nome, descricao, quantidade_disponivel, preco FROM produtos WHERE id=?"
-        row = self.conn.execute(q, (int(produto_id),)).fetchone()
+        row = _tuplas(self.conn, q, (int(produto_id),)).fetchone()
         if not row:
             return None
-        return Produto(
-            id=int(row["id"]),
-            nome=row["nome"],
-            descricao=row["descricao"],
-            quantidade_disponivel=int(row["quantidade_disponivel"]),
-            preco=float(row["preco"]),
-        )
+        return Produto.hidratar(*row)
 
     def listar(self) -> List[Produto]:
         q = (
             "SELECT id, nome, descricao, quantidade_disponivel, preco "
             "FROM produtos ORDER BY nome ASC"
         )
-        cur = self.conn.execute(q)
-        return [
-            Produto(
-                id=int(r["id"]),
-                nome=r["nome"],
-                descricao=r["descricao"],
-                quantidade_disponivel=int(r["quantidade_disponivel"]),
-                preco=float(r["preco"]),
-            )
-            for r in cur.fetchall()
+        hidratar = Produto.hidratar
+        return [hidratar(*r) for r in _tuplas(self.conn, q)]
+
+    def buscar(self, texto: str, limite: int = 20) -> List[Produto]:
+        """Produtos cujo nome ou descrição têm todos os termos de ``texto``.
+
+        Cada termo (de 2 caracteres ou mais) casa como prefixo: "arr fei" acha
+        "Arroz e feijão", sem diferença de maiúsculas nem acentos. A busca usa o
+        índice FTS5 ``produtos_busca``. Primeiro vêm os produtos com todos os
+        termos no nome, ordenados por relevância (bm25) entre todos os que casam.
+        Se não enchem a página, ela é completada pelos demais que casam (termos
+        na descrição), ordenados por bm25 entre os ``_CANDIDATOS_BUSCA`` mais
+        recentes. Sem FTS5 no SQLite, cai para ``LIKE`` no nome, em ordem
+        alfabética.
+        """
+        termos = [t for t in _TERMO.findall(texto.casefold()) if len(t) >= _MIN_TERMO]
+        if not termos:
+            raise ValueError(f"Informe ao menos um termo com {_MIN_TERMO} caracteres")
+        termos = termos[:_MAX_TERMOS]
+        colunas = "p.id, p.nome, p.descricao, p.quantidade_disponivel, p.preco"
+        hidratar = Produto.hidratar
+        if not busca_de_produtos_disponivel(self.conn):
+            # Os termos só têm letras e dígitos: nada a escapar no LIKE
+            conds = " AND ".join(["p.nome LIKE ?"] * len(termos))
+            q = f"SELECT {colunas} FROM produtos p WHERE {conds} ORDER BY p.nome LIMIT ?"
+            params = [f"%{t}%" for t in termos] + [int(limite)]
+            return [hidratar(*r) for r in _tuplas(self.conn, q, params)]
+
+        # Termos entre aspas: nada do texto digitado vira operador FTS5
+        consulta = " ".join(f'"{t}"*' for t in termos)
+        q_nome = (
+            f"SELECT {colunas} FROM ("
+            "SELECT rowid, rank FROM produtos_busca WHERE produtos_busca MATCH ? "
+            "ORDER BY rank LIMIT ?"
+            ") b JOIN produtos p ON p.id = b.rowid ORDER BY b.rank"
+        )
+        achados = [
+            hidratar(*r)
+            for r in _tuplas(self.conn, q_nome, [f"{{nome}} : ({consulta})", int(limite)])
         ]
+        if len(achados) >= limite:
+            return achados
+        # Completa com os demais; os já listados pelo nome ficam de fora
+        q_resto = (
+            f"SELECT {colunas} FROM ("
+            "SELECT rowid, rank FROM produtos_busca WHERE produtos_busca MATCH ? "
+            "ORDER BY rowid DESC LIMIT ?"
+            ") b JOIN produtos p ON p.id = b.rowid ORDER BY b.rank LIMIT ?"
+        )
+        vistos = {p.id for p in achados}
+        for r in _tuplas(self.conn, q_resto, [consulta, _CANDIDATOS_BUSCA, limite + len(vistos)]):
+            if r[0] not in vistos and len(achados) < limite:
+                achados.append(hidratar(*r))
+        return achados
+
+    def listar_pagina(
+        self, limite: int, *, apos: Optional[Tuple[str, int]] = None
+    ) -> List[Produto]:
+        """Página ordenada por ``(nome, id)`` começando depois da chave ``apos``."""
+        conds, params = "", []
+        if apos is not None:
+            conds = "WHERE (nome, id) > (?, ?)"
+            params = [apos[0], int(apos[1])]
+        q = (
+            "SELECT id, nome, descricao, quantidade_disponivel, preco "
+            f"FROM produtos {conds} ORDER BY nome ASC, id ASC LIMIT ?"
+        )
+        hidratar = Produto.hidratar
+        return [hidratar(*r) for r in _tuplas(self.conn, q, [*params, int(limite)])]
+
+    def listar_pagina_json(
+        self, limite: int, *, apos: Optional[Tuple[str, int]] = None
+    ) -> Tuple[str, Optional[Tuple[str, int]]]:
+        """Como ``listar_pagina``, com a página já em JSON (array montado pelo SQLite).
+
+        Devolve também a chave ``(nome, id)`` do último item quando há página seguinte.
+        """
+        conds, params = "", []
+        if apos is not None:
+            conds = "WHERE (nome, id) > (?, ?)"
+            params = [apos[0], int(apos[1])]
+        base = f"FROM produtos {conds} ORDER BY nome ASC, id ASC"
+        q = (
+            f"SELECT json_group_array({PRODUTO_JSON}), COUNT(*) FROM ("
+            f"SELECT id, nome, descricao, quantidade_disponivel, preco {base} LIMIT ?)"
+        )
+        itens, n = _tuplas(self.conn, q, [*params, int(limite)]).fetchone()
+        if n < limite:
+            return itens, None
+        # Último item e se existe um seguinte, só pelo índice de nome
+        chaves = _tuplas(
+            self.conn, f"SELECT nome, id {base} LIMIT 2 OFFSET ?", [*params, n - 1]
+        ).fetchall()
+        return itens, (tuple(chaves[0]) if len(chaves) == 2 else None)
 
     def ajustar_estoque(self, produto_id: int, delta: int) -> None:
-        # Garante que não fique negativo
-        atual = self.obter_por_id(produto_id)
-        if not atual:
-            raise ValueError("Produto inexistente")
-        nova_qtd = atual.quantidade_disponivel + int(delta)
-        if nova_qtd < 0:
-            raise ValueError("Estoque insuficiente para a operação")
-        self.conn.execute(
-            "UPDATE produtos SET quantidade_disponivel=? WHERE id=?",
-            (nova_qtd, int(produto_id)),
+        # Garante que não fique negativo na própria instrução (sem ler antes)
+        cur = self.conn.execute(
+            "UPDATE produtos SET quantidade_disponivel = quantidade_disponivel + ? "
+            "WHERE id=? AND quantidade_disponivel + ? >= 0",
+            (int(delta), int(produto_id), int(delta)),
+        )
+        if cur.rowcount == 0:
+            self._falha_estoque(produto_id)
+        self._registrar_escrita(produto_id)
+
+    def baixar_estoque(self, produto_id: int, quantidade: int) -> Tuple[float, int]:
+        """Baixa condicional do estoque em uma única instrução.
+
+        Retorna ``(preco, quantidade_restante)``. Deve rodar dentro de uma
+        transação de escrita para que o preço devolvido seja o do momento da baixa.
+        """
+        params = (int(quantidade), int(produto_id), int(quantidade))
+        if SUPORTA_RETURNING:
+            rows = self.conn.execute(
+                "UPDATE produtos SET quantidade_disponivel = quantidade_disponivel - ? "
+                "WHERE id=? AND quantidade_disponivel >= ? "
+                "RETURNING preco, quantidade_disponivel",
+                params,
+            ).fetchall()
+            if not rows:
+                self._falha_estoque(produto_id)
+            return float(rows[0][0]), int(rows[0][1])
+
+        cur = self.conn.execute(
+            "UPDATE produtos SET quantidade_disponivel = quantidade_disponivel - ? "
+            "WHERE id=? AND quantidade_disponivel >= ?",
+            params,
+        )
+        if cur.rowcount == 0:
+            self._falha_estoque(produto_id)
+        row = self.conn.execute(
+            "SELECT preco, quantidade_disponivel FROM produtos WHERE id=?", (int(produto_id),)
+        ).fetchone()
+        return float(row[0]), int(row[1])
+
+    def obter_estoques(self, ids: Iterable[int]) -> Dict[int, Tuple[float, int]]:
+        """Mapeia ``id -> (preco, quantidade_disponivel)`` em poucas consultas."""
+        distintos = sorted({int(i) for i in ids})
+        estoques: Dict[int, Tuple[float, int]] = {}
+        for bloco in _em_blocos(distintos):
+            marcadores = ",".join("?" * len(bloco))
+            q = (
+                "SELECT id, preco, quantidade_disponivel FROM produtos "
+                f"WHERE id IN ({marcadores})"
+            )
+            for r in self.conn.execute(q, bloco):
+                estoques[int(r[0])] = (float(r[1]), int(r[2]))
+        return estoques
+
+    def ids_existentes(self, ids: Iterable[int]) -> set[int]:
+        distintos = sorted({int(i) for i in ids})
+        existentes: set[int] = set()
+        for bloco in _em_blocos(distintos):
+            marcadores = ",".join("?" * len(bloco))
+            q = f"SELECT id FROM produtos WHERE id IN ({marcadores})"
+            existentes.update(int(r[0]) for r in self.conn.execute(q, bloco))
+        return existentes
+
+    def inserir_lote(self, produtos: Sequence[Produto]) -> None:
+        q = (
+            "INSERT INTO produtos (nome, descricao, quantidade_disponivel, preco) "
+            "VALUES (?, ?, ?, ?)"
+        )
+        self.conn.executemany(
+            q,
+            [
+                (
+                    p.nome.strip(),
+                    p.descricao or "",
+                    int(p.quantidade_disponivel),
+                    float(p.preco),
+                )
+                for p in produtos
+            ],
         )
 
+    def baixar_estoques(self, quantidades: Mapping[int, int]) -> None:
+        """Baixa condicional em lote (``executemany``) para ``id -> quantidade``."""
+        cur = self.conn.executemany(
+            "UPDATE produtos SET quantidade_disponivel = quantidade_disponivel - ? "
+            "WHERE id=? AND quantidade_disponivel >= ?",
+            [(int(q), int(pid), int(q)) for pid, q in quantidades.items()],
+        )
+        if cur.rowcount != len(quantidades):
+            raise ValueError("Estoque insuficiente para a operação")
+
+    def _falha_estoque(self, produto_id: int) -> None:
+        # A atualização condicional não casou: distingue a causa para a mensagem
+        existe = self.conn.execute(
+            "SELECT 1 FROM produtos WHERE id=?", (int(produto_id),)
+        ).fetchone()
+        if not existe:
+            raise ValueError("Produto inexistente")
+        raise ValueError("Estoque insuficiente para a operação")
+
+
+# Toda venda guarda o preço efetivo: o informado ou, na falta dele, o do produto
+# no momento da escrita. Resumo diário, pontas dos relatórios, snapshot e ranking
+# leem só ``preco_unitario``, então a mudança posterior de preço não os separa
+_INSERIR_VENDA = (
+    "INSERT INTO vendas (produto_id, quantidade, data_venda, preco_unitario, data_venda_ts) "
+    "VALUES (?, ?, ?, COALESCE(?, (SELECT preco FROM produtos WHERE id = ?)), ?)"
+)
+
 
 class RepositorioVendaSQL:
-    """Repositório relacional de Vendas (SQLite)."""
+    """Repositório relacional de Vendas (SQLite).
+
+    As leituras cobrem também os meses arquivados (``infra.particoes``), consultando
+    só as partições que cruzam o período pedido.
+    """
 
     def __init__(self, conn: sqlite3.Connection) -> None:
         self.conn = conn
 
     def inserir(self, venda: Venda, *, preco_unitario: float | None = None) -> Venda:
-        q = (
-            "INSERT INTO vendas (produto_id, quantidade, data_venda, preco_unitario) "
-            "VALUES (?, ?, ?, ?)"
-        )
-        # Persistimos datas como ISO 8601 para compatibilidade
+        """Grava a venda; sem ``preco_unitario``, fica o preço atual do produto."""
+        # Persistimos datas como ISO 8601 para compatibilidade e em epoch para consultas
         dt = venda.data_venda.isoformat()
         cur = self.conn.execute(
-            q,
+            _INSERIR_VENDA,
             (
                 int(venda.produto_id),
                 int(venda.quantidade),
                 dt,
                 None if preco_unitario is None else float(preco_unitario),
+                int(venda.produto_id),
+                epoch_utc(venda.data_venda),
             ),
         )
         venda.id = int(cur.lastrowid)
         return venda
 
+    def inserir_lote(
+        self, vendas: Sequence[Venda], precos: Sequence[float | None]
+    ) -> List[Venda]:
+        """Insere várias vendas com ``executemany``.
+
+        Preço ``None`` grava o preço atual do produto, como em ``inserir``. Deve
+        rodar dentro de uma transação de escrita: com o lock mantido, os IDs
+        gerados pelo AUTOINCREMENT são consecutivos e terminam em ``sqlite_sequence``.
+        """
+        if not vendas:
+            return []
+        self.conn.executemany(
+            _INSERIR_VENDA,
+            [
+                (
+                    int(v.produto_id),
+                    int(v.quantidade),
+                    v.data_venda.isoformat(),
+                    None if p is None else float(p),
+                    int(v.produto_id),
+                    epoch_utc(v.data_venda),
+                )
+                for v, p in zip(vendas, precos)
+            ],
+        )
+        row = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name='vendas'").fetchone()
+        primeiro = int(row[0]) - len(vendas) + 1
+        for i, venda in enumerate(vendas):
+            venda.id = primeiro + i
+        return list(vendas)
+
     def listar(self) -> List[Venda]:
         q = (
-            "SELECT id, produto_id, quantidade, data_venda FROM vendas "
-            "ORDER BY datetime(data_venda) DESC, id DESC"
-        )
-        cur = self.conn.execute(q)
-        vendas: List[Venda] = []
-        for r in cur.fetchall():
-            vendas.append(
-                Venda(
-                    id=int(r["id"]),
-                    produto_id=int(r["produto_id"]),
-                    quantidade=int(r["quantidade"]),
-                    data_venda=datetime.fromisoformat(r["data_venda"]),
-                )
-            )
-        return vendas
+            "SELECT id, produto_id, quantidade, data_venda FROM {vendas} "
+            "ORDER BY data_venda_ts DESC, id DESC"
+        )
+        hidratar, de_iso = Venda.hidratar, datetime.fromisoformat
+        with fontes_de_vendas(self.conn) as fontes:
+            return [
+                hidratar(r[0], r[1], r[2], de_iso(r[3]))
+                for f in reversed(fontes)
+                for r in _tuplas(self.conn, q.format(vendas=f.tabela))
+            ]
+
+    def listar_pagina(
+        self,
+        limite: int,
+        *,
+        apos: Optional[Tuple[int, int]] = None,
+        produto_id: Optional[int] = None,
+        inicio_ts: Optional[int] = None,
+        fim_ts: Optional[int] = None,
+    ) -> List[Tuple[Venda, int]]:
+        """Página ordenada por ``(data_venda_ts, id)`` decrescente.
+
+        ``apos`` é a chave da última venda da página anterior. Devolve pares
+        ``(venda, data_venda_ts)`` para que o chamador monte o próximo cursor.
+        Percorre as partições da mais recente para a mais antiga até completar.
+        """
+        where, params, teto = _filtros_pagina(apos, produto_id, inicio_ts, fim_ts)
+        q = (
+            "SELECT id, produto_id, quantidade, data_venda, data_venda_ts FROM {vendas} "
+            f"{where} ORDER BY data_venda_ts DESC, id DESC LIMIT ?"
+        )
+        hidratar, de_iso = Venda.hidratar, datetime.fromisoformat
+        pagina: List[Tuple[Venda, int]] = []
+        with fontes_de_vendas(self.conn, inicio_ts, teto) as fontes:
+            for f in reversed(fontes):
+                faltam = int(limite) - len(pagina)
+                if faltam <= 0:
+                    break
+                pagina += [
+                    (hidratar(r[0], r[1], r[2], de_iso(r[3])), r[4])
+                    for r in _tuplas(self.conn, q.format(vendas=f.tabela), [*params, faltam])
+                ]
+        return pagina
+
+    def listar_pagina_json(
+        self,
+        limite: int,
+        *,
+        apos: Optional[Tuple[int, int]] = None,
+        produto_id: Optional[int] = None,
+        inicio_ts: Optional[int] = None,
+        fim_ts: Optional[int] = None,
+    ) -> Tuple[str, Optional[Tuple[int, int]]]:
+        """Como ``listar_pagina``, com a página já em JSON (um array por partição).
+
+        Devolve também a chave ``(data_venda_ts, id)`` da última venda quando há
+        página seguinte; a conferência percorre só o índice de data.
+        """
+        where, params, teto = _filtros_pagina(apos, produto_id, inicio_ts, fim_ts)
+        base = f"FROM {{vendas}} {where} ORDER BY data_venda_ts DESC, id DESC"
+        q = (
+            f"SELECT json_group_array({_VENDA_JSON}), COUNT(*) FROM ("
+            f"SELECT id, produto_id, quantidade, data_venda {base} LIMIT ?)"
+        )
+        partes: List[str] = []
+        faltam = int(limite)
+        ultima: Optional[Tuple[int, int]] = None
+        with fontes_de_vendas(self.conn, inicio_ts, teto) as fontes:
+            for f in reversed(fontes):
+                fonte = base.format(vendas=f.tabela)
+                if faltam == 0:
+                    # Página cheia na partição anterior: só falta saber se há mais
+                    if _tuplas(self.conn, f"SELECT 1 {fonte} LIMIT 1", params).fetchone():
+                        return json_sqlite.juntar_arrays(partes), ultima
+                    continue
+                itens, n = _tuplas(
+                    self.conn, q.format(vendas=f.tabela), [*params, faltam]
+                ).fetchone()
+                partes.append(itens)
+                faltam -= n
+                if faltam == 0:
+                    chaves = _tuplas(
+                        self.conn,
+                        f"SELECT data_venda_ts, id {fonte} LIMIT 2 OFFSET ?",
+                        [*params, n - 1],
+                    ).fetchall()
+                    ultima = tuple(chaves[0])
+                    if len(chaves) == 2:
+                        return json_sqlite.juntar_arrays(partes), ultima
+        return json_sqlite.juntar_arrays(partes or ["[]"]), None
+
+    def iterar_lotes(
+        self,
+        *,
+        inicio_ts: Optional[int] = None,
+        fim_ts: Optional[int] = None,
+        tamanho_lote: int = 5000,
+    ) -> Iterator[List[tuple]]:
+        """Percorre as vendas em ordem cronológica, ``tamanho_lote`` linhas por vez.
+
+        Cada linha é ``(id, produto_id, quantidade, data_venda, preco_unitario)``.
+        Nada além do lote corrente fica em memória.
+        """
+        conds: List[str] = []
+        params: List[int] = []
+        if inicio_ts is not None:
+            conds.append("v.data_venda_ts >= ?")
+            params.append(int(inicio_ts))
+        if fim_ts is not None:
+            conds.append("v.data_venda_ts <= ?")
+            params.append(int(fim_ts))
+        where = ("WHERE " + " AND ".join(conds)) if conds else ""
+        q = (
+            "SELECT v.id, v.produto_id, v.quantidade, v.data_venda, v.preco_unitario "
+            f"FROM {{vendas}} v {where} ORDER BY v.data_venda_ts ASC, v.id ASC"
+        )
+        with fontes_de_vendas(self.conn, inicio_ts, fim_ts) as fontes:
+            for f in fontes:
+                cur = _tuplas(self.conn, q.format(vendas=f.tabela), params)
+                try:
+                    while True:
+                        lote = cur.fetchmany(tamanho_lote)
+                        if not lote:
+                            break
+                        yield lote
+                finally:
+                    cur.close()
+
+    def carregar_lote(
+        self,
+        *,
+        inicio_ts: Optional[int] = None,
+        fim_ts: Optional[int] = None,
+        produto_id: Optional[int] = None,
+        tamanho_lote: int = 50000,
+    ) -> VendasBatch:
+        """Carrega vendas em formato colunar (``VendasBatch``), sem ordem definida."""
+        conds: List[str] = []
+        params: List[int] = []
+        if produto_id is not None:
+            conds.append("v.produto_id = ?")
+            params.append(int(produto_id))
+        if inicio_ts is not None:
+            conds.append("v.data_venda_ts >= ?")
+            params.append(int(inicio_ts))
+        if fim_ts is not None:
+            conds.append("v.data_venda_ts <= ?")
+            params.append(int(fim_ts))
+        where = ("WHERE " + " AND ".join(conds)) if conds else ""
+        q = (
+            "SELECT v.id, v.produto_id, v.quantidade, v.data_venda_ts, v.preco_unitario "
+            f"FROM {{vendas}} v {where}"
+        )
+        lote = VendasBatch()
+        with fontes_de_vendas(self.conn, inicio_ts, fim_ts) as fontes:
+            for f in fontes:
+                cur = _tuplas(self.conn, q.format(vendas=f.tabela), params)
+                try:
+                    while True:
+                        linhas = cur.fetchmany(tamanho_lote)
+                        if not linhas:
+                            break
+                        lote.anexar(linhas)
+                finally:
+                    cur.close()
+        return lote
 
     def listar_por_produto(self, produto_id: int) -> List[Venda]:
         q = (
-            "SELECT id, produto_id, quantidade, data_venda FROM vendas "
-            "WHERE produto_id=? ORDER BY datetime(data_venda) DESC, id DESC"
-        )
-        cur = self.conn.execute(q, (int(produto_id),))
-        vendas: List[Venda] = []
-        for r in cur.fetchall():
-            vendas.append(
-                Venda(
-                    id=int(r["id"]),
-                    produto_id=int(r["produto_id"]),
-                    quantidade=int(r["quantidade"]),
-                    data_venda=datetime.fromisoformat(r["data_venda"]),
-                )
-            )
-        return vendas
+            "SELECT id, produto_id, quantidade, data_venda FROM {vendas} "
+            "WHERE produto_id=? ORDER BY data_venda_ts DESC, id DESC"
+        )
+        hidratar, de_iso = Venda.hidratar, datetime.fromisoformat
+        with fontes_de_vendas(self.conn) as fontes:
+            return [
+                hidratar(r[0], r[1], r[2], de_iso(r[3]))
+                for f in reversed(fontes)
+                for r in _tuplas(self.conn, q.format(vendas=f.tabela), (int(produto_id),))
+            ]
@@ -0,0 +1,151 @@
+"""Um arquivo SQLite por loja: roteamento de chaves de loja para bancos próprios.
+
+Cada loja fica em ``<diretorio>/<chave>/mercado.sqlite3``, com seu próprio
+lock de escrita, WAL, migrações, arquivo morto (``arquivo/``) e snapshot. Um
+diretório por loja (e não um arquivo) evita que os anexos de ``infra.particoes``
+de lojas diferentes colidam no mesmo ``arquivo/vendas_AAAA.sqlite3``.
+
+Os ids de produtos e vendas são locais à loja: ``produto_id`` 7 de uma loja não
+tem relação com o 7 de outra.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+from infra.catalogo import CatalogoEmMemoria
+from infra.forja_persistencia import ForjaDePersistencia, PoolDeConexoes, PragmasDeConexao
+from infra.metricas import RegistroDeMetricas
+
+if TYPE_CHECKING:
+    from services.servicos import OrquestradorDeFluxoComercial
+
+ARQUIVO_DA_LOJA = "mercado.sqlite3"
+# A chave vira nome de diretório: nada de separadores, "..", espaços ou maiúsculas
+_CHAVE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+def validar_chave(loja: str) -> str:
+    chave = str(loja).strip().lower()
+    if not _CHAVE.match(chave):
+        raise ValueError(f"Chave de loja inválida: {loja!r}")
+    return chave
+
+
+class RoteadorDeLojas:
+    """Mapeia a chave de cada loja para a sua forja e o seu pool de conexões.
+
+    Forja e pool são criados na primeira vez que a loja é usada; nesse momento
+    as migrações pendentes do arquivo da loja são aplicadas (uma vez por
+    processo). Escritas só chegam a uma loja por ``conexao``/``servico`` com a
+    chave dela, então lojas diferentes nunca disputam o mesmo lock.
+    """
+
+    def __init__(
+        self,
+        diretorio: str | Path | None = None,
+        *,
+        pragmas: PragmasDeConexao | None = None,
+        metricas: Optional[RegistroDeMetricas] = None,
+        tamanho_pool: int = 4,
+    ) -> None:
+        self._diretorio = Path(diretorio) if diretorio else Path("data") / "lojas"
+        self._pragmas = pragmas
+        self._metricas = metricas
+        self._tamanho_pool = tamanho_pool
+        self._pools: Dict[str, PoolDeConexoes] = {}
+        self._catalogos: Dict[str, CatalogoEmMemoria] = {}
+        self._lock = threading.Lock()
+        self._fechado = False
+
+    @property
+    def diretorio(self) -> Path:
+        return self._diretorio
+
+    def caminho(self, loja: str) -> Path:
+        return self._diretorio / validar_chave(loja) / ARQUIVO_DA_LOJA
+
+    def lojas(self) -> List[str]:
+        """Chaves das lojas com banco em disco, em ordem alfabética."""
+        if not self._diretorio.is_dir():
+            return []
+        return sorted(
+            d.name
+            for d in self._diretorio.iterdir()
+            if _CHAVE.match(d.name) and (d / ARQUIVO_DA_LOJA).exists()
+        )
+
+    def caminhos(self, lojas: Optional[List[str]] = None) -> Dict[str, Path]:
+        """``{loja: arquivo}`` das lojas pedidas (padrão: todas as existentes)."""
+        chaves = self.lojas() if lojas is None else [validar_chave(k) for k in lojas]
+        caminhos = {k: self.caminho(k) for k in chaves}
+        faltando = [k for k, c in caminhos.items() if not c.exists()]
+        if faltando:
+            raise ValueError(f"Loja(s) sem banco: {', '.join(faltando)}")
+        return caminhos
+
+    def forja(self, loja: str) -> ForjaDePersistencia:
+        return self.pool(loja).forja
+
+    def pool(self, loja: str, *, criar: bool = True) -> PoolDeConexoes:
+        """Pool da loja; com ``criar=False`` uma loja sem banco é erro."""
+        chave = validar_chave(loja)
+        with self._lock:
+            if self._fechado:
+                raise RuntimeError("Roteador de lojas encerrado")
+            pool = self._pools.get(chave)
+            if pool is not None:
+                return pool
+            caminho = self.caminho(chave)
+            if not criar and not caminho.exists():
+                raise ValueError(f"Loja desconhecida: {chave}")
+            forja = ForjaDePersistencia(
+                str(caminho), pragmas=self._pragmas, metricas=self._metricas
+            )
+            # Sob o lock do roteador: duas threads não migram a mesma loja, e as
+            # demais lojas esperam só o tempo de duas leituras
+            forja.criar_esquema()
+            pool = forja.criar_pool(tamanho_maximo=self._tamanho_pool)
+            self._pools[chave] = pool
+            return pool
+
+    def catalogo(self, loja: str) -> CatalogoEmMemoria:
+        """Catálogo em memória da loja, compartilhado entre os serviços dela."""
+        chave = validar_chave(loja)
+        with self._lock:
+            catalogo = self._catalogos.get(chave)
+            if catalogo is None:
+                catalogo = self._catalogos[chave] = CatalogoEmMemoria()
+            return catalogo
+
+    @contextmanager
+    def conexao(self, loja: str, *, criar: bool = True) -> Iterator[sqlite3.Connection]:
+        with self.pool(loja, criar=criar).conexao() as conn:
+            yield conn
+
+    @contextmanager
+    def servico(
+        self, loja: str, *, criar: bool = True
+    ) -> Iterator[OrquestradorDeFluxoComercial]:
+        """``OrquestradorDeFluxoComercial`` ligado apenas ao banco da loja."""
+        # Import tardio: services depende de infra, não o contrário
+        from services.servicos import OrquestradorDeFluxoComercial
+
+        with self.conexao(loja, criar=criar) as conn:
+            yield OrquestradorDeFluxoComercial(conn, self.catalogo(loja))
+
+    def estatisticas(self) -> Dict[str, dict]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {chave: pool.estatisticas() for chave, pool in sorted(pools.items())}
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._fechado = True
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.fechar()
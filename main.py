@@ -1,8 +1,17 @@
 from __future__ import annotations
 
-from typing import Callable
+import argparse
+import json
+import sys
+from typing import Callable, Sequence
 
-from infra.forja_persistencia import ForjaDePersistencia
+from infra.forja_persistencia import ForjaDePersistencia, PoolDeConexoes
+from infra.particoes import arquivar_mes, listar_particoes
+from infra.repositorios import epoch_utc
+from services import relatorios
+from services.alteracoes import compactar_alteracoes
+from services.exportacao import FORMATOS, exportar_vendas
+from services.importacao import IMPORTADORES, detectar_formato
 from services.servicos import OrquestradorDeFluxoComercial
 
 
@@ -31,11 +40,8 @@ def menu() -> None:
     print("0) Sair")
 
 
-def main() -> None:
-    forja = ForjaDePersistencia()
-    # Garante que o esquema exista
-    forja.criar_esquema()
-    conn = forja.conectar()
+def console(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    conn = pool.obter()
     try:
         svc = OrquestradorDeFluxoComercial(conn)
 
@@ -104,8 +110,223 @@ def main() -> None:
             else:
                 print("Opção inválida.")
     finally:
-        conn.close()
+        pool.devolver(conn)
+
+
+def cmd_importar(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    formato = args.formato or detectar_formato(args.arquivo)
+    importar = IMPORTADORES[args.tipo]
+    rejeitados = open(args.rejeitados, "w", encoding="utf-8") if args.rejeitados else None
+    try:
+        with pool.conexao() as conn, open(
+            args.arquivo, encoding="utf-8-sig", newline=""
+        ) as arquivo:
+            rel = importar(
+                conn,
+                arquivo,
+                formato=formato,
+                tamanho_lote=args.lote,
+                adiar_indices=args.adiar_indices,
+                rejeitados=rejeitados,
+            )
+    finally:
+        if rejeitados:
+            rejeitados.close()
+    print(
+        f"{rel.tipo}: {rel.inseridas} inseridas, {rel.rejeitadas} rejeitadas "
+        f"de {rel.lidas} lidas em {rel.segundos:.2f}s ({rel.linhas_por_segundo:.0f} linhas/s)"
+    )
+
+
+def cmd_reconstruir_resumo(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    with pool.conexao() as conn:
+        relatorios.reconstruir_vendas_diarias(conn)
+        dias = conn.execute("SELECT COUNT(DISTINCT dia) FROM vendas_diarias").fetchone()[0]
+    print(f"Resumo diário reconstruído ({dias} dias)")
+
+
+def cmd_exportar_vendas(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    inicio = epoch_utc(args.start) if args.start else None
+    fim = epoch_utc(args.end) if args.end else None
+    saida = sys.stdout.buffer if args.saida == "-" else open(args.saida, "wb")
+    try:
+        with pool.conexao() as conn:
+            for pedaco in exportar_vendas(
+                conn, formato=args.formato, inicio_ts=inicio, fim_ts=fim, comprimir=args.gzip
+            ):
+                saida.write(pedaco)
+    finally:
+        if saida is not sys.stdout.buffer:
+            saida.close()
+
+
+def cmd_arquivar_mes(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    with pool.conexao() as conn:
+        for mes in args.meses:
+            res = arquivar_mes(conn, mes)
+            print(f"{res.mes}: {res.linhas} vendas movidas para {res.arquivo}")
+        for p in listar_particoes(conn):
+            print(f"  {p['mes']}  {p['linhas']:>10} vendas  {p['arquivo']}")
+
+
+def cmd_compactar_alteracoes(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    with pool.conexao() as conn:
+        res = compactar_alteracoes(conn, reter_dias=args.dias, compactar_apos=args.horas * 3600)
+    print(
+        f"{res['descartadas']} alterações descartadas, {res['compactadas']} compactadas "
+        f"(cursores abaixo de {res['descartadas_ate']} recebem 410)"
+    )
+
+
+def cmd_snapshot(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    # Imports tardios aqui e em verificar-planos: só estes comandos usam NumPy,
+    # que sozinho dobraria o tempo de partida dos demais
+    from infra.colunar import atualizar_snapshot
+
+    diretorio = args.diretorio or pool.forja.caminho.parent / "snapshot"
+    with pool.conexao() as conn:
+        info = atualizar_snapshot(conn, diretorio, completo=args.completo)
+    print(
+        f"Snapshot em {diretorio}: {info['novas']} vendas acrescentadas, "
+        f"{info['linhas']} no total (último id {info['ultimo_id']})"
+    )
+
+
+def cmd_verificar_planos(pool: PoolDeConexoes, args: argparse.Namespace) -> None:
+    from services.planos import CONSULTAS, verificar_planos
+
+    violacoes = verificar_planos(pool.forja)
+    for v in violacoes:
+        print(f"FALHA {v}")
+    print(f"{len(CONSULTAS)} consultas verificadas, {len(violacoes)} problemas de plano")
+    if violacoes:
+        raise SystemExit(1)
+
+
+def cmd_relatorio_rede(pool: PoolDeConexoes | None, args: argparse.Namespace) -> None:
+    from infra.shards import RoteadorDeLojas
+    from services.relatorios_lojas import RelatoriosDaRede
+
+    roteador = RoteadorDeLojas(args.lojas_dir)
+    rede = RelatoriosDaRede(roteador, processos=args.processos)
+    lojas = args.lojas.split(",") if args.lojas else None
+    try:
+        if args.relatorio == "receita":
+            res = rede.receita_total(start=args.start, end=args.end, lojas=lojas)
+        elif args.relatorio == "receita-por-dia":
+            res = rede.receita_por_dia(start=args.start, end=args.end, lojas=lojas)
+        else:
+            res = rede.ranking_produtos(
+                start=args.start, end=args.end, limit=args.limit, lojas=lojas
+            )
+    finally:
+        rede.fechar()
+        roteador.fechar()
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Console Comercial · Cohorte de Dados")
+    parser.add_argument(
+        "--loja", help="usa o banco da loja em <lojas-dir>/<loja>/ em vez de data/mercado"
+    )
+    parser.add_argument("--lojas-dir", default="data/lojas", help="padrão: data/lojas")
+    parser.set_defaults(executar=console)
+    sub = parser.add_subparsers(dest="comando")
+
+    imp = sub.add_parser("importar", help="Carga em massa de produtos ou vendas (CSV/JSONL)")
+    imp.add_argument("tipo", choices=sorted(IMPORTADORES))
+    imp.add_argument("arquivo")
+    imp.add_argument("--formato", choices=["csv", "jsonl"], help="padrão: pela extensão")
+    imp.add_argument("--lote", type=int, default=5000, help="linhas por transação")
+    imp.add_argument(
+        "--adiar-indices", action="store_true", help="remove idx_* e recria ao final"
+    )
+    imp.add_argument("--rejeitados", help="arquivo JSONL para as linhas rejeitadas")
+    imp.set_defaults(executar=cmd_importar)
+
+    res = sub.add_parser(
+        "reconstruir-resumo", help="Recalcula vendas_diarias a partir de vendas"
+    )
+    res.set_defaults(executar=cmd_reconstruir_resumo)
+
+    exp = sub.add_parser("exportar-vendas", help="Exporta vendas em CSV/NDJSON (streaming)")
+    exp.add_argument("--formato", choices=sorted(FORMATOS), default="ndjson")
+    exp.add_argument("--saida", default="-", help="arquivo de destino (padrão: stdout)")
+    exp.add_argument("--start", help="data/hora inicial (ISO 8601)")
+    exp.add_argument("--end", help="data/hora final (ISO 8601)")
+    exp.add_argument("--gzip", action="store_true", help="comprime a saída com gzip")
+    exp.set_defaults(executar=cmd_exportar_vendas)
+
+    arq = sub.add_parser(
+        "arquivar-mes", help="Move meses fechados de vendas para arquivo/vendas_AAAA.sqlite3"
+    )
+    arq.add_argument("meses", nargs="+", metavar="AAAA-MM", help="do mais antigo ao mais novo")
+    arq.set_defaults(executar=cmd_arquivar_mes)
+
+    alt = sub.add_parser(
+        "compactar-alteracoes",
+        help="Retenção do feed de alterações e compactação dos eventos de produto",
+    )
+    alt.add_argument("--dias", type=float, default=7.0, help="retenção (padrão: 7 dias)")
+    alt.add_argument(
+        "--horas", type=float, default=1.0, help="compacta produtos mais antigos (padrão: 1)"
+    )
+    alt.set_defaults(executar=cmd_compactar_alteracoes)
+
+    snp = sub.add_parser(
+        "snapshot", help="Cria/atualiza o snapshot colunar de vendas (só vendas novas)"
+    )
+    snp.add_argument("--diretorio", help="padrão: data/snapshot")
+    snp.add_argument("--completo", action="store_true", help="refaz o snapshot do zero")
+    snp.set_defaults(executar=cmd_snapshot)
+
+    pla = sub.add_parser(
+        "verificar-planos",
+        help="EXPLAIN QUERY PLAN das consultas registradas (falha em SCAN de vendas)",
+    )
+    pla.set_defaults(executar=cmd_verificar_planos)
+
+    rede = sub.add_parser(
+        "relatorio-rede", help="Relatório somado de todas as lojas (um processo por loja)"
+    )
+    rede.add_argument("relatorio", choices=["receita", "receita-por-dia", "ranking"])
+    rede.add_argument("--start", help="data/hora inicial (ISO 8601)")
+    rede.add_argument("--end", help="data/hora final (ISO 8601)")
+    rede.add_argument("--limit", type=int, default=10, help="itens do ranking")
+    rede.add_argument("--lojas", help="chaves separadas por vírgula (padrão: todas)")
+    rede.add_argument(
+        "--processos", type=int, help="workers (padrão: CPUs; 0 roda em sequência)"
+    )
+    rede.set_defaults(executar=cmd_relatorio_rede, sem_banco=True)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = criar_parser().parse_args(argv)
+    if getattr(args, "sem_banco", False):
+        args.executar(None, args)
+        return
+    if args.loja:
+        from infra.shards import RoteadorDeLojas
+
+        # O roteador aplica as migrações do banco da loja ao abrir o pool
+        roteador = RoteadorDeLojas(args.lojas_dir, tamanho_pool=1)
+        pool = roteador.pool(args.loja)
+    else:
+        roteador = None
+        forja = ForjaDePersistencia()
+        # Migrações e índices pendentes; com o esquema em dia, só leituras
+        forja.criar_esquema()
+        pool = forja.criar_pool(tamanho_maximo=1)
+    try:
+        args.executar(pool, args)
+    finally:
+        if roteador is not None:
+            roteador.fechar()
+        else:
+            pool.fechar()
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,224 @@
+"""Feed incremental de alterações de vendas e produtos (``GET /vendas/alteracoes``).
+
+A tabela ``alteracoes`` é preenchida por triggers na mesma transação de cada
+escrita (vendas, lotes, escrita agrupada, importações e ajustes de produto), então
+o feed não perde nem antecipa nada. O consumidor guarda o ``desde`` devolvido e o
+repassa na chamada seguinte; ``seq`` só cresce e, com um escritor por vez, fica
+visível em ordem.
+
+Itens::
+
+    {"seq": 8, "tipo": "venda", "id": 41, "criado_em": "...",
+     "dados": {"produto_id": 3, "quantidade": 2, "preco_unitario": 9.9, "data_venda": "..."}}
+    {"seq": 9, "tipo": "produto", "id": 3, "criado_em": "...",
+     "dados": {"nome": "...", "quantidade_disponivel": 15, "preco": 9.9}}
+
+Itens de ``produto`` trazem o estado após a escrita. Por isso a compactação pode
+manter só o último de cada produto sem mudar o estado final visto por quem lê.
+A retenção descarta o começo do log; um ``desde`` anterior ao descartado recebe
+``HistoricoDescartado`` (410 na API). O log também não cobre o que existia antes
+dele. Por isso um consumidor novo, ou um que recebeu 410, parte de uma carga
+completa:
+
+1. percorre ``GET /produtos`` e ``GET /vendas`` e guarda o cabeçalho
+   ``X-Alteracoes-Seq`` da primeira página de cada uma; o menor deles é ``S``;
+2. segue o feed com ``desde=S``.
+
+``S`` é lido antes das páginas, então nada confirmado depois dele fica de fora.
+O que entrou entre ``S`` e as páginas aparece nos dois lugares e é reaplicado
+sem efeito: vendas pelo ``id`` e produtos pelo estado completo.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from infra import json_sqlite
+from infra.forja_persistencia import transacao_imediata
+
+
+class HistoricoDescartado(Exception):
+    """O ``desde`` pedido é anterior ao que a retenção já removeu.
+
+    ``descartadas_ate`` é o maior ``seq`` descartado e ``atual`` o último
+    confirmado; o consumidor recarrega e segue a partir de um ``seq`` lido antes
+    da carga (``X-Alteracoes-Seq`` nas listagens).
+    """
+
+    def __init__(self, mensagem: str, descartadas_ate: int, atual: int) -> None:
+        super().__init__(mensagem)
+        self.descartadas_ate = descartadas_ate
+        self.atual = atual
+
+
+def _real_ou_nulo(coluna: str) -> str:
+    return f"CASE WHEN {coluna} IS NULL THEN NULL ELSE {json_sqlite.real(coluna)} END"
+
+
+_ITEM_JSON = f"""
+    CASE tipo
+    WHEN 'venda' THEN {json_sqlite.objeto(
+        seq="seq",
+        tipo="tipo",
+        id="entidade_id",
+        criado_em="strftime('%Y-%m-%dT%H:%M:%S', criado_ts, 'unixepoch')",
+        dados=json_sqlite.objeto(
+            produto_id="produto_id",
+            quantidade="quantidade",
+            preco_unitario=_real_ou_nulo("preco"),
+            data_venda="data_venda",
+        ),
+    )}
+    ELSE {json_sqlite.objeto(
+        seq="seq",
+        tipo="tipo",
+        id="entidade_id",
+        criado_em="strftime('%Y-%m-%dT%H:%M:%S', criado_ts, 'unixepoch')",
+        dados=json_sqlite.objeto(
+            nome="nome",
+            quantidade_disponivel="quantidade",
+            preco=_real_ou_nulo("preco"),
+        ),
+    )}
+    END
+"""
+
+
+def ultima_sequencia(conn: sqlite3.Connection) -> int:
+    """Maior ``seq`` já confirmado (não diminui com a retenção)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def listar_alteracoes_json(
+    conn: sqlite3.Connection, *, desde: int = 0, limite: int = 100
+) -> Tuple[str, int]:
+    """Corpo ``{"itens": [...], "desde": N}`` com as alterações após ``desde``.
+
+    ``N`` é o ``seq`` do último item (ou o próprio ``desde`` sem itens). Devolve
+    também a quantidade de itens. Página e marca da retenção saem da mesma
+    instrução, portanto do mesmo snapshot.
+    """
+    if limite <= 0:
+        raise ValueError("Limite deve ser positivo")
+    q = f"""
+        SELECT json_group_array({_ITEM_JSON}), COUNT(*), MAX(seq),
+               (SELECT versao FROM controle_versao WHERE chave = 'alteracoes_descartadas')
+        FROM (SELECT * FROM alteracoes WHERE seq > ? ORDER BY seq LIMIT ?)
+    """
+    itens, n, ultimo, descartadas = conn.execute(q, (int(desde), int(limite))).fetchone()
+    if descartadas and int(desde) < descartadas:
+        raise HistoricoDescartado(
+            f"Alterações até seq {descartadas} já descartadas; recarregue por "
+            "GET /produtos e GET /vendas e siga do X-Alteracoes-Seq delas",
+            int(descartadas),
+            ultima_sequencia(conn),
+        )
+    proximo = int(ultimo) if ultimo is not None else int(desde)
+    return f'{{"itens":{itens},"desde":{proximo}}}', int(n)
+
+
+def compactar_alteracoes(
+    conn: sqlite3.Connection,
+    *,
+    reter_dias: float = 7.0,
+    compactar_apos: float = 3600.0,
+    agora: Optional[float] = None,
+) -> Dict[str, int]:
+    """Retenção e compactação do log (tarefa periódica, ex.: ``cron``).
+
+    - descarta tudo o que tem mais de ``reter_dias`` dias e registra o maior
+      ``seq`` descartado;
+    - entre os itens com mais de ``compactar_apos`` segundos, mantém só o último
+      de cada produto (os anteriores já foram superados por ele). Vendas nunca
+      são compactadas.
+    """
+    agora = time.time() if agora is None else agora
+    with transacao_imediata(conn):
+        corte = conn.execute(
+            "SELECT MAX(seq) FROM alteracoes WHERE criado_ts < ?",
+            (int(agora - reter_dias * 86400),),
+        ).fetchone()[0]
+        descartadas = 0
+        if corte is not None:
+            descartadas = conn.execute("DELETE FROM alteracoes WHERE seq <= ?", (corte,)).rowcount
+            conn.execute(
+                "UPDATE controle_versao SET versao = MAX(versao, ?) "
+                "WHERE chave = 'alteracoes_descartadas'",
+                (corte,),
+            )
+        limite = conn.execute(
+            "SELECT MAX(seq) FROM alteracoes WHERE criado_ts < ?", (int(agora - compactar_apos),)
+        ).fetchone()[0]
+        compactadas = 0
+        if limite is not None:
+            compactadas = conn.execute(
+                """
+                DELETE FROM alteracoes WHERE seq IN (
+                    SELECT seq FROM (
+                        SELECT seq, ROW_NUMBER() OVER (
+                            PARTITION BY entidade_id ORDER BY seq DESC
+                        ) AS n
+                        FROM alteracoes
+                        WHERE tipo = 'produto' AND seq <= ?
+                    )
+                    WHERE n > 1
+                )
+                """,
+                (limite,),
+            ).rowcount
+        marca = conn.execute(
+            "SELECT versao FROM controle_versao WHERE chave = 'alteracoes_descartadas'"
+        ).fetchone()[0]
+    return {"descartadas": descartadas, "compactadas": compactadas, "descartadas_ate": marca}
+
+
+class VigiaDeAlteracoes:
+    """Acorda as requisições de long-poll quando surgem alterações novas.
+
+    Uma única tarefa consulta ``ler()`` (o último ``seq``) a cada ``intervalo``
+    segundos, e só enquanto houver alguém esperando. As escritas podem vir de
+    qualquer processo.
+    """
+
+    def __init__(self, ler: Callable[[], Awaitable[int]], *, intervalo: float = 0.2) -> None:
+        self._ler = ler
+        self._intervalo = intervalo
+        self._ultima = -1
+        self._evento = asyncio.Event()
+        self._esperando = 0
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def esperar(self, desde: int, timeout: float) -> bool:
+        """``True`` assim que houver ``seq`` acima de ``desde``; ``False`` no timeout."""
+        loop = asyncio.get_running_loop()
+        fim = loop.time() + timeout
+        self._esperando += 1
+        try:
+            while self._ultima <= desde:
+                if self._tarefa is None:
+                    self._tarefa = loop.create_task(self._vigiar())
+                restante = fim - loop.time()
+                if restante <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(self._evento.wait(), restante)
+                except asyncio.TimeoutError:
+                    return False
+            return True
+        finally:
+            self._esperando -= 1
+
+    async def _vigiar(self) -> None:
+        try:
+            while self._esperando > 0:
+                ultima = await self._ler()
+                if ultima != self._ultima:
+                    self._ultima = ultima
+                    evento, self._evento = self._evento, asyncio.Event()
+                    evento.set()
+                await asyncio.sleep(self._intervalo)
+        finally:
+            self._tarefa = None
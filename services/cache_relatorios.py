@@ -0,0 +1,103 @@
+"""Cache de resultados dos relatórios com invalidação por versão dos dados."""
+from __future__ import annotations
+
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from infra.forja_persistencia import versao_dados
+
+
+def _tamanho(valor: Any) -> int:
+    # Estimativa grosseira do espaço ocupado pelo resultado (listas/dicts rasos)
+    total = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        total += sum(_tamanho(k) + _tamanho(v) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple)):
+        total += sum(_tamanho(v) for v in valor)
+    return total
+
+
+class CacheDeRelatorios:
+    """Memoização LRU + TTL para as funções de ``services.relatorios``.
+
+    A chave é a função mais os parâmetros (``start``, ``end``, ``limit``, ``dias``...).
+    Cada entrada guarda a versão dos dados (``controle_versao``) lida antes do
+    cálculo; se a versão atual for outra, a entrada é descartada. Como o
+    contador vive no arquivo, escritas feitas por outros workers também invalidam.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entradas: int = 256,
+        ttl: float = 60.0,
+        max_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        self._max_entradas = max_entradas
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._entradas: OrderedDict[Hashable, Tuple[int, float, Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.despejos = 0
+
+    def obter(
+        self, conn: sqlite3.Connection, func: Callable[..., Any], **params: Any
+    ) -> Any:
+        chave = (func.__module__, func.__qualname__, tuple(sorted(params.items())))
+        versao = versao_dados(conn)
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                versao_entrada, expira_em, valor, _ = entrada
+                if versao_entrada == versao and expira_em > agora:
+                    self._entradas.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                self._remover(chave)
+                self.invalidacoes += 1
+            self.falhas += 1
+
+        valor = func(conn, **params)
+        tamanho = _tamanho(valor)
+        if tamanho > self._max_bytes:
+            return valor
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (versao, agora + self._ttl, valor, tamanho)
+            self._bytes += tamanho
+            while self._entradas and (
+                len(self._entradas) > self._max_entradas or self._bytes > self._max_bytes
+            ):
+                self._remover(next(iter(self._entradas)))
+                self.despejos += 1
+        return valor
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+                "despejos": self.despejos,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+    def _remover(self, chave: Hashable) -> None:
+        _, _, _, tamanho = self._entradas.pop(chave)
+        self._bytes -= tamanho
@@ -0,0 +1,164 @@
+"""Escrita agrupada (group commit) de vendas."""
+from __future__ import annotations
+
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from domain.modelos import Venda
+from infra.forja_persistencia import ForjaDePersistencia, transacao_imediata
+from services.servicos import OrquestradorDeFluxoComercial
+
+_FIM = object()
+
+
+@dataclass
+class _Pedido:
+    produto_id: int
+    quantidade: int
+    futuro: Future
+
+
+class EscritorAgrupado:
+    """Thread única de escrita que aplica vendas enfileiradas em grupos.
+
+    Junta até ``max_lote`` pedidos, ou os que chegarem em ``espera_ms`` após o
+    primeiro, numa só transação (um fsync). Cada venda roda num SAVEPOINT: a
+    que falhar é desfeita sozinha e só o seu futuro recebe o erro.
+    """
+
+    def __init__(
+        self, forja: ForjaDePersistencia, *, max_lote: int = 64, espera_ms: float = 2.0
+    ) -> None:
+        if max_lote <= 0:
+            raise ValueError("Tamanho máximo do lote deve ser positivo")
+        self._forja = forja
+        self._max_lote = max_lote
+        self._espera = espera_ms / 1000.0
+        self._fila: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._lotes = 0
+        self._pedidos = 0
+        self._vendas = 0
+        self._falhas = 0
+        self._maior_lote = 0
+        self._commit_total = 0.0
+        self._commit_max = 0.0
+
+    def iniciar(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._executar, name="escritor-agrupado", daemon=True
+            )
+            self._thread.start()
+
+    def encerrar(self) -> None:
+        """Processa o que já estiver na fila e para a thread."""
+        if self._thread is not None:
+            self._fila.put(_FIM)
+            self._thread.join()
+            self._thread = None
+
+    def registrar_venda(self, produto_id: int, quantidade: int) -> "Future[Venda]":
+        if self._thread is None:
+            raise RuntimeError("Escritor agrupado não iniciado")
+        futuro: "Future[Venda]" = Future()
+        self._fila.put(_Pedido(int(produto_id), int(quantidade), futuro))
+        return futuro
+
+    async def registrar_venda_async(self, produto_id: int, quantidade: int) -> Venda:
+        return await asyncio.wrap_future(self.registrar_venda(produto_id, quantidade))
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "fila": self._fila.qsize(),
+                "lotes": self._lotes,
+                "vendas": self._vendas,
+                "falhas": self._falhas,
+                "lote_medio": round(self._pedidos / self._lotes, 2) if self._lotes else 0.0,
+                "maior_lote": self._maior_lote,
+                "commit_ms_medio": (
+                    round(self._commit_total * 1000 / self._lotes, 3) if self._lotes else 0.0
+                ),
+                "commit_ms_max": round(self._commit_max * 1000, 3),
+            }
+
+    # Thread de escrita
+    def _executar(self) -> None:
+        conn = self._forja.conectar()
+        try:
+            fim = False
+            while not fim:
+                item = self._fila.get()
+                if item is _FIM:
+                    break
+                lote: List[_Pedido] = [item]
+                prazo = time.monotonic() + self._espera
+                while len(lote) < self._max_lote:
+                    restante = prazo - time.monotonic()
+                    try:
+                        if restante > 0:
+                            item = self._fila.get(timeout=restante)
+                        else:
+                            item = self._fila.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _FIM:
+                        fim = True
+                        break
+                    lote.append(item)
+                self._aplicar(conn, lote)
+        finally:
+            conn.close()
+
+    def _aplicar(self, conn: sqlite3.Connection, lote: List[_Pedido]) -> None:
+        # Pedidos cancelados pelo chamador enquanto esperavam na fila são ignorados
+        lote = [p for p in lote if p.futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        svc = OrquestradorDeFluxoComercial(conn)
+        resultados: List[Tuple[_Pedido, Optional[Venda], Optional[BaseException]]] = []
+        inicio = time.perf_counter()
+        try:
+            with transacao_imediata(conn):
+                for pedido in lote:
+                    conn.execute("SAVEPOINT venda_agrupada")
+                    try:
+                        venda = svc.registrar_venda(pedido.produto_id, pedido.quantidade)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO venda_agrupada")
+                        resultados.append((pedido, None, e))
+                    else:
+                        resultados.append((pedido, venda, None))
+                    conn.execute("RELEASE venda_agrupada")
+        except Exception as e:
+            # Falha no commit: nenhuma venda do lote foi gravada
+            for pedido in lote:
+                pedido.futuro.set_exception(e)
+            with self._lock:
+                self._falhas += len(lote)
+            return
+        duracao = time.perf_counter() - inicio
+
+        falhas = 0
+        for pedido, venda, erro in resultados:
+            if erro is not None:
+                falhas += 1
+                pedido.futuro.set_exception(erro)
+            else:
+                pedido.futuro.set_result(venda)
+        with self._lock:
+            self._lotes += 1
+            self._pedidos += len(lote)
+            self._vendas += len(lote) - falhas
+            self._falhas += falhas
+            self._maior_lote = max(self._maior_lote, len(lote))
+            self._commit_total += duracao
+            self._commit_max = max(self._commit_max, duracao)
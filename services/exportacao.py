@@ -0,0 +1,67 @@
+"""Exportação de vendas em streaming (CSV/NDJSON, opcionalmente gzip)."""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from typing import Iterator, List, Optional
+
+from infra.repositorios import RepositorioVendaSQL
+
+COLUNAS = ("id", "produto_id", "quantidade", "data_venda", "preco_unitario")
+FORMATOS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _csv(lotes: Iterator[List[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(COLUNAS)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson(lotes: Iterator[List[tuple]]) -> Iterator[str]:
+    for lote in lotes:
+        yield "".join(
+            json.dumps(dict(zip(COLUNAS, linha)), ensure_ascii=False) + "\n" for linha in lote
+        )
+
+
+def _gzip(pedacos: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = cabeçalho gzip
+    for pedaco in pedacos:
+        saida = compressor.compress(pedaco)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+def exportar_vendas(
+    conn: sqlite3.Connection,
+    *,
+    formato: str = "ndjson",
+    inicio_ts: Optional[int] = None,
+    fim_ts: Optional[int] = None,
+    comprimir: bool = False,
+    tamanho_lote: int = 5000,
+) -> Iterator[bytes]:
+    """Gera o arquivo de vendas em pedaços de bytes, um por lote lido do cursor.
+
+    A memória usada fica limitada ao lote corrente, qualquer que seja o tamanho
+    da tabela.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    lotes = RepositorioVendaSQL(conn).iterar_lotes(
+        inicio_ts=inicio_ts, fim_ts=fim_ts, tamanho_lote=tamanho_lote
+    )
+    texto = _csv(lotes) if formato == "csv" else _ndjson(lotes)
+    pedacos = (t.encode("utf-8") for t in texto)
+    return _gzip(pedacos) if comprimir else pedacos
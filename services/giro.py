@@ -0,0 +1,207 @@
+"""Giro de estoque vetorizado: várias janelas a partir de uma única leitura do resumo diário."""
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import chain
+from math import isinf, isnan
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Níveis de risco de ruptura, do pior para o melhor
+RISCOS = ("ruptura", "alto", "medio", "baixo")
+
+
+def interpretar_janelas(texto: str) -> tuple[int, ...]:
+    """``"7,30,90"`` -> ``(7, 30, 90)``; janelas repetidas são ignoradas."""
+    try:
+        janelas = sorted({int(p) for p in texto.split(",") if p.strip()})
+    except ValueError:
+        raise ValueError(f"Janelas inválidas: {texto!r}") from None
+    if not janelas or janelas[0] <= 0:
+        raise ValueError("Informe ao menos uma janela positiva (ex.: dias=7,30,90)")
+    if janelas[-1] > 3660:
+        raise ValueError("Janela máxima de 3660 dias")
+    return tuple(janelas)
+
+
+@dataclass
+class SerieDiaria:
+    """Vendas diárias por produto em colunas NumPy, relativas a uma data de referência.
+
+    ``deslocamentos`` é quantos dias antes da ``referencia`` cada linha ocorreu
+    (0 = o próprio dia). Os produtos seguem a ordem ``nome, id``; ``indices``
+    aponta, para cada linha de venda, a posição do produto nessas colunas.
+    """
+
+    referencia: date
+    dias: int
+    produto_ids: np.ndarray
+    nomes: List[str]
+    estoques: np.ndarray
+    indices: np.ndarray
+    deslocamentos: np.ndarray
+    quantidades: np.ndarray
+
+    @classmethod
+    def carregar(cls, conn: sqlite3.Connection, *, referencia: date, dias: int) -> SerieDiaria:
+        """Lê ``dias`` dias de ``vendas_diarias`` terminando em ``referencia`` (inclusive)."""
+        cur = conn.cursor()
+        cur.row_factory = None
+        produtos = cur.execute(
+            "SELECT id, nome, quantidade_disponivel FROM produtos ORDER BY nome, id"
+        ).fetchall()
+        inicio = referencia - timedelta(days=dias - 1)
+        linhas = cur.execute(
+            """
+            SELECT produto_id,
+                   CAST(julianday(?) - julianday(dia) AS INTEGER),
+                   qtd
+            FROM vendas_diarias
+            WHERE dia BETWEEN ? AND ?
+            """,
+            (referencia.isoformat(), inicio.isoformat(), referencia.isoformat()),
+        ).fetchall()
+
+        ids = np.fromiter((p[0] for p in produtos), dtype=np.int64, count=len(produtos))
+        estoques = np.fromiter((p[2] for p in produtos), dtype=np.int64, count=len(produtos))
+        vendas = np.fromiter(
+            chain.from_iterable(linhas), dtype=np.int64, count=3 * len(linhas)
+        ).reshape(-1, 3)
+        # Posição de cada produto vendido na ordem por nome
+        ordem = np.argsort(ids, kind="stable")
+        pos = np.searchsorted(ids[ordem], vendas[:, 0])
+        if len(ids):
+            pos = np.minimum(pos, len(ids) - 1)
+            conhecidos = ids[ordem][pos] == vendas[:, 0]
+        else:
+            conhecidos = np.zeros(len(vendas), dtype=bool)
+        return cls(
+            referencia=referencia,
+            dias=dias,
+            produto_ids=ids,
+            nomes=[p[1] for p in produtos],
+            estoques=estoques,
+            indices=ordem[pos[conhecidos]],
+            deslocamentos=vendas[conhecidos, 1],
+            quantidades=vendas[conhecidos, 2],
+        )
+
+    def _somar(self, mascara: np.ndarray, pesos: Optional[np.ndarray] = None) -> np.ndarray:
+        valores = self.quantidades[mascara] if pesos is None else pesos[mascara]
+        return np.bincount(
+            self.indices[mascara],
+            weights=valores.astype(np.float64),
+            minlength=len(self.produto_ids),
+        )
+
+    def janela(self, dias: int, *, prazo_reposicao: float = 7.0) -> Dict[str, np.ndarray]:
+        """Indicadores de uma janela de ``dias`` dias, por produto.
+
+        - ``media_diaria``: média móvel simples dos ``dias`` dias até a referência;
+        - ``media_anterior``: a mesma média no período imediatamente anterior;
+        - ``media_exponencial``: média móvel exponencial com ``alpha = 2 / (dias + 1)``
+          sobre todo o histórico carregado, com os pesos renormalizados;
+        - ``cobertura_dias``: estoque / média diária (``inf`` sem demanda);
+        - ``risco``: índice em ``RISCOS`` pela cobertura frente ao prazo de reposição.
+        """
+        if dias > self.dias:
+            raise ValueError(f"Janela de {dias} dias maior que a série carregada ({self.dias})")
+        d = self.deslocamentos
+        total = self._somar(d < dias)
+        media = total / dias
+        anterior = self._somar((d >= dias) & (d < 2 * dias)) / dias
+        alpha = 2.0 / (dias + 1)
+        pesos_dia = alpha * (1 - alpha) ** np.arange(self.dias, dtype=np.float64)
+        todas = np.ones(len(d), dtype=bool)
+        exponencial = self._somar(todas, self.quantidades * pesos_dia[d]) / pesos_dia.sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cobertura = np.where(media > 0, self.estoques / media, np.inf)
+            tendencia = np.where(anterior > 0, media / anterior - 1, np.nan)
+        risco = np.select(
+            [
+                (self.estoques == 0) & (media > 0),
+                cobertura < prazo_reposicao,
+                cobertura < 2 * prazo_reposicao,
+            ],
+            [0, 1, 2],
+            default=3,
+        )
+        return {
+            "total_vendido": total,
+            "media_diaria": media,
+            "media_anterior": anterior,
+            "media_exponencial": exponencial,
+            "tendencia": tendencia,
+            "cobertura_dias": cobertura,
+            "risco": risco,
+        }
+
+
+def giro_multijanela(
+    conn: sqlite3.Connection,
+    *,
+    janelas: Sequence[int],
+    referencia: date,
+    prazo_reposicao: float = 7.0,
+    apenas_risco: bool = False,
+) -> Dict[str, Any]:
+    """Giro de estoque para várias janelas com uma leitura do resumo diário.
+
+    A série carregada cobre o dobro da maior janela (para a média do período
+    anterior). Com ``apenas_risco``, só entram produtos com risco ``alto`` ou
+    pior em alguma janela.
+    """
+    janelas = sorted(set(janelas))
+    serie = SerieDiaria.carregar(conn, referencia=referencia, dias=2 * janelas[-1])
+    calculos = {n: serie.janela(n, prazo_reposicao=prazo_reposicao) for n in janelas}
+
+    selecionados = np.arange(len(serie.produto_ids))
+    if apenas_risco:
+        pior = np.min([c["risco"] for c in calculos.values()], axis=0)
+        selecionados = selecionados[pior <= 1]
+
+    colunas: Dict[int, Dict[str, list]] = {}
+    for n, c in calculos.items():
+        cobertura = np.round(c["cobertura_dias"][selecionados], 2)
+        tendencia = np.round(c["tendencia"][selecionados], 4)
+        colunas[n] = {
+            "total_vendido_periodo": c["total_vendido"][selecionados].astype(np.int64).tolist(),
+            "media_diaria_vendida": np.round(c["media_diaria"][selecionados], 4).tolist(),
+            "media_periodo_anterior": np.round(c["media_anterior"][selecionados], 4).tolist(),
+            "media_movel_exponencial": np.round(
+                c["media_exponencial"][selecionados], 4
+            ).tolist(),
+            "tendencia": [None if isnan(t) else t for t in tendencia.tolist()],
+            "cobertura_dias": [None if isinf(v) else v for v in cobertura.tolist()],
+            "risco_ruptura": [RISCOS[r] for r in c["risco"][selecionados].tolist()],
+        }
+
+    # Um dict por produto e janela, montado coluna a coluna (sem laço por campo)
+    por_janela = {
+        str(n): [dict(zip(cols, valores)) for valores in zip(*cols.values())]
+        for n, cols in colunas.items()
+    }
+    itens = [
+        {
+            "produto_id": produto_id,
+            "nome": serie.nomes[pos],
+            "estoque_atual": estoque,
+            "janelas": {n: linhas[i] for n, linhas in por_janela.items()},
+        }
+        for i, (pos, produto_id, estoque) in enumerate(
+            zip(
+                selecionados.tolist(),
+                serie.produto_ids[selecionados].tolist(),
+                serie.estoques[selecionados].tolist(),
+            )
+        )
+    ]
+    return {
+        "referencia": referencia.isoformat(),
+        "janelas": janelas,
+        "prazo_reposicao": prazo_reposicao,
+        "itens": itens,
+    }
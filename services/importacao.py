@@ -0,0 +1,244 @@
+"""Carga em massa de produtos e vendas a partir de CSV/JSONL."""
+from __future__ import annotations
+
+import csv
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from domain.modelos import Produto, Venda
+from infra.forja_persistencia import recriar_indices, remover_indices, transacao_imediata
+from infra.particoes import fim_arquivado
+from infra.repositorios import RepositorioProdutoSQL, RepositorioVendaSQL, epoch_utc
+
+FORMATOS = ("csv", "jsonl")
+
+
+@dataclass
+class RelatorioImportacao:
+    tipo: str
+    lidas: int = 0
+    inseridas: int = 0
+    rejeitadas: int = 0
+    segundos: float = 0.0
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.lidas / self.segundos if self.segundos > 0 else 0.0
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "tipo": self.tipo,
+            "lidas": self.lidas,
+            "inseridas": self.inseridas,
+            "rejeitadas": self.rejeitadas,
+            "segundos": round(self.segundos, 3),
+            "linhas_por_segundo": round(self.linhas_por_segundo, 1),
+        }
+
+
+def detectar_formato(nome_arquivo: str) -> str:
+    sufixo = Path(nome_arquivo).suffix.lower()
+    if sufixo == ".csv":
+        return "csv"
+    if sufixo in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Formato não reconhecido para '{nome_arquivo}' (use csv ou jsonl)")
+
+
+def ler_registros(arquivo: TextIO, formato: str) -> Iterator[Tuple[int, Any]]:
+    """Itera ``(numero_linha, registro)`` sem carregar o arquivo em memória.
+
+    Linhas JSONL malformadas chegam como texto bruto e são rejeitadas adiante.
+    """
+    if formato == "csv":
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+    elif formato == "jsonl":
+        for n, linha in enumerate(arquivo, start=1):
+            if not linha.strip():
+                continue
+            try:
+                yield n, json.loads(linha)
+            except json.JSONDecodeError:
+                yield n, linha.rstrip("\n")
+    else:
+        raise ValueError(f"Formato inválido: {formato}")
+
+
+def _vazio(valor: Any) -> bool:
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+
+def _produto(registro: Dict[str, Any]) -> Produto:
+    return Produto(
+        nome=str(registro.get("nome") or ""),
+        descricao=str(registro.get("descricao") or ""),
+        quantidade_disponivel=int(registro.get("quantidade_disponivel") or 0),
+        preco=float(registro["preco"]),
+    )
+
+
+def _venda(registro: Dict[str, Any]) -> Tuple[Venda, Optional[float]]:
+    data = registro.get("data_venda")
+    venda = Venda(
+        produto_id=int(registro["produto_id"]),
+        quantidade=int(registro["quantidade"]),
+    )
+    if not _vazio(data):
+        venda.data_venda = datetime.fromisoformat(str(data))
+    preco = registro.get("preco_unitario")
+    if not _vazio(preco):
+        preco = float(preco)
+        if preco < 0:
+            raise ValueError("Preço não pode ser negativo")
+        return venda, preco
+    return venda, None
+
+
+class _Rejeitos:
+    def __init__(self, destino: Optional[TextIO]) -> None:
+        self._destino = destino
+
+    def registrar(self, linha: int, registro: Any, erro: str) -> None:
+        if self._destino is not None:
+            self._destino.write(
+                json.dumps(
+                    {"linha": linha, "erro": erro, "registro": registro},
+                    ensure_ascii=False,
+                    default=str,
+                )
+                + "\n"
+            )
+
+
+def _importar(
+    conn: sqlite3.Connection,
+    tipo: str,
+    registros: Iterator[Tuple[int, Any]],
+    converter: Callable[[Dict[str, Any]], Any],
+    gravar: Callable[[List[Tuple[int, Any, Any]], _Rejeitos], int],
+    *,
+    tamanho_lote: int,
+    adiar_indices: bool,
+    rejeitados: Optional[TextIO],
+) -> RelatorioImportacao:
+    if tamanho_lote <= 0:
+        raise ValueError("Tamanho do lote deve ser positivo")
+    relatorio = RelatorioImportacao(tipo=tipo)
+    rejeitos = _Rejeitos(rejeitados)
+    inicio = time.perf_counter()
+    ddls = remover_indices(conn, tipo) if adiar_indices else []
+    try:
+        lote: List[Tuple[int, Any, Any]] = []
+        for linha, registro in registros:
+            relatorio.lidas += 1
+            try:
+                if not isinstance(registro, dict):
+                    raise ValueError("Registro malformado")
+                lote.append((linha, registro, converter(registro)))
+            except (KeyError, TypeError, ValueError) as e:
+                rejeitos.registrar(linha, registro, str(e) or type(e).__name__)
+                continue
+            if len(lote) >= tamanho_lote:
+                relatorio.inseridas += gravar(lote, rejeitos)
+                lote = []
+        if lote:
+            relatorio.inseridas += gravar(lote, rejeitos)
+    finally:
+        if ddls:
+            recriar_indices(conn, ddls)
+        relatorio.segundos = time.perf_counter() - inicio
+    relatorio.rejeitadas = relatorio.lidas - relatorio.inseridas
+    return relatorio
+
+
+def importar_produtos(
+    conn: sqlite3.Connection,
+    arquivo: TextIO,
+    *,
+    formato: str,
+    tamanho_lote: int = 5000,
+    adiar_indices: bool = False,
+    rejeitados: Optional[TextIO] = None,
+) -> RelatorioImportacao:
+    """Carrega produtos em transações de ``tamanho_lote`` linhas.
+
+    Cada linha passa pelas validações de ``Produto``; as inválidas vão para
+    ``rejeitados`` (JSONL com linha, erro e registro original).
+    """
+    repo = RepositorioProdutoSQL(conn)
+
+    def gravar(lote: List[Tuple[int, Any, Any]], _: _Rejeitos) -> int:
+        with transacao_imediata(conn):
+            repo.inserir_lote([produto for _, _, produto in lote])
+        return len(lote)
+
+    return _importar(
+        conn,
+        "produtos",
+        ler_registros(arquivo, formato),
+        _produto,
+        gravar,
+        tamanho_lote=tamanho_lote,
+        adiar_indices=adiar_indices,
+        rejeitados=rejeitados,
+    )
+
+
+def importar_vendas(
+    conn: sqlite3.Connection,
+    arquivo: TextIO,
+    *,
+    formato: str,
+    tamanho_lote: int = 5000,
+    adiar_indices: bool = False,
+    rejeitados: Optional[TextIO] = None,
+) -> RelatorioImportacao:
+    """Carrega vendas históricas em transações de ``tamanho_lote`` linhas.
+
+    Vendas históricas não baixam estoque. Sem ``preco_unitario`` no arquivo, a
+    venda grava o preço do produto no momento da importação; mudanças de preço
+    posteriores não a alteram. Linhas que referenciam produtos inexistentes ou
+    caem em meses já arquivados são rejeitadas.
+    """
+    repo_prod = RepositorioProdutoSQL(conn)
+    repo_venda = RepositorioVendaSQL(conn)
+
+    def gravar(lote: List[Tuple[int, Any, Any]], rejeitos: _Rejeitos) -> int:
+        with transacao_imediata(conn):
+            existentes = repo_prod.ids_existentes(venda.produto_id for _, _, (venda, _) in lote)
+            # Lido com o lock de escrita: o gatilho de meses arquivados abortaria o lote
+            arquivado_ate = fim_arquivado(conn)
+            validas = []
+            for linha, registro, (venda, preco) in lote:
+                if venda.produto_id not in existentes:
+                    rejeitos.registrar(linha, registro, "Produto inexistente")
+                elif arquivado_ate is not None and epoch_utc(venda.data_venda) <= arquivado_ate:
+                    rejeitos.registrar(linha, registro, "Venda em mês já arquivado")
+                else:
+                    validas.append((venda, preco))
+            repo_venda.inserir_lote([v for v, _ in validas], [p for _, p in validas])
+        return len(validas)
+
+    return _importar(
+        conn,
+        "vendas",
+        ler_registros(arquivo, formato),
+        _venda,
+        gravar,
+        tamanho_lote=tamanho_lote,
+        adiar_indices=adiar_indices,
+        rejeitados=rejeitados,
+    )
+
+
+IMPORTADORES: Dict[str, Callable[..., RelatorioImportacao]] = {
+    "produtos": importar_produtos,
+    "vendas": importar_vendas,
+}
@@ -0,0 +1,30 @@
+"""Cursores opacos para paginação por chave (keyset)."""
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Optional, Tuple
+
+
+def codificar_cursor(*chave: Any) -> str:
+    bruto = json.dumps(list(chave), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).rstrip(b"=").decode()
+
+
+def decodificar_cursor(token: str, *tipos: type) -> Tuple[Any, ...]:
+    """Decodifica o cursor e confere aridade e tipos de cada componente."""
+    try:
+        bruto = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        valores = json.loads(bruto)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido") from None
+    if not isinstance(valores, list) or len(valores) != len(tipos):
+        raise ValueError("Cursor inválido")
+    if not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(valores, tipos)):
+        raise ValueError("Cursor inválido")
+    return tuple(valores)
+
+
+def pagina_json(itens: str, cursor: Optional[str]) -> str:
+    """Corpo ``{"itens": [...], "next_cursor": ...}`` com ``itens`` já em JSON."""
+    return f'{{"itens":{itens},"next_cursor":{json.dumps(cursor)}}}'
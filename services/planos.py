@@ -0,0 +1,264 @@
+"""Verificação dos planos de consulta (``EXPLAIN QUERY PLAN``) das consultas registradas.
+
+Cada entrada de ``CONSULTAS`` chama o código real (relatórios, repositórios,
+serviços) numa conexão que captura as instruções emitidas; o plano de cada uma é
+então conferido. Falha se alguma fizer ``SCAN`` de ``vendas`` ou montar B-tree
+temporária para ``ORDER BY``, salvo exceção declarada com motivo. Tudo roda em
+uma transação desfeita no final, então o banco não muda.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, List, Tuple
+
+from infra.forja_persistencia import ForjaDePersistencia
+from infra.metricas import RegistroDeMetricas
+from infra.particoes import anexar, listar_particoes
+from infra.repositorios import RepositorioProdutoSQL, RepositorioVendaSQL, epoch_utc
+from services import relatorios as rel
+from services.alteracoes import listar_alteracoes_json
+from services.exportacao import exportar_vendas
+from services.giro import giro_multijanela
+from services.ranking_tempo_real import RankingTempoReal
+from services.servicos import OrquestradorDeFluxoComercial
+
+_EXPLICAVEIS = ("SELECT", "WITH", "UPDATE", "DELETE")
+_PALAVRAS = {"WHERE", "JOIN", "ON", "ORDER", "GROUP", "LIMIT", "LEFT", "INNER", "SET", "VALUES"}
+_ALIAS_VENDAS = re.compile(r"\bvendas\s+(?:AS\s+)?([A-Za-z_]\w*)", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@dataclass(frozen=True)
+class ConsultaRegistrada:
+    """Uma chamada representativa; ``permite_*`` só com ``motivo`` explicando por quê."""
+
+    nome: str
+    executar: Callable[[sqlite3.Connection], Any]
+    permite_varredura: bool = False
+    permite_ordenacao_temporaria: bool = False
+    motivo: str = ""
+
+
+@dataclass(frozen=True)
+class Violacao:
+    consulta: str
+    sql: str
+    detalhe: str
+
+    def __str__(self) -> str:
+        sql = " ".join(self.sql.split())
+        return f"{self.consulta}: {self.detalhe}\n    {sql[:160]}"
+
+
+class _Capturador(RegistroDeMetricas):
+    # Reaproveita a conexão instrumentada só para anotar (sql, parâmetros)
+    def __init__(self) -> None:
+        super().__init__()
+        self.instrucoes: List[Tuple[str, Any]] = []
+
+    def observar_sql(
+        self, sql: str, segundos: float, parametros: Any = (), *, erro: bool = False
+    ) -> None:
+        self.instrucoes.append((sql, parametros))
+
+
+_JANELA = {"start": "2025-01-01", "end": "2025-01-31T23:59:59"}
+_PARCIAL = {"start": "2025-01-01T12:00:00", "end": "2025-01-31T11:59:59"}
+_TS = (epoch_utc("2025-01-01"), epoch_utc("2025-01-31T23:59:59"))
+
+
+def _sem_erro_de_dominio(func: Callable[[sqlite3.Connection], Any]) -> Callable:
+    # Com banco vazio as escritas falham por regra de negócio; as instruções
+    # emitidas até ali já foram capturadas
+    def chamar(conn: sqlite3.Connection) -> Any:
+        try:
+            return func(conn)
+        except ValueError:
+            return None
+
+    return chamar
+
+
+CONSULTAS: List[ConsultaRegistrada] = [
+    # Relatórios: janela inteira (só o resumo), pontas com horário (vendas) e sem filtro
+    *[
+        ConsultaRegistrada(
+            f"relatorios.receita_total[{n}]", lambda c, j=j: rel.receita_total(c, **j)
+        )
+        for n, j in (("janela", _JANELA), ("parcial", _PARCIAL), ("tudo", {}))
+    ],
+    *[
+        ConsultaRegistrada(
+            f"relatorios.receita_por_dia[{n}]", lambda c, j=j: rel.receita_por_dia(c, **j)
+        )
+        for n, j in (("janela", _JANELA), ("parcial", _PARCIAL), ("tudo", {}))
+    ],
+    *[
+        ConsultaRegistrada(
+            f"relatorios.receita_por_dia_json[{n}]",
+            lambda c, j=j: rel.receita_por_dia_json(c, **j),
+        )
+        for n, j in (("janela", _JANELA), ("parcial", _PARCIAL))
+    ],
+    *[
+        ConsultaRegistrada(
+            f"relatorios.ranking_produtos{sufixo}[{n}]",
+            lambda c, j=j, f=f: f(c, **j, limit=10),
+            permite_ordenacao_temporaria=True,
+            motivo="ordena por agregados (receita, quantidade); nenhum índice os contém",
+        )
+        for n, j in (("janela", _JANELA), ("parcial", _PARCIAL), ("tudo", {}))
+        for sufixo, f in (("", rel.ranking_produtos), ("_json", rel.ranking_produtos_json))
+    ],
+    ConsultaRegistrada(
+        "relatorios.giro_estoque", lambda c: rel.giro_estoque(c, dias=30, referencia=None)
+    ),
+    ConsultaRegistrada(
+        "giro.giro_multijanela",
+        lambda c: giro_multijanela(c, janelas=(7, 30, 90), referencia=date(2025, 1, 31)),
+    ),
+    ConsultaRegistrada(
+        "ranking_tempo_real.reconstruir+ranking",
+        lambda c: RankingTempoReal(relogio=lambda: float(_TS[1])).ranking(c, janela="hoje"),
+    ),
+    # Repositórios
+    ConsultaRegistrada("produtos.obter_por_id", lambda c: RepositorioProdutoSQL(c).obter_por_id(1)),
+    ConsultaRegistrada("produtos.listar", lambda c: RepositorioProdutoSQL(c).listar()),
+    ConsultaRegistrada(
+        "produtos.listar_pagina",
+        lambda c: RepositorioProdutoSQL(c).listar_pagina(100, apos=("M", 1)),
+    ),
+    ConsultaRegistrada(
+        "produtos.listar_pagina_json",
+        lambda c: RepositorioProdutoSQL(c).listar_pagina_json(100, apos=("M", 1)),
+    ),
+    ConsultaRegistrada(
+        "produtos.obter_estoques", lambda c: RepositorioProdutoSQL(c).obter_estoques([1, 2, 3])
+    ),
+    ConsultaRegistrada(
+        "vendas.listar",
+        lambda c: RepositorioVendaSQL(c).listar(),
+        permite_varredura=True,
+        motivo="devolve todas as vendas; percorre o índice de data sem ordenar",
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_pagina",
+        lambda c: RepositorioVendaSQL(c).listar_pagina(100, apos=(_TS[1], 10)),
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_pagina[produto]",
+        lambda c: RepositorioVendaSQL(c).listar_pagina(100, apos=(_TS[1], 10), produto_id=1),
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_pagina[periodo]",
+        lambda c: RepositorioVendaSQL(c).listar_pagina(100, inicio_ts=_TS[0], fim_ts=_TS[1]),
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_pagina_json",
+        lambda c: RepositorioVendaSQL(c).listar_pagina_json(100, apos=(_TS[1], 10)),
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_pagina_json[produto]",
+        lambda c: RepositorioVendaSQL(c).listar_pagina_json(1, produto_id=1),
+    ),
+    ConsultaRegistrada(
+        "vendas.listar_por_produto", lambda c: RepositorioVendaSQL(c).listar_por_produto(1)
+    ),
+    ConsultaRegistrada(
+        "vendas.carregar_lote",
+        lambda c: RepositorioVendaSQL(c).carregar_lote(inicio_ts=_TS[0], fim_ts=_TS[1]),
+    ),
+    ConsultaRegistrada(
+        "exportacao.exportar_vendas[periodo]",
+        lambda c: b"".join(
+            exportar_vendas(c, formato="ndjson", inicio_ts=_TS[0], fim_ts=_TS[1])
+        ),
+    ),
+    ConsultaRegistrada(
+        "alteracoes.listar_alteracoes_json",
+        lambda c: listar_alteracoes_json(c, desde=10, limite=100),
+    ),
+    # Escritas (desfeitas ao final)
+    ConsultaRegistrada(
+        "servicos.registrar_venda",
+        _sem_erro_de_dominio(lambda c: OrquestradorDeFluxoComercial(c).registrar_venda(1, 1)),
+    ),
+    ConsultaRegistrada(
+        "servicos.registrar_vendas_lote",
+        _sem_erro_de_dominio(
+            lambda c: OrquestradorDeFluxoComercial(c).registrar_vendas_lote([(1, 1), (2, 1)])
+        ),
+    ),
+]
+
+
+def _aliases_de_vendas(sql: str) -> set[str]:
+    nomes = {"vendas"}
+    for alias in _ALIAS_VENDAS.findall(sql):
+        if alias.upper() not in _PALAVRAS:
+            nomes.add(alias)
+    return nomes
+
+
+def analisar_plano(
+    consulta: ConsultaRegistrada, sql: str, plano: List[str]
+) -> List[Violacao]:
+    violacoes = []
+    vendas = _aliases_de_vendas(sql)
+    for detalhe in plano:
+        scan = _SCAN.match(detalhe)
+        if scan and scan.group(1) in vendas and not consulta.permite_varredura:
+            violacoes.append(Violacao(consulta.nome, sql, detalhe))
+        if (
+            "TEMP B-TREE" in detalhe
+            and "ORDER BY" in detalhe
+            and not consulta.permite_ordenacao_temporaria
+        ):
+            violacoes.append(Violacao(consulta.nome, sql, detalhe))
+    return violacoes
+
+
+def planos_da_consulta(
+    forja: ForjaDePersistencia, consulta: ConsultaRegistrada
+) -> List[Tuple[str, List[str]]]:
+    """Executa a consulta (sem efeito duradouro) e devolve ``(sql, plano)`` de cada instrução."""
+    capturador = _Capturador()
+    espia = ForjaDePersistencia(str(forja.caminho), pragmas=forja.pragmas, metricas=capturador)
+    conn = espia.conectar()
+    try:
+        # Meses arquivados precisam estar anexados antes do BEGIN
+        anexar(conn, [p["arquivo"] for p in listar_particoes(conn)])
+        del capturador.instrucoes[:]  # pragmas da abertura
+        conn.execute("BEGIN")
+        try:
+            consulta.executar(conn)
+        finally:
+            conn.rollback()
+        resultado = []
+        for sql, params in capturador.instrucoes:
+            if sql.lstrip().split(None, 1)[0].upper() not in _EXPLICAVEIS:
+                continue
+            if not isinstance(params, (tuple, list, dict)):
+                continue  # executemany: parâmetros resumidos, sem plano individual
+            cur = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params)
+            resultado.append((sql, [r[3] for r in cur.fetchall()]))
+        return resultado
+    finally:
+        conn.close()
+
+
+def verificar_planos(
+    forja: ForjaDePersistencia, consultas: List[ConsultaRegistrada] = CONSULTAS
+) -> List[Violacao]:
+    violacoes: List[Violacao] = []
+    for consulta in consultas:
+        if (consulta.permite_varredura or consulta.permite_ordenacao_temporaria) and not (
+            consulta.motivo
+        ):
+            raise ValueError(f"Exceção sem motivo em {consulta.nome}")
+        for sql, plano in planos_da_consulta(forja, consulta):
+            violacoes += analisar_plano(consulta, sql, plano)
+    return violacoes
@@ -0,0 +1,370 @@
+"""Ranking de produtos em tempo real, sem reagregar ``vendas`` a cada consulta.
+
+Cada venda soma receita e quantidade do produto nos resumos das janelas de
+``JANELAS``. Uma janela é uma sequência de baldes de ``passo`` segundos alinhados
+ao epoch: ``hoje`` tem um balde só (o dia UTC, que zera na virada, janela fixa);
+``hora`` e ``15min`` são deslizantes, com baldes de 60 e 30 segundos, e
+avançam um balde por vez (cobrem de ``duracao - passo`` a ``duracao`` segundos).
+
+Resumos:
+
+* exato (catálogos até ``limite_exato`` produtos): um dicionário por balde; o
+  resultado é igual ao de ``relatorios.ranking_produtos`` no mesmo intervalo;
+* aproximado (catálogos maiores): Space-Saving ponderado pela receita, com
+  ``capacidade`` contadores por balde. Cada item traz ``erro``: a receita real
+  está em ``receita ± erro``, e ``erro`` nunca passa de ``W / capacidade`` (``W``
+  é a receita da janela). Produtos com receita acima desse limite nunca ficam de
+  fora. ``total_vendido`` conta só desde que o produto entrou no resumo.
+
+As vendas chegam de dois jeitos: ``registrar`` (chamado pelo
+``OrquestradorDeFluxoComercial`` após o commit) e ``sincronizar``, que lê as
+vendas com ``id`` acima do último aplicado. Como o SQLite serializa as escritas,
+os ids ficam visíveis em ordem; ``registrar`` só aplica a venda seguinte à última
+vista e deixa o resto (outros workers, escrita agrupada, importações) para
+``sincronizar``, que toda consulta faz antes de responder. Nenhuma venda conta
+duas vezes.
+"""
+from __future__ import annotations
+
+import heapq
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from domain.modelos import Venda
+from infra.repositorios import epoch_utc
+
+# Entrada de um resumo: (produto_id, receita, quantidade, erro)
+Entrada = Tuple[int, float, int, float]
+
+
+@dataclass(frozen=True)
+class Janela:
+    duracao: int
+    passo: int
+
+    def baldes(self, agora: float) -> Tuple[int, int]:
+        """Primeiro e último índice de balde (``ts // passo``) cobertos em ``agora``."""
+        ultimo = int(agora) // self.passo
+        return ultimo - self.duracao // self.passo + 1, ultimo
+
+
+JANELAS: Dict[str, Janela] = {
+    "15min": Janela(900, 30),
+    "hora": Janela(3600, 60),
+    "hoje": Janela(86400, 86400),
+}
+
+
+class _ResumoExato:
+    __slots__ = ("itens",)
+
+    def __init__(self) -> None:
+        self.itens: Dict[int, List[float]] = {}
+
+    def adicionar(self, produto_id: int, quantidade: int, receita: float) -> None:
+        item = self.itens.get(produto_id)
+        if item is None:
+            self.itens[produto_id] = [receita, quantidade]
+        else:
+            item[0] += receita
+            item[1] += quantidade
+
+    def piso(self) -> float:
+        # Produto ausente do resumo não vendeu nada no balde
+        return 0.0
+
+    def entradas(self) -> Iterator[Entrada]:
+        for produto_id, (receita, quantidade) in self.itens.items():
+            yield produto_id, receita, int(quantidade), 0.0
+
+
+class _ResumoSpaceSaving:
+    """Space-Saving ponderado (Metwally et al.): ``capacidade`` contadores.
+
+    Ao chegar um produto novo com o resumo cheio, o de menor receita sai e o
+    novo herda essa receita como ``erro``; a receita contada nunca fica abaixo
+    da real, e a excede em no máximo ``erro`` (≤ receita do balde / capacidade).
+    """
+
+    __slots__ = ("capacidade", "itens", "_heap")
+
+    def __init__(self, capacidade: int) -> None:
+        self.capacidade = capacidade
+        self.itens: Dict[int, List[float]] = {}  # id -> [receita, quantidade, erro]
+        # Min-heap preguiçoso de (receita, id): entradas velhas são puladas
+        self._heap: List[Tuple[float, int]] = []
+
+    def _minimo(self) -> Tuple[float, int]:
+        heap = self._heap
+        while True:
+            receita, produto_id = heap[0]
+            item = self.itens.get(produto_id)
+            if item is not None and item[0] == receita:
+                return receita, produto_id
+            heapq.heappop(heap)
+
+    def adicionar(self, produto_id: int, quantidade: int, receita: float) -> None:
+        item = self.itens.get(produto_id)
+        if item is not None:
+            item[0] += receita
+            item[1] += quantidade
+        elif len(self.itens) < self.capacidade:
+            item = self.itens[produto_id] = [receita, quantidade, 0.0]
+        else:
+            minimo, vitima = self._minimo()
+            del self.itens[vitima]
+            item = self.itens[produto_id] = [minimo + receita, quantidade, minimo]
+        heapq.heappush(self._heap, (item[0], produto_id))
+        if len(self._heap) > 4 * self.capacidade:
+            self._heap = [(i[0], pid) for pid, i in self.itens.items()]
+            heapq.heapify(self._heap)
+
+    def piso(self) -> float:
+        # Resumo cheio: quem está fora vendeu no máximo a menor receita contada
+        return self._minimo()[0] if len(self.itens) >= self.capacidade else 0.0
+
+    def entradas(self) -> Iterator[Entrada]:
+        for produto_id, (receita, quantidade, erro) in self.itens.items():
+            yield produto_id, receita, int(quantidade), erro
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class RankingTempoReal:
+    """Top-K de produtos por receita em janelas recentes, mantido venda a venda.
+
+    ``modo`` é ``"exato"``, ``"aproximado"`` ou ``"auto"`` (decide em
+    ``reconstruir`` pelo tamanho do catálogo). Seguro entre threads.
+    """
+
+    def __init__(
+        self,
+        *,
+        modo: str = "auto",
+        limite_exato: int = 50_000,
+        capacidade: int = 2_000,
+        janelas: Optional[Dict[str, Janela]] = None,
+        relogio: Callable[[], float] = time.time,
+    ) -> None:
+        if modo not in ("auto", "exato", "aproximado"):
+            raise ValueError(f"Modo de ranking desconhecido: {modo}")
+        if capacidade <= 0:
+            raise ValueError("Capacidade do resumo deve ser positiva")
+        self._modo = modo
+        self._limite_exato = limite_exato
+        self._capacidade = capacidade
+        self._janelas = dict(janelas or JANELAS)
+        self._relogio = relogio
+        self._exato = modo != "aproximado"
+        self._baldes: Dict[str, Dict[int, Any]] = {nome: {} for nome in self._janelas}
+        self._ultimo_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self.aplicadas = 0
+        self.sincronizadas = 0
+
+    @property
+    def exato(self) -> bool:
+        return self._exato
+
+    @property
+    def janelas(self) -> List[str]:
+        return list(self._janelas)
+
+    def _desde(self, agora: float) -> int:
+        # Início do balde mais antigo ainda coberto por alguma janela
+        return min(j.baldes(agora)[0] * j.passo for j in self._janelas.values())
+
+    def _aplicar(self, produto_id: int, quantidade: int, ts: int, receita: float) -> None:
+        agora = self._relogio()
+        for nome, janela in self._janelas.items():
+            inicio, _ = janela.baldes(agora)
+            indice = ts // janela.passo
+            if indice < inicio:
+                continue
+            baldes = self._baldes[nome]
+            resumo = baldes.get(indice)
+            if resumo is None:
+                for velho in [i for i in baldes if i < inicio]:
+                    del baldes[velho]
+                resumo = baldes[indice] = (
+                    _ResumoExato() if self._exato else _ResumoSpaceSaving(self._capacidade)
+                )
+            resumo.adicionar(produto_id, quantidade, receita)
+        self.aplicadas += 1
+
+    def _aplicar_linhas(self, linhas: Iterable[Tuple]) -> None:
+        for venda_id, produto_id, quantidade, ts, preco in linhas:
+            self._aplicar(int(produto_id), int(quantidade), int(ts), quantidade * preco)
+            self._ultimo_id = max(self._ultimo_id or 0, int(venda_id))
+
+    def _ler_vendas(self, conn: sqlite3.Connection, q: str, params: Tuple) -> Iterator[Tuple]:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(
+            "SELECT v.id, v.produto_id, v.quantidade, v.data_venda_ts, v.preco_unitario "
+            f"FROM vendas v WHERE {q}",
+            params,
+        )
+        try:
+            while True:
+                linhas = cur.fetchmany(5000)
+                if not linhas:
+                    break
+                yield from linhas
+        finally:
+            cur.close()
+
+    def reconstruir(self, conn: sqlite3.Connection) -> int:
+        """Refaz os resumos a partir de ``vendas``; devolve quantas vendas entraram."""
+        propria = not conn.in_transaction
+        if propria:
+            # Um snapshot só: o teto de id e as vendas lidas são do mesmo instante
+            conn.execute("BEGIN")
+        try:
+            ate_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM vendas").fetchone()[0]
+            with self._lock:
+                if self._modo == "auto":
+                    produtos = conn.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+                    self._exato = produtos <= self._limite_exato
+                self._baldes = {nome: {} for nome in self._janelas}
+                self._ultimo_id = 0
+                self.aplicadas = 0
+                desde = self._desde(self._relogio())
+                # "+v.id": o teto não deve desviar a busca de idx_vendas_ts_cobertura
+                linhas = self._ler_vendas(
+                    conn, "v.data_venda_ts >= ? AND +v.id <= ?", (desde, ate_id)
+                )
+                self._aplicar_linhas(linhas)
+                self._ultimo_id = ate_id
+                return self.aplicadas
+        finally:
+            if propria:
+                conn.rollback()
+
+    def sincronizar(self, conn: sqlite3.Connection) -> int:
+        """Aplica as vendas gravadas depois da última vista; devolve quantas."""
+        if self._ultimo_id is None:
+            self.reconstruir(conn)
+        with self._lock:
+            antes = self.aplicadas
+            ultimo = self._ultimo_id or 0
+            ate_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM vendas").fetchone()[0]
+            desde = self._desde(self._relogio())
+            # Faixa de rowid (vazia quando nada mudou); o "+" impede que a data leve
+            # ao índice e à janela inteira
+            linhas = self._ler_vendas(
+                conn,
+                "v.id > ? AND v.id <= ? AND +v.data_venda_ts >= ? ORDER BY v.id",
+                (ultimo, ate_id, desde),
+            )
+            self._aplicar_linhas(linhas)
+            self._ultimo_id = max(ultimo, ate_id)
+            novas = self.aplicadas - antes
+            self.sincronizadas += novas
+            return novas
+
+    def registrar(self, venda: Venda, preco: float) -> bool:
+        """Aplica uma venda recém-confirmada se for a seguinte à última vista.
+
+        Fora de sequência (outro processo gravou no meio) a venda é ignorada
+        aqui e chega pela próxima ``sincronizar``.
+        """
+        if venda.id is None:
+            return False
+        with self._lock:
+            if self._ultimo_id is None or venda.id != self._ultimo_id + 1:
+                return False
+            ts = epoch_utc(venda.data_venda)
+            receita = venda.quantidade * preco
+            self._aplicar(int(venda.produto_id), int(venda.quantidade), ts, receita)
+            self._ultimo_id = venda.id
+            return True
+
+    def _combinar(self, resumos: List[Any]) -> Dict[int, List[float]]:
+        pisos = [r.piso() for r in resumos]
+        soma_pisos = sum(pisos)
+        # id -> [receita, quantidade, erro dos presentes, pisos dos baldes presentes]
+        total: Dict[int, List[float]] = {}
+        for resumo, piso in zip(resumos, pisos):
+            for produto_id, receita, quantidade, erro in resumo.entradas():
+                item = total.get(produto_id)
+                if item is None:
+                    total[produto_id] = [receita, quantidade, erro, piso]
+                else:
+                    item[0] += receita
+                    item[1] += quantidade
+                    item[2] += erro
+                    item[3] += piso
+        # Nos baldes em que o produto não aparece ele vendeu no máximo o piso
+        for item in total.values():
+            item[2] += soma_pisos - item[3]
+        return total
+
+    def ranking(
+        self, conn: sqlite3.Connection, *, janela: str = "hora", limit: int = 10
+    ) -> Dict[str, Any]:
+        """Top ``limit`` produtos por receita na janela, na forma de ``ranking_produtos``.
+
+        Sincroniza antes com o banco. Devolve ``inicio``/``fim`` do intervalo
+        coberto, ``exato`` e ``itens``; no modo aproximado cada item traz ``erro``.
+        """
+        if janela not in self._janelas:
+            raise ValueError(
+                f"Janela desconhecida: {janela} (use {', '.join(self._janelas)})"
+            )
+        if limit <= 0:
+            raise ValueError("Limite deve ser positivo")
+        self.sincronizar(conn)
+        spec = self._janelas[janela]
+        with self._lock:
+            agora = self._relogio()
+            inicio, fim = spec.baldes(agora)
+            resumos = [r for i, r in self._baldes[janela].items() if inicio <= i <= fim]
+            total = self._combinar(resumos)
+            exato = self._exato
+        topo = heapq.nsmallest(
+            int(limit), total.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0])
+        )
+        ids = [produto_id for produto_id, _ in topo]
+        nomes: Dict[int, str] = {}
+        if ids:
+            marcadores = ",".join("?" * len(ids))
+            nomes = dict(
+                conn.execute(
+                    f"SELECT id, nome FROM produtos WHERE id IN ({marcadores})", ids
+                ).fetchall()
+            )
+        itens = []
+        for produto_id, (receita, quantidade, erro, _) in topo:
+            item = {
+                "produto_id": produto_id,
+                "nome": nomes.get(produto_id),
+                "total_vendido": int(quantidade),
+                "receita": float(receita),
+            }
+            if not exato:
+                item["erro"] = float(erro)
+            itens.append(item)
+        return {
+            "janela": janela,
+            "inicio": _iso(inicio * spec.passo),
+            "fim": _iso(agora),
+            "exato": exato,
+            "itens": itens,
+        }
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "exato": self._exato,
+                "ultimo_id": self._ultimo_id,
+                "aplicadas": self.aplicadas,
+                "sincronizadas": self.sincronizadas,
+                "baldes": {nome: len(b) for nome, b in self._baldes.items()},
+            }
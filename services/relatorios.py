@@ -1,58 +1,144 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from infra import json_sqlite
+from infra.forja_persistencia import (
+    incrementar_versao_dados,
+    preencher_vendas_diarias,
+    transacao_imediata,
+)
+from infra.particoes import fontes_por_intervalo
+from infra.repositorios import epoch_utc
 
-def _intervalo_sql(start: Optional[str], end: Optional[str]) -> Tuple[str, list]:
-    conds = []
+_DIA = 86400
+
+_VENDAS_CRUAS = """
+    SELECT DATE(v.data_venda_ts, 'unixepoch') AS dia,
+           v.produto_id,
+           v.quantidade AS qtd,
+           v.quantidade * v.preco_unitario AS receita
+    FROM {vendas} v
+    WHERE v.data_venda_ts BETWEEN ? AND ?
+"""
+
+
+def _dia(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).date().isoformat()
+
+
+@contextmanager
+def _fonte_sql(
+    conn: sqlite3.Connection, start: Optional[str], end: Optional[str]
+) -> Iterator[Tuple[str, list]]:
+    """Linhas ``(dia, produto_id, qtd, receita)`` cobrindo o intervalo ``[start, end]``.
+
+    Dias inteiros vêm do resumo ``vendas_diarias``; só as pontas parciais (quando
+    ``start``/``end`` trazem horário) leem as vendas pelo índice de data, unindo
+    apenas as partições (quente ou arquivadas) que contêm essas pontas.
+    """
+    s = epoch_utc(start) if start else None
+    e = epoch_utc(end) if end else None
+    # Início do primeiro e do último dia inteiramente contidos no intervalo
+    primeiro = None if s is None else -(-s // _DIA) * _DIA
+    ultimo = None if e is None else (e + 1) // _DIA * _DIA - _DIA
+
+    partes: List[str] = []
     params: list[Any] = []
-    if start:
-        conds.append("datetime(data_venda) >= datetime(?)")
-        params.append(start)
-    if end:
-        conds.append("datetime(data_venda) <= datetime(?)")
-        params.append(end)
-    where = ("WHERE " + " AND ".join(conds)) if conds else ""
-    return where, params
+    cruas: List[Tuple[int, int]] = []
+    if primeiro is not None and ultimo is not None and primeiro > ultimo:
+        cruas.append((s, e))
+    else:
+        conds = []
+        if primeiro is not None:
+            conds.append("dia >= ?")
+            params.append(_dia(primeiro))
+        if ultimo is not None:
+            conds.append("dia <= ?")
+            params.append(_dia(ultimo))
+        where = ("WHERE " + " AND ".join(conds)) if conds else ""
+        partes.append(f"SELECT dia, produto_id, qtd, receita FROM vendas_diarias {where}")
+        if s is not None and s < primeiro:
+            cruas.append((s, primeiro - 1))
+        if e is not None and e >= ultimo + _DIA:
+            cruas.append((ultimo + _DIA, e))
+    if not cruas:
+        yield " UNION ALL ".join(partes), params
+        return
+    with fontes_por_intervalo(conn, cruas) as por_intervalo:
+        for (a, b), fontes in zip(cruas, por_intervalo):
+            for f in fontes:
+                partes.append(_VENDAS_CRUAS.format(vendas=f.tabela))
+                params += [a, b]
+        yield " UNION ALL ".join(partes), params
+
+
+def reconstruir_vendas_diarias(conn: sqlite3.Connection) -> None:
+    """Recalcula o resumo ``vendas_diarias`` do zero a partir de ``vendas``.
+
+    Incrementa a versão dos dados na mesma transação: caches de relatórios de
+    qualquer processo descartam os números anteriores à reconstrução.
+    """
+    with transacao_imediata(conn):
+        preencher_vendas_diarias(conn)
+        incrementar_versao_dados(conn)
 
 
 def receita_total(
     conn: sqlite3.Connection, *, start: Optional[str] = None, end: Optional[str] = None
 ) -> float:
-    where, params = _intervalo_sql(start, end)
-    q = f"""
-        SELECT SUM(v.quantidade * COALESCE(v.preco_unitario, p.preco)) AS receita
-        FROM vendas v
-        JOIN produtos p ON p.id = v.produto_id
-        {where}
-    """
-    row = conn.execute(q, params).fetchone()
+    with _fonte_sql(conn, start, end) as (fonte, params):
+        q = f"SELECT SUM(receita) AS receita FROM ({fonte})"
+        row = conn.execute(q, params).fetchone()
     return float(row[0]) if row and row[0] is not None else 0.0
 
 
+_RECEITA_POR_DIA = """
+    SELECT dia, SUM(receita) AS receita
+    FROM ({fonte})
+    GROUP BY dia
+    ORDER BY dia ASC
+"""
+
+_RANKING = """
+    SELECT p.id AS produto_id, p.nome,
+           SUM(f.qtd) AS total_vendido,
+           SUM(f.receita) AS receita
+    FROM ({fonte}) f
+    JOIN produtos p ON p.id = f.produto_id
+    GROUP BY p.id, p.nome
+    ORDER BY receita DESC NULLS LAST, total_vendido DESC
+    LIMIT ?
+"""
+
+
 def receita_por_dia(
     conn: sqlite3.Connection, *, start: Optional[str] = None, end: Optional[str] = None
 ) -> List[Dict[str, Any]]:
-    where, params = _intervalo_sql(start, end)
-    q = f"""
-        SELECT DATE(v.data_venda) AS dia,
-               SUM(v.quantidade * COALESCE(v.preco_unitario, p.preco)) AS receita
-        FROM vendas v
-        JOIN produtos p ON p.id = v.produto_id
-        {where}
-        GROUP BY dia
-        ORDER BY dia ASC
-    """
+    with _fonte_sql(conn, start, end) as (fonte, params):
+        rows = conn.execute(_RECEITA_POR_DIA.format(fonte=fonte), params).fetchall()
     return [
         {
             "dia": r["dia"],
             "receita": float(r["receita"]) if r["receita"] is not None else 0.0,
         }
-        for r in conn.execute(q, params).fetchall()
+        for r in rows
     ]
 
 
+def receita_por_dia_json(
+    conn: sqlite3.Connection, *, start: Optional[str] = None, end: Optional[str] = None
+) -> str:
+    """``receita_por_dia`` como array JSON montado pelo SQLite (mesmos campos e valores)."""
+    item = json_sqlite.objeto(dia="dia", receita=json_sqlite.real("COALESCE(receita, 0.0)"))
+    with _fonte_sql(conn, start, end) as (fonte, params):
+        q = f"SELECT json_group_array({item}) FROM ({_RECEITA_POR_DIA.format(fonte=fonte)})"
+        return conn.execute(q, params).fetchone()[0]
+
+
 def ranking_produtos(
     conn: sqlite3.Connection,
     *,
@@ -60,19 +146,9 @@ def ranking_produtos(
     end: Optional[str] = None,
     limit: int = 10,
 ) -> List[Dict[str, Any]]:
-    where, params = _intervalo_sql(start, end)
-    q = f"""
-        SELECT p.id AS produto_id, p.nome,
-               SUM(v.quantidade) AS total_vendido,
-               SUM(v.quantidade * COALESCE(v.preco_unitario, p.preco)) AS receita
-        FROM vendas v
-        JOIN produtos p ON p.id = v.produto_id
-        {where}
-        GROUP BY p.id, p.nome
-        ORDER BY receita DESC NULLS LAST, total_vendido DESC
-        LIMIT ?
-    """
-    params_l = [*params, int(limit)]
+    with _fonte_sql(conn, start, end) as (fonte, params):
+        q = _RANKING.format(fonte=fonte)
+        rows = conn.execute(q, [*params, int(limit)]).fetchall()
     return [
         {
             "produto_id": int(r["produto_id"]),
@@ -82,21 +158,44 @@ def ranking_produtos(
             ),
             "receita": float(r["receita"]) if r["receita"] is not None else 0.0,
         }
-        for r in conn.execute(q, params_l).fetchall()
+        for r in rows
     ]
 
 
-def giro_estoque(conn: sqlite3.Connection, *, dias: int = 30) -> List[Dict[str, Any]]:
+def ranking_produtos_json(
+    conn: sqlite3.Connection,
+    *,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 10,
+) -> str:
+    """``ranking_produtos`` como array JSON montado pelo SQLite (mesmos campos e valores)."""
+    item = json_sqlite.objeto(
+        produto_id="produto_id",
+        nome="nome",
+        total_vendido="CAST(COALESCE(total_vendido, 0) AS INTEGER)",
+        receita=json_sqlite.real("COALESCE(receita, 0.0)"),
+    )
+    with _fonte_sql(conn, start, end) as (fonte, params):
+        q = f"SELECT json_group_array({item}) FROM ({_RANKING.format(fonte=fonte)})"
+        return conn.execute(q, [*params, int(limit)]).fetchone()[0]
+
+
+def giro_estoque(
+    conn: sqlite3.Connection, *, dias: int = 30, referencia: Optional[date] = None
+) -> List[Dict[str, Any]]:
     # Média diária vendida em N dias e cobertura em dias
+    # Janela: os N dias terminados no dia de referência (inclusive), em UTC;
+    # dias inteiros, então basta o resumo diário
+    ref = referencia or datetime.now(timezone.utc).date()
+    inicio = (ref - timedelta(days=abs(dias) - 1)).isoformat()
+    fim = ref.isoformat()
     q = """
-        WITH periodo AS (
-            SELECT DATE('now', ? || ' days') AS inicio, DATE('now') AS fim
-        ),
-        vendas_periodo AS (
-            SELECT v.produto_id, SUM(v.quantidade) AS total_vendido
-            FROM vendas v, periodo p
-            WHERE DATE(v.data_venda) BETWEEN p.inicio AND p.fim
-            GROUP BY v.produto_id
+        WITH vendas_periodo AS (
+            SELECT vd.produto_id, SUM(vd.qtd) AS total_vendido
+            FROM vendas_diarias vd
+            WHERE vd.dia BETWEEN ? AND ?
+            GROUP BY vd.produto_id
         )
         SELECT p.id AS produto_id,
                p.nome,
@@ -107,7 +206,7 @@ def giro_estoque(conn: sqlite3.Connection, *, dias: int = 30) -> List[Dict[str,
         LEFT JOIN vendas_periodo vp ON vp.produto_id = p.id
         ORDER BY p.nome ASC
     """
-    params = (-abs(dias) * -1, dias)  # truque para DATE('now', '-30 days') via concat
+    params = (inicio, fim, dias)
     rows = conn.execute(q, params).fetchall()
     resultado: List[Dict[str, Any]] = []
     for r in rows:
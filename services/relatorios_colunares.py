@@ -0,0 +1,86 @@
+"""Relatórios de receita sobre o snapshot colunar (``infra.colunar``), em NumPy.
+
+Mesmas assinaturas e formatos de ``services.relatorios``, mas o primeiro argumento
+é um ``SnapshotColunar`` aberto: nada toca o banco, então análises pesadas
+(histórico inteiro, comparações entre anos) não disputam o arquivo com o caixa.
+Os valores refletem o snapshot até a última atualização.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from infra.colunar import SnapshotColunar
+from infra.repositorios import epoch_utc
+
+_DIA = 86400
+
+
+def _recorte(
+    snap: SnapshotColunar, start: Optional[str], end: Optional[str]
+) -> Dict[str, np.ndarray]:
+    return snap.intervalo(
+        epoch_utc(start) if start else None, epoch_utc(end) if end else None
+    )
+
+
+def _receitas(colunas: Dict[str, np.ndarray]) -> np.ndarray:
+    return colunas["quantidades"] * colunas["precos"]
+
+
+def receita_total(
+    snap: SnapshotColunar, *, start: Optional[str] = None, end: Optional[str] = None
+) -> float:
+    return float(_receitas(_recorte(snap, start, end)).sum())
+
+
+def receita_por_dia(
+    snap: SnapshotColunar, *, start: Optional[str] = None, end: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    colunas = _recorte(snap, start, end)
+    if not len(colunas["datas_ts"]):
+        return []
+    dias = colunas["datas_ts"] // _DIA
+    base = int(dias.min())
+    posicoes = dias - base
+    receita = np.bincount(posicoes, weights=_receitas(colunas))
+    presentes = np.flatnonzero(np.bincount(posicoes))
+    rotulos = (np.datetime64("1970-01-01") + (presentes + base)).astype(str)
+    return [
+        {"dia": dia, "receita": valor}
+        for dia, valor in zip(rotulos.tolist(), receita[presentes].tolist())
+    ]
+
+
+def ranking_produtos(
+    snap: SnapshotColunar,
+    *,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    colunas = _recorte(snap, start, end)
+    produtos = colunas["produto_ids"]
+    if not len(produtos) or limit <= 0:
+        return []
+    receita = np.bincount(produtos, weights=_receitas(colunas))
+    total = np.bincount(produtos, weights=colunas["quantidades"])
+    # Só produtos vendidos no período e ainda existentes (como o JOIN do SQL)
+    candidatos = np.flatnonzero(np.bincount(produtos))
+    candidatos = candidatos[np.isin(candidatos, np.fromiter(snap.nomes, dtype=np.int64))]
+    # Receita desc, depois quantidade desc; argpartition evita ordenar todos
+    if len(candidatos) > limit:
+        corte = np.argpartition(-receita[candidatos], limit - 1)[:limit]
+        limiar = receita[candidatos][corte].min()
+        candidatos = candidatos[receita[candidatos] >= limiar]
+    ordem = np.lexsort((-total[candidatos], -receita[candidatos]))[: int(limit)]
+    return [
+        {
+            "produto_id": pid,
+            "nome": snap.nomes[pid],
+            "total_vendido": int(total[pid]),
+            "receita": float(receita[pid]),
+        }
+        for pid in candidatos[ordem].tolist()
+    ]
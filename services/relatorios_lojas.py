@@ -0,0 +1,172 @@
+"""Relatórios da rede: as funções de ``services.relatorios`` em todas as lojas.
+
+Cada loja roda em um processo de um ``ProcessPoolExecutor`` (o GIL não limita a
+parte Python dos relatórios e cada processo tem sua conexão), e os resultados
+parciais são combinados aqui: receita somada, receita por dia somada dia a dia
+e ranking por fusão dos top-K de cada loja.
+
+Como os produtos de lojas diferentes são registros distintos (ids locais), os
+conjuntos de cada ranking parcial são disjuntos e o top-K da rede está sempre
+contido na união dos top-K das lojas: a fusão é exata pedindo só ``limit``
+linhas a cada uma. Os itens do ranking e do giro ganham o campo ``loja``.
+"""
+from __future__ import annotations
+
+import heapq
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from infra.forja_persistencia import ForjaDePersistencia
+from infra.shards import RoteadorDeLojas
+from services import relatorios
+
+# Relatórios que podem rodar nos workers (o nome atravessa a fronteira do processo)
+RELATORIOS = ("receita_total", "receita_por_dia", "ranking_produtos", "giro_estoque")
+
+# Conexões do processo worker, reaproveitadas entre chamadas
+_CONEXOES: Dict[str, sqlite3.Connection] = {}
+
+
+def _conexao(caminho: str) -> sqlite3.Connection:
+    conn = _CONEXOES.get(caminho)
+    if conn is None:
+        # O worker só lê: as migrações ficam com o roteador no processo principal
+        conn = _CONEXOES[caminho] = ForjaDePersistencia(caminho).conectar()
+    return conn
+
+
+def executar_na_loja(caminho: str, nome: str, kwargs: Dict[str, Any]) -> Any:
+    """Roda ``relatorios.<nome>(conn, **kwargs)`` no banco ``caminho``."""
+    if nome not in RELATORIOS:
+        raise ValueError(f"Relatório desconhecido: {nome}")
+    return getattr(relatorios, nome)(_conexao(caminho), **kwargs)
+
+
+def somar_receitas(parciais: Iterable[float]) -> float:
+    return float(sum(parciais))
+
+
+def juntar_por_dia(parciais: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    por_dia: Dict[str, float] = {}
+    for linhas in parciais:
+        for r in linhas:
+            por_dia[r["dia"]] = por_dia.get(r["dia"], 0.0) + r["receita"]
+    return [{"dia": dia, "receita": por_dia[dia]} for dia in sorted(por_dia)]
+
+
+def juntar_ranking(
+    parciais: Dict[str, List[Dict[str, Any]]], limit: int
+) -> List[Dict[str, Any]]:
+    # Mesma ordem do SQL (receita, depois quantidade) e loja/produto para desempate
+    itens = (
+        {"loja": loja, **r} for loja, linhas in parciais.items() for r in linhas
+    )
+    return heapq.nsmallest(
+        int(limit),
+        itens,
+        key=lambda r: (-r["receita"], -r["total_vendido"], r["loja"], r["produto_id"]),
+    )
+
+
+def _juntar_giro(parciais: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    return [{"loja": loja, **r} for loja, linhas in parciais.items() for r in linhas]
+
+
+class RelatoriosDaRede:
+    """Fan-out dos relatórios para as lojas de um ``RoteadorDeLojas``.
+
+    O pool de processos nasce na primeira consulta e é reaproveitado até
+    ``fechar``. Com ``processos=0`` as lojas rodam em sequência no próprio
+    processo (útil com uma CPU só ou poucas lojas pequenas, onde abrir
+    processos custa mais que o relatório).
+    """
+
+    def __init__(self, roteador: RoteadorDeLojas, *, processos: Optional[int] = None) -> None:
+        self._roteador = roteador
+        self._processos = (os.cpu_count() or 1) if processos is None else processos
+        self._executor: Optional[Executor] = None
+
+    def _executor_ativo(self) -> Optional[Executor]:
+        if self._processos <= 0:
+            return None
+        if self._executor is None:
+            # spawn: o worker não herda conexões nem locks de threads do pai
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._processos,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _por_loja(
+        self, nome: str, lojas: Optional[List[str]], **kwargs: Any
+    ) -> Dict[str, Any]:
+        caminhos = self._roteador.caminhos(lojas)
+        executor = self._executor_ativo()
+        if executor is None or len(caminhos) <= 1:
+            return {
+                loja: executar_na_loja(str(c), nome, kwargs) for loja, c in caminhos.items()
+            }
+        futuros = {
+            loja: executor.submit(executar_na_loja, str(c), nome, kwargs)
+            for loja, c in caminhos.items()
+        }
+        return {loja: f.result() for loja, f in futuros.items()}
+
+    def receita_total(
+        self,
+        *,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        lojas: Optional[List[str]] = None,
+    ) -> float:
+        parciais = self._por_loja("receita_total", lojas, start=start, end=end)
+        return somar_receitas(parciais.values())
+
+    def receita_por_dia(
+        self,
+        *,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        lojas: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        parciais = self._por_loja("receita_por_dia", lojas, start=start, end=end)
+        return juntar_por_dia(parciais.values())
+
+    def ranking_produtos(
+        self,
+        *,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit: int = 10,
+        lojas: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        parciais = self._por_loja(
+            "ranking_produtos", lojas, start=start, end=end, limit=limit
+        )
+        return juntar_ranking(parciais, limit)
+
+    def giro_estoque(
+        self,
+        *,
+        dias: int = 30,
+        referencia: Optional[date] = None,
+        lojas: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        parciais = self._por_loja("giro_estoque", lojas, dias=dias, referencia=referencia)
+        return _juntar_giro(parciais)
+
+    def por_loja(
+        self, nome: str, *, lojas: Optional[List[str]] = None, **kwargs: Any
+    ) -> Dict[str, Any]:
+        """Resultado bruto de ``relatorios.<nome>`` em cada loja, sem combinar."""
+        return self._por_loja(nome, lojas, **kwargs)
+
+    def fechar(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
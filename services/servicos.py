@@ -1,23 +1,67 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from domain.modelos import Produto, Venda
-from infra.repositorios import RepositorioProdutoSQL, RepositorioVendaSQL
+from infra.catalogo import CatalogoEmMemoria
+from infra.forja_persistencia import transacao_imediata, versao_catalogo
+from infra.repositorios import RepositorioProdutoSQL, RepositorioVendaSQL, epoch_utc
+from services.paginacao import codificar_cursor, decodificar_cursor, pagina_json
+from services.ranking_tempo_real import RankingTempoReal
+
+
+class ErroVendaEmLote(ValueError):
+    """Falha em um lote de vendas; ``resultados`` traz o status de cada item."""
+
+    def __init__(self, mensagem: str, resultados: List[Dict[str, Any]]) -> None:
+        super().__init__(mensagem)
+        self.resultados = resultados
 
 
 class OrquestradorDeFluxoComercial:
     """Camada de aplicação que orquestra operações de estoque e vendas.
 
     Garante consistência transacional ao baixar estoque e registrar vendas.
+    Com um ``CatalogoEmMemoria``, as listagens de produtos saem da memória e as
+    escritas de catálogo o atualizam após o commit; com um ``RankingTempoReal``,
+    cada venda confirmada entra nele na hora.
     """
 
-    def __init__(self, conn: sqlite3.Connection) -> None:
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        catalogo: Optional[CatalogoEmMemoria] = None,
+        ranking: Optional[RankingTempoReal] = None,
+    ) -> None:
         self.conn = conn
-        self.repo_prod = RepositorioProdutoSQL(conn)
+        self.catalogo = catalogo
+        self.ranking = ranking
+        self.repo_prod = RepositorioProdutoSQL(conn, catalogo)
         self.repo_venda = RepositorioVendaSQL(conn)
 
+    @contextmanager
+    def _escrita_catalogo(self) -> Iterator[None]:
+        """Transação de escrita que repassa ao catálogo as linhas gravadas.
+
+        Dentro de uma transação alheia as linhas são descartadas: só quem faz o
+        commit sabe se elas valem, e a próxima sincronização as encontra.
+        """
+        propria = not self.conn.in_transaction
+        pendentes = self.repo_prod.pendentes
+        pendentes.clear()
+        try:
+            with transacao_imediata(self.conn):
+                # Sob BEGIN IMMEDIATE ninguém mais altera o contador até o commit
+                antes = versao_catalogo(self.conn)[0] if self.catalogo and propria else None
+                yield
+                depois = versao_catalogo(self.conn)[0] if antes is not None else None
+            if self.catalogo is not None and propria:
+                self.catalogo.confirmar(list(pendentes), antes, depois)
+        finally:
+            pendentes.clear()
+
     # Catálogo / Estoque
     def cadastrar_produto(
         self, nome: str, descricao: str, quantidade: int, preco: float
@@ -28,24 +72,185 @@ class OrquestradorDeFluxoComercial:
             quantidade_disponivel=quantidade,
             preco=preco,
         )
-        with self.conn:
+        with self._escrita_catalogo():
             self.repo_prod.inserir(produto)
         return produto
 
+    def atualizar_produto(self, produto: Produto) -> None:
+        with self._escrita_catalogo():
+            self.repo_prod.atualizar(produto)
+
+    def ajustar_estoque(self, produto_id: int, delta: int) -> None:
+        """Entrada (``delta`` > 0) ou saída manual de estoque, sem registrar venda."""
+        with self._escrita_catalogo():
+            self.repo_prod.ajustar_estoque(produto_id, delta)
+
+    def obter_produto(self, produto_id: int) -> Optional[Produto]:
+        if self.catalogo is not None:
+            return self.catalogo.obter(self.conn, produto_id)
+        return self.repo_prod.obter_por_id(produto_id)
+
     def listar_produtos(self) -> List[Produto]:
+        if self.catalogo is not None:
+            return self.catalogo.listar(self.conn)
         return self.repo_prod.listar()
 
+    def paginar_produtos(
+        self, limite: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Produto], Optional[str]]:
+        """Página do catálogo por nome; devolve os produtos e o próximo cursor."""
+        if limite <= 0:
+            raise ValueError("Limite deve ser positivo")
+        apos = decodificar_cursor(cursor, str, int) if cursor else None
+        if self.catalogo is not None:
+            produtos = self.catalogo.pagina(self.conn, limite + 1, apos=apos)
+        else:
+            produtos = self.repo_prod.listar_pagina(limite + 1, apos=apos)
+        if len(produtos) <= limite:
+            return produtos, None
+        produtos = produtos[:limite]
+        ultimo = produtos[-1]
+        return produtos, codificar_cursor(ultimo.nome, ultimo.id)
+
+    def paginar_produtos_json(self, limite: int = 100, cursor: Optional[str] = None) -> str:
+        """Como ``paginar_produtos``, com a resposta inteira em JSON montado pelo SQLite.
+
+        Com catálogo, o JSON de cada produto já está em memória e a página só o concatena.
+        """
+        if limite <= 0:
+            raise ValueError("Limite deve ser positivo")
+        apos = decodificar_cursor(cursor, str, int) if cursor else None
+        if self.catalogo is not None:
+            itens, ultima = self.catalogo.pagina_json(self.conn, limite, apos=apos)
+        else:
+            itens, ultima = self.repo_prod.listar_pagina_json(limite, apos=apos)
+        return pagina_json(itens, codificar_cursor(*ultima) if ultima else None)
+
+    def buscar_produtos(self, texto: str, limite: int = 20) -> List[Produto]:
+        """Busca textual por prefixo em nome e descrição, mais relevantes primeiro."""
+        if limite <= 0:
+            raise ValueError("Limite deve ser positivo")
+        return self.repo_prod.buscar(texto, limite)
+
     # Vendas
     def registrar_venda(self, produto_id: int, quantidade: int) -> Venda:
         venda = Venda(produto_id=produto_id, quantidade=quantidade)
-        with self.conn:
-            # Captura preço no momento da venda e garante consistência atômica
-            produto = self.repo_prod.obter_por_id(produto_id)
-            if not produto:
-                raise ValueError("Produto inexistente")
-            self.repo_prod.ajustar_estoque(produto_id, -quantidade)
-            self.repo_venda.inserir(venda, preco_unitario=produto.preco)
+        propria = not self.conn.in_transaction
+        with transacao_imediata(self.conn):
+            # Baixa condicional devolve o preço do momento da venda na mesma instrução
+            preco, _ = self.repo_prod.baixar_estoque(produto_id, quantidade)
+            self.repo_venda.inserir(venda, preco_unitario=preco)
+        # Como no catálogo: dentro de transação alheia só a sincronização sabe se valeu
+        if self.ranking is not None and propria:
+            self.ranking.registrar(venda, preco)
         return venda
 
+    def registrar_vendas_lote(self, itens: Sequence[Tuple[int, int]]) -> List[Venda]:
+        """Registra um carrinho inteiro em uma única transação.
+
+        Valida estoque de todos os itens antes de escrever; se qualquer item
+        falhar nada é gravado e ``ErroVendaEmLote`` descreve cada item.
+        """
+        if not itens:
+            raise ValueError("Lote de vendas vazio")
+        vendas: List[Venda | None] = []
+        erros: Dict[int, str] = {}
+        for i, (produto_id, quantidade) in enumerate(itens):
+            try:
+                vendas.append(Venda(produto_id=produto_id, quantidade=quantidade))
+            except ValueError as e:
+                vendas.append(None)
+                erros[i] = str(e)
+
+        propria = not self.conn.in_transaction
+        with transacao_imediata(self.conn):
+            estoques = self.repo_prod.obter_estoques(v.produto_id for v in vendas if v is not None)
+            demanda: Dict[int, int] = {}
+            for i, venda in enumerate(vendas):
+                if venda is None:
+                    continue
+                estoque = estoques.get(int(venda.produto_id))
+                if estoque is None:
+                    erros[i] = "Produto inexistente"
+                    continue
+                total = demanda.get(venda.produto_id, 0) + venda.quantidade
+                if total > estoque[1]:
+                    erros[i] = "Estoque insuficiente para a operação"
+                    continue
+                demanda[venda.produto_id] = total
+
+            if erros:
+                resultados = [
+                    {
+                        "indice": i,
+                        "produto_id": int(produto_id),
+                        "quantidade": int(quantidade),
+                        "ok": i not in erros,
+                        "erro": erros.get(i),
+                    }
+                    for i, (produto_id, quantidade) in enumerate(itens)
+                ]
+                raise ErroVendaEmLote(
+                    f"{len(erros)} de {len(itens)} itens inválidos; nenhuma venda registrada",
+                    resultados,
+                )
+
+            confirmadas = [v for v in vendas if v is not None]
+            precos = [estoques[v.produto_id][0] for v in confirmadas]
+            self.repo_prod.baixar_estoques(demanda)
+            self.repo_venda.inserir_lote(confirmadas, precos)
+        if self.ranking is not None and propria:
+            for venda, preco in zip(confirmadas, precos):
+                self.ranking.registrar(venda, preco)
+        return confirmadas
+
     def listar_vendas(self) -> List[Venda]:
         return self.repo_venda.listar()
+
+    def paginar_vendas(
+        self,
+        limite: int = 100,
+        cursor: Optional[str] = None,
+        *,
+        produto_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Tuple[List[Venda], Optional[str]]:
+        """Página de vendas da mais recente para a mais antiga, com filtros opcionais."""
+        if limite <= 0:
+            raise ValueError("Limite deve ser positivo")
+        apos = decodificar_cursor(cursor, int, int) if cursor else None
+        linhas = self.repo_venda.listar_pagina(
+            limite + 1,
+            apos=apos,
+            produto_id=produto_id,
+            inicio_ts=epoch_utc(start) if start else None,
+            fim_ts=epoch_utc(end) if end else None,
+        )
+        if len(linhas) <= limite:
+            return [v for v, _ in linhas], None
+        linhas = linhas[:limite]
+        ultima, ts = linhas[-1]
+        return [v for v, _ in linhas], codificar_cursor(ts, ultima.id)
+
+    def paginar_vendas_json(
+        self,
+        limite: int = 100,
+        cursor: Optional[str] = None,
+        *,
+        produto_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> str:
+        """Como ``paginar_vendas``, mas a resposta inteira em JSON, montada pelo SQLite."""
+        if limite <= 0:
+            raise ValueError("Limite deve ser positivo")
+        apos = decodificar_cursor(cursor, int, int) if cursor else None
+        itens, ultima = self.repo_venda.listar_pagina_json(
+            limite,
+            apos=apos,
+            produto_id=produto_id,
+            inicio_ts=epoch_utc(start) if start else None,
+            fim_ts=epoch_utc(end) if end else None,
+        )
+        return pagina_json(itens, codificar_cursor(*ultima) if ultima else None)
@@ -0,0 +1,146 @@
+"""Fachada assíncrona sobre o orquestrador e os relatórios."""
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from domain.modelos import Produto, Venda
+from infra.catalogo import CatalogoEmMemoria
+from infra.executor import ExecutorDeBanco
+from services.alteracoes import VigiaDeAlteracoes, listar_alteracoes_json, ultima_sequencia
+from services.cache_relatorios import CacheDeRelatorios
+from services.escrita_agrupada import EscritorAgrupado
+from services.ranking_tempo_real import RankingTempoReal
+from services.servicos import OrquestradorDeFluxoComercial
+
+
+class OrquestradorAssincrono:
+    """Versão ``async`` de ``OrquestradorDeFluxoComercial``.
+
+    Escritas e leituras vão para executores separados, de modo que relatórios
+    pesados não ocupem as threads que atendem ``registrar_venda``. Com um
+    ``EscritorAgrupado``, vendas individuais seguem pela fila de group commit.
+    """
+
+    def __init__(
+        self,
+        leitura: ExecutorDeBanco,
+        escrita: ExecutorDeBanco,
+        *,
+        cache: Optional[CacheDeRelatorios] = None,
+        escritor: Optional[EscritorAgrupado] = None,
+        catalogo: Optional[CatalogoEmMemoria] = None,
+        ranking: Optional[RankingTempoReal] = None,
+    ) -> None:
+        self.leitura = leitura
+        self.escrita = escrita
+        self.cache = cache
+        self.escritor = escritor
+        self.catalogo = catalogo
+        self.ranking = ranking
+        self.vigia = VigiaDeAlteracoes(lambda: self.leitura.executar(ultima_sequencia))
+
+    # Catálogo / Estoque
+    async def cadastrar_produto(
+        self, nome: str, descricao: str, quantidade: int, preco: float
+    ) -> Produto:
+        return await self.escrita.executar(
+            lambda conn: OrquestradorDeFluxoComercial(conn, self.catalogo).cadastrar_produto(
+                nome, descricao, quantidade, preco
+            )
+        )
+
+    async def paginar_produtos(
+        self, limite: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[List[Produto], Optional[str]]:
+        return await self.leitura.executar(
+            lambda conn: OrquestradorDeFluxoComercial(conn, self.catalogo).paginar_produtos(
+                limite, cursor
+            )
+        )
+
+    async def paginar_produtos_json(
+        self, limite: int = 100, cursor: Optional[str] = None
+    ) -> Tuple[str, int]:
+        """Página em JSON e o último ``seq`` do feed de alterações, lido antes dela."""
+
+        def ler(conn: Any) -> Tuple[str, int]:
+            seq = ultima_sequencia(conn)
+            orq = OrquestradorDeFluxoComercial(conn, self.catalogo)
+            return orq.paginar_produtos_json(limite, cursor), seq
+
+        return await self.leitura.executar(ler)
+
+    async def buscar_produtos(self, texto: str, limite: int = 20) -> List[Produto]:
+        return await self.leitura.executar(
+            lambda conn: OrquestradorDeFluxoComercial(conn).buscar_produtos(texto, limite)
+        )
+
+    # Vendas
+    async def registrar_venda(self, produto_id: int, quantidade: int) -> Venda:
+        if self.escritor is not None:
+            # Validação antecipada: pedidos inválidos nem entram na fila
+            Venda(produto_id=produto_id, quantidade=quantidade)
+            return await self.escritor.registrar_venda_async(produto_id, quantidade)
+        return await self.escrita.executar(
+            lambda conn: OrquestradorDeFluxoComercial(
+                conn, ranking=self.ranking
+            ).registrar_venda(produto_id, quantidade)
+        )
+
+    async def registrar_vendas_lote(self, itens: Sequence[Tuple[int, int]]) -> List[Venda]:
+        return await self.escrita.executar(
+            lambda conn: OrquestradorDeFluxoComercial(
+                conn, ranking=self.ranking
+            ).registrar_vendas_lote(itens)
+        )
+
+    async def paginar_vendas(
+        self, limite: int = 100, cursor: Optional[str] = None, **filtros: Any
+    ) -> Tuple[List[Venda], Optional[str]]:
+        return await self.leitura.executar(
+            lambda conn: OrquestradorDeFluxoComercial(conn).paginar_vendas(
+                limite, cursor, **filtros
+            )
+        )
+
+    async def paginar_vendas_json(
+        self, limite: int = 100, cursor: Optional[str] = None, **filtros: Any
+    ) -> Tuple[str, int]:
+        """Página em JSON e o último ``seq`` do feed de alterações, lido antes dela."""
+
+        def ler(conn: Any) -> Tuple[str, int]:
+            seq = ultima_sequencia(conn)
+            orq = OrquestradorDeFluxoComercial(conn)
+            return orq.paginar_vendas_json(limite, cursor, **filtros), seq
+
+        return await self.leitura.executar(ler)
+
+    async def alteracoes(self, desde: int = 0, limite: int = 100, espera: float = 0.0) -> str:
+        """Feed de alterações após ``desde``; com ``espera``, aguarda até haver itens."""
+        corpo, n = await self.leitura.executar(listar_alteracoes_json, desde=desde, limite=limite)
+        if n == 0 and espera > 0 and await self.vigia.esperar(desde, espera):
+            corpo, _ = await self.leitura.executar(
+                listar_alteracoes_json, desde=desde, limite=limite
+            )
+        return corpo
+
+    # Relatórios
+    async def relatorio(self, func: Callable[..., Any], **params: Any) -> Any:
+        """Executa uma função de ``services.relatorios`` (via cache, se houver).
+
+        ``timeout`` nos parâmetros, se presente, é repassado ao executor.
+        """
+        opcoes = {"timeout": params.pop("timeout")} if "timeout" in params else {}
+        if self.cache is not None:
+            return await self.leitura.executar(self.cache.obter, func, **opcoes, **params)
+        return await self.leitura.executar(func, **opcoes, **params)
+
+    async def ranking_tempo_real(self, janela: str, limite: int) -> dict:
+        """Top-K do ``RankingTempoReal``; fora do cache, que congelaria a janela."""
+        if self.ranking is None:
+            raise ValueError("Ranking em tempo real desativado")
+        return await self.leitura.executar(self.ranking.ranking, janela=janela, limit=limite)
+
+    async def em_escrita(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Roda ``func(conn, ...)`` no executor de escrita, sem tempo limite."""
+        return await self.escrita.executar(func, *args, timeout=None, **kwargs)